@@ -1,9 +1,9 @@
 import os
 import subprocess
-from io import StringIO
-import pandas as pd
 
-output = subprocess.check_output('WMIC PROCESS get Caption,Commandline,Processid /format:list', shell=True)
+# python.exe 만 조회 (전체 프로세스 목록을 받지 않는다)
+output = subprocess.check_output(
+    'WMIC PROCESS where "name=\'python.exe\'" get Caption,Commandline,Processid /format:list', shell=True)
 # output = output.decode("utf-8").strip()
 # output = output.decode("cp949").strip()
 output = output.decode("euc-kr").strip()
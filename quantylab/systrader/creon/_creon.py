@@ -6,76 +6,234 @@ import time
 import argparse
 import subprocess
 import abc
+import contextlib
 
-import win32com.client
-from pywinauto import application
+import numpy as np
+try:
+    import win32com.client
+except ImportError:
+    # 윈도우가 아닌 환경에서는 fakecom.FakeCOM 을 com 으로 넘겨서 사용
+    win32com = None
 
 # from quantylab.systrader import util
+# from quantylab.systrader.creon import constants
+# from quantylab.systrader.creon import ratelimit
+# from quantylab.systrader.creon.columnar import ColumnarResult, read_page
+# from quantylab.systrader.creon.chartcache import ChartCache
+# from quantylab.systrader.creon.symbolmaster import SymbolMaster, get_codemgr_item
+# from quantylab.systrader.creon.backfill import MinuteBackfill
+# from quantylab.systrader.creon.tickstore import TickStore
+# from quantylab.systrader.creon.orderbook import OrderBook
+# from quantylab.systrader.creon.tradesession import TradeSession
+# from quantylab.systrader.creon.asyncorder import AsyncOrderer
+# from quantylab.systrader.creon.connmonitor import ConnectionMonitor
+# from quantylab.systrader.creon.reconnect import Reconnector
 
 import util as util
+import constants as constants
+import ratelimit as ratelimit
+from columnar import ColumnarResult, read_page, chr_array
+from chartcache import ChartCache
+from symbolmaster import SymbolMaster, get_codemgr_item
+from backfill import MinuteBackfill
+from tickstore import TickStore
+from orderbook import OrderBook
+from tradesession import TradeSession
+from asyncorder import AsyncOrderer
+from connmonitor import ConnectionMonitor
+from reconnect import Reconnector
+
+
+# MarketEye 필드 index 와 이름
+MARKETEYE_FIELDS = [20, 21, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90, 91, 92,
+                    93, 94, 96, 97, 98, 99, 100, 101, 102, 103, 104, 105, 106, 107, 108, 109, 110, 116, 118, 120, 123, 124, 125, 127, 156]
+MARKETEYE_KEYS = ['총상장주식수', '외국인보유비율', 'PER', '시간외매수잔량', '시간외매도잔량', 'EPS', '자본금', '액면가', '배당률', '배당수익률', '부채비율', '유보율', '자기자본이익률', '매출액증가율', '경상이익증가율', '순이익증가율', '투자심리', 'VR', '5일회전율', '4일종가합', '9일종가합', '매출액', '경상이익', '당기순이익', 'BPS', '영업이익증가율', '영업이익', '매출액영업이익률', '매출액경상이익률',
+                  '이자보상비율', '분기BPS', '분기매출액증가율', '분기영업이액증가율', '분기경상이익증가율', '분기순이익증가율', '분기매출액', '분기영업이익', '분기경상이익', '분기당기순이익', '분개매출액영업이익률', '분기매출액경상이익률', '분기ROE', '분기이자보상비율', '분기유보율', '분기부채비율', '프로그램순매수', '당일외국인순매수', '당일기관순매수', 'SPS', 'CFPS', 'EBITDA', '공매도수량', '당일개인순매수']
+
+# 한 번의 MarketEye 요청으로 조회 가능한 최대 종목 수
+MARKETEYE_MAX_CODES = 200
+
+# 차트 필드별 numpy dtype
+CHART_DTYPES = {
+    'date': np.int64,
+    'time': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'diff': np.float64,
+    'volume': np.int64,
+    'price': np.int64,
+    'diffsign': np.uint32,
+}
+
+
+# StockCur 헤더 index 와 이름
+STOCKCUR_FIELDS = [
+    (0, 'code'),
+    (1, 'name'),
+    (2, 'diffratio'),
+    (3, 'timestamp'),  # 시간 형태 확인 필요
+    (4, 'price_open'),
+    (5, 'price_high'),
+    (6, 'price_low'),
+    (7, 'bid_sell'),
+    (8, 'bid_buy'),
+    (9, 'cum_volume'),  # 주, 거래소지수: 천주
+    (10, 'cum_trans'),
+    (13, 'price'),
+    (14, 'contract_type'),
+    (15, 'cum_sellamount'),
+    (16, 'buy_sellamount'),
+    (17, 'contract_amount'),
+    (18, 'second'),
+    (19, 'price_type'),  # 1: 동시호가시간 예상체결가, 2: 장중 체결가
+    (20, 'market_flag'),  # '1': 장전예상체결, '2': 장중, '4': 장후시간외, '5': 장후예상체결
+    (21, 'premarket_volume'),
+    (22, 'diffsign'),
+    (23, 'LP보유수량'),
+    (24, 'LP보유수량대비'),
+    (25, 'LP보유율'),
+    (26, '체결상태(호가방식)'),
+    (27, '누적매도체결수량(호가방식)'),
+    (28, '누적매수체결수량(호가방식)'),
+]
+STOCKCUR_INDEXES = {k: i for i, k in STOCKCUR_FIELDS}
+# chr() 로 변환하는 필드
+STOCKCUR_CHAR_KEYS = ['price_type', 'market_flag', 'diffsign']
+
+
+# Creon(com=None) 일 때 사용할 COM 모듈 (Dispatch, WithEvents)
+DEFAULT_COM = win32com.client if win32com is not None else None
+
+
+class CreonRequestError(RuntimeError):
+    """
+    BlockRequest() 후 GetDibStatus() 가 0 이 아닐 때 (요청 제한 초과, 거부 등)
+    """
+    def __init__(self, status, msg):
+        super().__init__('request failed. status: {}, {}'.format(status, msg))
+        self.status = status
+        self.msg = msg
 
 
 class Creon:
-    def __init__(self, account_no=''):
-        self.obj_CpUtil_CpCybos = win32com.client.Dispatch('CpUtil.CpCybos')
-        self.obj_CpUtil_CpCodeMgr = win32com.client.Dispatch(
+    def __init__(self, account_no='', com=None):
+        """
+        com: win32com.client 와 같이 Dispatch(), WithEvents() 를 제공하는 객체
+            None 이면 DEFAULT_COM, 시뮬레이션에는 fakecom.FakeCOM() 사용
+        """
+        self.com = com if com is not None else DEFAULT_COM
+        if self.com is None:
+            raise ImportError('win32com is not available. use fakecom.FakeCOM() as com.')
+        self.obj_CpUtil_CpCybos = self.com.Dispatch('CpUtil.CpCybos')
+        self.obj_CpUtil_CpCodeMgr = self.com.Dispatch(
             'CpUtil.CpCodeMgr')
-        self.obj_CpSysDib_StockChart = win32com.client.Dispatch(
+        self.obj_CpSysDib_StockChart = self.com.Dispatch(
             'CpSysDib.StockChart')
-        self.obj_CpTrade_CpTdUtil = win32com.client.Dispatch(
+        self.obj_CpTrade_CpTdUtil = self.com.Dispatch(
             'CpTrade.CpTdUtil')
-        self.obj_CpSysDib_MarketEye = win32com.client.Dispatch(
+        self.obj_CpSysDib_MarketEye = self.com.Dispatch(
             'CpSysDib.MarketEye')
-        self.obj_CpSysDib_CpSvr7238 = win32com.client.Dispatch(
+        self.obj_CpSysDib_CpSvr7238 = self.com.Dispatch(
             'CpSysDib.CpSvr7238')
-        self.obj_CpTrade_CpTdNew5331B = win32com.client.Dispatch(
+        self.obj_CpTrade_CpTdNew5331B = self.com.Dispatch(
             'CpTrade.CpTdNew5331B')
-        self.obj_CpTrade_CpTdNew5331A = win32com.client.Dispatch(
+        self.obj_CpTrade_CpTdNew5331A = self.com.Dispatch(
             'CpTrade.CpTdNew5331A')
-        self.obj_CpSysDib_CpSvr7254 = win32com.client.Dispatch(
+        self.obj_CpSysDib_CpSvr7254 = self.com.Dispatch(
             'CpSysDib.CpSvr7254')
-        self.obj_CpSysDib_CpSvr8548 = win32com.client.Dispatch(
+        self.obj_CpSysDib_CpSvr8548 = self.com.Dispatch(
             'CpSysDib.CpSvr8548')
-        self.obj_CpTrade_CpTd0311 = win32com.client.Dispatch(
+        self.obj_CpTrade_CpTd0311 = self.com.Dispatch(
             'CpTrade.CpTd0311')
-        self.obj_CpTrade_CpTd5341 = win32com.client.Dispatch(
+        self.obj_CpTrade_CpTd5341 = self.com.Dispatch(
             'CpTrade.CpTd5341')
-        self.obj_CpTrade_CpTd6033 = win32com.client.Dispatch(
+        self.obj_CpTrade_CpTd6033 = self.com.Dispatch(
             'CpTrade.CpTd6033')
-        self.obj_Dscbo1_CpConclusion = win32com.client.Dispatch(
+        self.obj_Dscbo1_CpConclusion = self.com.Dispatch(
             'CpTrade.CpTd6033')
 
         # contexts
         self.stockcur_handlers = {}  # 주식/업종/ELW시세 subscribe event handlers
+        self.stockcur_args = {}  # code -> (cb, raw, fields), 재접속 후 다시 구독할 때 사용
+        self.stockcur_events = {}  # code -> 이벤트 핸들러, 같은 종목을 다시 구독하면 콜백을 붙인다
+        self.stockcur_cbs = {}  # code -> [구독자마다 cb (없으면 None)]
         self.orderevent_handler = None
+        self.orderevent_cb = None
+
+        # 주문 장부 (enable_order_book() 로 설정)
+        self.order_book = None
+
+        # COM 스레드에서 호출을 실행하는 함수, 다른 스레드에서 COM 을 부를 때 사용 (CreonProxy 가 ComWorker.call 로 설정)
+        self.com_call = None
+
+        # 기다리는 동안 메시지를 펌프하는 함수 pump(seconds), 요청 제한 대기나 연속조회 페이지 사이에 실시간 이벤트를 처리
+        # (CreonProxy 가 ComWorker.pump 로 설정)
+        self.pump = None
+
+        # 계좌 정보와 주문 객체 캐시
+        self.trade_session = TradeSession(self.com, self.obj_CpTrade_CpTdUtil)
+
+        # 응답을 기다리지 않는 주문 (order_async() 에서 만든다)
+        self.async_orderer = None
+
+        # 연결 상태 감시 (enable_connection_monitor() 로 설정)
+        self.connection_monitor = None
+
+        # 마지막 connect()/reconnect() 의 단계별 소요 시간(초)
+        self.reconnect_timings = {}
+
+        # 요청 제한
+        self.limiter = ratelimit.RateLimiter(self.get_limit_remain, sleep=self.sleep)
+
+        # 차트 캐시 (set_chart_cache() 로 설정)
+        self.chart_cache = None
+
+        # 종목 정보 스냅샷 (enable_symbol_master() 로 설정)
+        self.symbol_master = None
+
+        # 실시간 틱 버퍼 (enable_tick_store() 로 설정)
+        self.tick_store = None
 
     def connect(self, id_, pwd, pwdcert, trycnt=300):
+        """
+        연결되어 있지 않으면 크레온을 다시 시작하고 연결될 때까지 최대 trycnt 초 기다린다
+        """
         print("try connect!")
-        if not self.connected():
-            print("not connected")
-            self.disconnect()
-            self.kill_client()
-            app = application.Application()
-            print("app start")
-            app.start(
-                'C:\\CREON\\STARTER\\coStarter.exe /prj:cp /id:{id} /pwd:{pwd} /pwdcert:{pwdcert} /autostart'.format(
-                    id=id_, pwd=pwd, pwdcert=pwdcert
-                )
-            )
-            print("app start")
-        else:
-            print("already connected!")
-
-        cnt = 0
-        while not self.connected():
-            print("trycnt:", cnt)
-            if cnt > trycnt:
-                return False
-            time.sleep(1)
-            cnt += 1
-        return True
+        reconnector = Reconnector(self, id_, pwd, pwdcert, timeout=trycnt)
+        ok = reconnector.run(force=False)
+        self.reconnect_timings = reconnector.timings
+        return ok
+
+    def reconnect(self, id_, pwd, pwdcert, timeout=300):
+        """
+        연결 여부와 관계없이 크레온을 다시 시작하고 주문 초기화와 실시간 구독을 되돌린다
+        단계별 소요 시간은 self.reconnect_timings
+        """
+        reconnector = Reconnector(self, id_, pwd, pwdcert, timeout=timeout)
+        ok = reconnector.run(force=True)
+        self.reconnect_timings = reconnector.timings
+        return ok
+
+    def enable_connection_monitor(self, interval=0.5, on_change=None):
+        """
+        연결 상태를 백그라운드에서 확인해 두고 connected() 는 그 값을 바로 반환
+        on_change(connected): 연결 상태가 바뀔 때 호출
+        """
+        if self.connection_monitor is None:
+            self.connection_monitor = ConnectionMonitor(self.com, interval=interval, on_change=on_change)
+        elif on_change is not None:
+            self.connection_monitor.add_listener(on_change)
+        return self.connection_monitor.start()
 
     def connected(self):
+        monitor = self.connection_monitor
+        if monitor is not None and monitor.running:
+            return monitor.connected()
+        if win32com is None or self.com is not win32com.client:
+            # 시뮬레이터에는 크레온 프로세스가 없으므로 IsConnect 만 확인
+            return self.obj_CpUtil_CpCybos.IsConnect != 0
         tasklist = subprocess.check_output('TASKLIST')
         if b"DibServer.exe" in tasklist and b"CpStart.exe" in tasklist:
             return self.obj_CpUtil_CpCybos.IsConnect != 0
@@ -90,6 +248,7 @@ class Creon:
         os.system('wmic process where "name like \'%DibServer%\'" call terminate')
 
     def disconnect(self):
+        self.trade_session.invalidate()
         plist = [
             'coStarter',
             'CpStart',
@@ -100,22 +259,38 @@ class Creon:
                 'wmic process where "name like \'%{}%\'" call terminate'.format(p))
         return True
 
-    def wait(self):
-        remain_time = self.obj_CpUtil_CpCybos.LimitRequestRemainTime
-        remain_count = self.obj_CpUtil_CpCybos.GetLimitRemainCount(1)
-        if remain_count <= 3:
-            time.sleep(remain_time / 1000)
+    def get_limit_remain(self, limit_type):
+        """
+        limit_type: 0: 주문/계좌, 1: 시세 조회, 2: 실시간 구독
+        return (남은 요청 개수, 요청 제한이 풀리기까지 남은 시간(ms))
+        """
+        return (
+            self.obj_CpUtil_CpCybos.GetLimitRemainCount(limit_type),
+            self.obj_CpUtil_CpCybos.LimitRequestRemainTime,
+        )
+
+    def wait(self, limit_type=constants.LT_NONTRADE_REQUEST):
+        self.limiter.wait(limit_type)
 
-    def request(self, obj, data_fields, header_fields=None, cntidx=0, n=None):
+    def iter_request(self, obj, data_fields, cntidx=0, n=None,
+                     limit_type=constants.LT_NONTRADE_REQUEST, columnar=False, dtypes=None, stop=None):
+        """
+        연속조회 페이지를 받는 대로 하나씩 반환
+        크레온은 최신 데이터부터 내려주므로 페이지는 최신->과거 순, 페이지 안은 과거->최신 순
+        n: 누적 개수가 n 이상이면 다음 페이지를 요청하지 않음
+        stop(page): True 를 반환하면 다음 페이지를 요청하지 않음 (예: 날짜가 기준일 이전)
+        요청이 실패하면 CreonRequestError
+        """
         def process():
+            self.limiter.acquire(limit_type)
             obj.BlockRequest()
 
-            status = obj.GetDibStatus()
-            msg = obj.GetDibMsg1()
-            if status != 0:
-                return None
+            # 실패를 데이터 끝과 구분할 수 있도록 예외로 알린다
+            self.check_status(obj)
 
             cnt = obj.GetHeaderValue(cntidx)
+            if columnar:
+                return read_page(obj, data_fields, cnt, dtypes=dtypes)
             data = []
             for i in range(cnt):
                 dict_item = {k: obj.GetDataValue(
@@ -124,16 +299,56 @@ class Creon:
             return data
 
         # 연속조회 처리
-        data = process()
-        while obj.Continue:
-            self.wait()
+        len_data = 0
+        while True:
             _data = process()
-            if len(_data) > 0:
-                data = _data + data
-                if n is not None and n <= len(data):
-                    break
-            else:
-                break
+            if not _data:
+                return
+            # 페이지를 넘긴 뒤에 같은 객체로 다른 조회를 할 수 있으므로 연속 여부를 먼저 읽어 둔다
+            cont = obj.Continue
+            len_data += len(_data)
+            yield _data
+            if not cont or (n is not None and n <= len_data):
+                return
+            if stop is not None and stop(_data):
+                return
+            if self.pump is not None:
+                # 다음 페이지를 요청하기 전에 쌓인 실시간 이벤트를 처리
+                self.pump()
+
+    def sleep(self, seconds):
+        """
+        seconds 동안 기다린다, pump 가 있으면 기다리는 동안 메시지를 펌프
+        """
+        if self.pump is None:
+            time.sleep(seconds)
+        else:
+            self.pump(seconds)
+
+    def check_status(self, obj):
+        """
+        BlockRequest() 후 GetDibStatus() 가 0 이 아니면 CreonRequestError
+        """
+        status = obj.GetDibStatus()
+        if status != 0:
+            raise CreonRequestError(status, obj.GetDibMsg1())
+
+    def request(self, obj, data_fields, header_fields=None, cntidx=0, n=None,
+                limit_type=constants.LT_NONTRADE_REQUEST, columnar=False, dtypes=None):
+        """
+        columnar: True 이면 'data' 로 필드별 numpy 배열을 담은 ColumnarResult 반환
+        dtypes: columnar 모드에서 필드별 numpy dtype
+        """
+        # 다음 페이지가 더 과거 데이터이므로 페이지를 모아 두었다가 마지막에 한 번만 이어 붙인다
+        pages = list(self.iter_request(
+            obj, data_fields, cntidx=cntidx, n=n, limit_type=limit_type,
+            columnar=columnar, dtypes=dtypes))
+
+        if columnar:
+            data = ColumnarResult.concat(
+                pages[::-1], keys=list(data_fields.values()), dtypes=dtypes)
+        else:
+            data = [dict_item for _data in pages[::-1] for dict_item in _data]
 
         result = {'data': data}
         if header_fields is not None:
@@ -158,6 +373,17 @@ class Creon:
         res = self.obj_CpUtil_CpCodeMgr.GetStockListByMarket(code)
         return res
 
+    def enable_symbol_master(self, path=None):
+        """
+        CpCodeMgr 항목을 하루 한 번 스냅샷으로 떠서 get_stockfeatures() 에 사용
+        path: 스냅샷 저장 경로 (npz)
+        바로 불러오거나 만들고, CreonProxy 를 쓰면 백그라운드에서 만들고 날짜가 바뀔 때마다 다시 만든다
+        """
+        if self.symbol_master is not None:
+            self.symbol_master.stop()
+        self.symbol_master = SymbolMaster(self, path=path, call=self.com_call)
+        return self.symbol_master.start()
+
     def get_stockstatus(self, code):
         """
         code 에해당하는주식상태를반환한다
@@ -183,72 +409,201 @@ class Creon:
         """
         if not code.startswith('A'):
             code = 'A' + code
+        # 장중 거래정지/경고 지정이 바로 보이도록 하루 스냅샷(symbol_master)이 아닌 CpCodeMgr 에서 읽는다
         return {
             'control': self.obj_CpUtil_CpCodeMgr.GetStockControlKind(code),
             'supervision': self.obj_CpUtil_CpCodeMgr.GetStockSupervisionKind(code),
             'status': self.obj_CpUtil_CpCodeMgr.GetStockStatusKind(code),
         }
 
+    def get_stock_item(self, code):
+        """
+        종목의 CpCodeMgr 항목 dict, symbol_master 스냅샷에 있으면 스냅샷에서, 없으면 CpCodeMgr 에서 읽는다
+        get_stockfeatures(), get_stockfeatures_many() 에서 MarketEye 결과와 합칠 기본 dict
+        """
+        if not code.startswith('A'):
+            code = 'A' + code
+        stock = None
+        if self.symbol_master is not None:
+            stock = self.symbol_master.get(code)
+        if stock is None:
+            stock = get_codemgr_item(self.obj_CpUtil_CpCodeMgr, code)
+        return stock
+
     def get_stockfeatures(self, code):
         """
         https://money2.creontrade.com/e5/mboard/ptype_basic/HTS_Plus_Helper/DW_Basic_Read_Page.aspx?boardseq=284&seq=11&page=1&searchString=%EA%B1%B0%EB%9E%98%EC%A0%95%EC%A7%80&p=8841&v=8643&m=9505
         """
         if not code.startswith('A'):
             code = 'A' + code
-        stock = {
-            'name': self.obj_CpUtil_CpCodeMgr.CodeToName(code),
-            'marginrate': self.obj_CpUtil_CpCodeMgr.GetStockMarginRate(code),
-            'unit': self.obj_CpUtil_CpCodeMgr.GetStockMemeMin(code),
-            'industry': self.obj_CpUtil_CpCodeMgr.GetStockIndustryCode(code),
-            'market': self.obj_CpUtil_CpCodeMgr.GetStockMarketKind(code),
-            'control': self.obj_CpUtil_CpCodeMgr.GetStockControlKind(code),
-            'supervision': self.obj_CpUtil_CpCodeMgr.GetStockSupervisionKind(code),
-            'status': self.obj_CpUtil_CpCodeMgr.GetStockStatusKind(code),
-            'capital': self.obj_CpUtil_CpCodeMgr.GetStockCapital(code),
-            'fiscalmonth': self.obj_CpUtil_CpCodeMgr.GetStockFiscalMonth(code),
-            'groupcode': self.obj_CpUtil_CpCodeMgr.GetStockGroupCode(code),
-            'kospi200kind': self.obj_CpUtil_CpCodeMgr.GetStockKospi200Kind(code),
-            'section': self.obj_CpUtil_CpCodeMgr.GetStockSectionKind(code),
-            'off': self.obj_CpUtil_CpCodeMgr.GetStockLacKind(code),
-            'listeddate': self.obj_CpUtil_CpCodeMgr.GetStockListedDate(code),
-            'maxprice': self.obj_CpUtil_CpCodeMgr.GetStockMaxPrice(code),
-            'minprice': self.obj_CpUtil_CpCodeMgr.GetStockMinPrice(code),
-            'ydopen': self.obj_CpUtil_CpCodeMgr.GetStockYdOpenPrice(code),
-            'ydhigh': self.obj_CpUtil_CpCodeMgr.GetStockYdHighPrice(code),
-            'ydlow': self.obj_CpUtil_CpCodeMgr.GetStockYdLowPrice(code),
-            'ydclose': self.obj_CpUtil_CpCodeMgr.GetStockYdClosePrice(code),
-            'creditenabled': self.obj_CpUtil_CpCodeMgr.IsStockCreditEnable(code),
-            'parpricechangetype': self.obj_CpUtil_CpCodeMgr.GetStockParPriceChageType(code),
-            'spac': self.obj_CpUtil_CpCodeMgr.IsSPAC(code),
-            'biglisting': self.obj_CpUtil_CpCodeMgr.IsBigListingStock(code),
-            'groupname': self.obj_CpUtil_CpCodeMgr.GetGroupName(code),
-            'industryname': self.obj_CpUtil_CpCodeMgr.GetIndustryName(code),
-            'membername': self.obj_CpUtil_CpCodeMgr.GetMemberName(code),
-        }
+        stock = self.get_stock_item(code)
 
-        _fields = [20, 21, 67, 68, 69, 70, 71, 72, 73, 74, 75, 76, 77, 78, 79, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89, 90, 91, 92,
-                   93, 94, 96, 97, 98, 99, 100, 101, 102, 103, 104, 105, 106, 107, 108, 109, 110, 116, 118, 120, 123, 124, 125, 127, 156]
-        _keys = ['총상장주식수', '외국인보유비율', 'PER', '시간외매수잔량', '시간외매도잔량', 'EPS', '자본금', '액면가', '배당률', '배당수익률', '부채비율', '유보율', '자기자본이익률', '매출액증가율', '경상이익증가율', '순이익증가율', '투자심리', 'VR', '5일회전율', '4일종가합', '9일종가합', '매출액', '경상이익', '당기순이익', 'BPS', '영업이익증가율', '영업이익', '매출액영업이익률', '매출액경상이익률',
-                 '이자보상비율', '분기BPS', '분기매출액증가율', '분기영업이액증가율', '분기경상이익증가율', '분기순이익증가율', '분기매출액', '분기영업이익', '분기경상이익', '분기당기순이익', '분개매출액영업이익률', '분기매출액경상이익률', '분기ROE', '분기이자보상비율', '분기유보율', '분기부채비율', '프로그램순매수', '당일외국인순매수', '당일기관순매수', 'SPS', 'CFPS', 'EBITDA', '공매도수량', '당일개인순매수']
-        self.obj_CpSysDib_MarketEye.SetInputValue(0, _fields)
+        self.obj_CpSysDib_MarketEye.SetInputValue(0, MARKETEYE_FIELDS)
         self.obj_CpSysDib_MarketEye.SetInputValue(1, code)
+        self.limiter.acquire(constants.LT_NONTRADE_REQUEST)
         self.obj_CpSysDib_MarketEye.BlockRequest()
+        self.check_status(self.obj_CpSysDib_MarketEye)
 
         cnt_field = self.obj_CpSysDib_MarketEye.GetHeaderValue(0)
         if cnt_field > 0:
             for i in range(cnt_field):
-                stock[_keys[i]] = self.obj_CpSysDib_MarketEye.GetDataValue(
+                stock[MARKETEYE_KEYS[i]] = self.obj_CpSysDib_MarketEye.GetDataValue(
                     i, 0)
         return stock
 
-    def get_chart(self, code, target='A', unit='D', n=None, date_from=None, date_to=None):
+    def get_stockfeatures_bulk(self, codes, fields=None, as_frame=False):
+        """
+        MarketEye 한 번에 최대 MARKETEYE_MAX_CODES 종목씩 묶어서 조회
+        fields: MARKETEYE_KEYS 중 조회할 항목, None 이면 전체
+        return <ColumnarResult> 'code' 와 요청 항목별 열, as_frame 이면 code 를 index 로 하는 DataFrame
+        요청이 실패하면 CreonRequestError
+        """
+        key2field = dict(zip(MARKETEYE_KEYS, MARKETEYE_FIELDS))
+        if fields is None:
+            fields = MARKETEYE_KEYS
+        # MarketEye 는 필드 index 오름차순으로 결과를 돌려준다
+        _fields = sorted(set([0] + [key2field[k] for k in fields]))  # 0: 종목코드
+        field2key = dict(zip(MARKETEYE_FIELDS, MARKETEYE_KEYS))
+        field2key[0] = 'code'
+        _keys = [field2key[f] for f in _fields]
+
+        codes = [code if code.startswith('A') else 'A' + code for code in codes]
+        pages = []
+        for i in range(0, len(codes), MARKETEYE_MAX_CODES):
+            if i > 0 and self.pump is not None:
+                # 다음 묶음을 요청하기 전에 쌓인 실시간 이벤트를 처리
+                self.pump()
+            self.obj_CpSysDib_MarketEye.SetInputValue(0, _fields)
+            self.obj_CpSysDib_MarketEye.SetInputValue(1, codes[i:i+MARKETEYE_MAX_CODES])
+            self.limiter.acquire(constants.LT_NONTRADE_REQUEST)
+            self.obj_CpSysDib_MarketEye.BlockRequest()
+            # 실패한 묶음을 빼고 돌려주면 데이터가 없는 종목과 구분할 수 없으므로 예외로 알린다
+            self.check_status(self.obj_CpSysDib_MarketEye)
+
+            cnt_field = self.obj_CpSysDib_MarketEye.GetHeaderValue(0)
+            cnt_code = self.obj_CpSysDib_MarketEye.GetHeaderValue(2)
+            pages.append(ColumnarResult({
+                _keys[j]: np.array([self.obj_CpSysDib_MarketEye.GetDataValue(j, k) for k in range(cnt_code)])
+                for j in range(cnt_field)
+            }, keys=_keys[:cnt_field]))
+
+        result = ColumnarResult.concat(pages, keys=_keys)
+        result['code'] = np.array([code[1:] for code in result['code'].tolist()], dtype=str)
+        if as_frame:
+            return result.to_frame().set_index('code')
+        return result
+
+    def get_stockfeatures_many(self, codes):
+        """
+        get_stockfeatures() 를 여러 종목에 대해, MarketEye 는 get_stockfeatures_bulk() 로 묶어서 조회
+        return {code: get_stockfeatures() 와 같은 dict}, MarketEye 가 돌려주지 않은 종목은 빠진다
+        요청이 실패하면 CreonRequestError
+        """
+        codes = [code[1:] if code.startswith('A') else code for code in codes]
+        result = {}
+        for row in self.get_stockfeatures_bulk(codes).to_dicts():
+            code = row.pop('code')
+            stock = self.get_stock_item(code)
+            stock.update(row)
+            result[code] = stock
+        return result
+
+    def set_chart_cache(self, backend):
+        """
+        backend: chartcache.ChartCacheBackend, None 이면 캐시를 쓰지 않음
+        """
+        self.chart_cache = ChartCache(backend) if backend is not None else None
+
+    def get_chart(self, code, target='A', unit='D', n=None, date_from=None, date_to=None, as_frame=False,
+                  use_cache=False):
         """
         https://money2.creontrade.com/e5/mboard/ptype_basic/HTS_Plus_Helper/DW_Basic_Read_Page.aspx?boardseq=284&seq=102&page=1&searchString=StockChart&p=8841&v=8643&m=9505
         "전일대비"는 제공하지 않으므로 직접 계산해야 함
         target: 'A', 'U' == 종목, 업종
         unit: 'D', 'W', 'M', 'm', 'T' == day, week, month, min, tick
+        as_frame: True 이면 형 변환과 diffratio 계산을 벡터 연산으로 처리한 pandas DataFrame 반환
+        use_cache: True 이면 차트 캐시에 없는 구간만 조회 (틱 제외)
         return <dict>dict_chart
         """
+        if use_cache and self.chart_cache is not None and unit != 'T':
+            result = self.chart_cache.fetch(
+                self, code, target=target, unit=unit, n=n, date_from=date_from, date_to=date_to)
+            return result.to_frame() if as_frame else result.to_dicts()
+
+        if as_frame:
+            return self.get_chart_columns(
+                code, target=target, unit=unit, n=n, date_from=date_from, date_to=date_to).to_frame()
+
+        data_fields = self.set_chart_inputs(code, target, unit, n, date_from, date_to)
+        result = self.request(self.obj_CpSysDib_StockChart, data_fields, cntidx=3, n=n)
+        result = result['data']
+        for dict_item in result:
+            dict_item['code'] = code
+
+            # type conversion
+            dict_item['diffsign'] = chr(dict_item['diffsign'])
+            for k in ['open', 'high', 'low', 'close', 'diff']:
+                dict_item[k] = float(dict_item[k])
+            for k in ['volume', 'price']:
+                dict_item[k] = int(dict_item[k])
+
+            # additional fields
+            dict_item['diffratio'] = (
+                dict_item['diff'] / (dict_item['close'] - dict_item['diff'])) * 100
+
+        return result
+
+    def get_chart_columns(self, code, target='A', unit='D', n=None, date_from=None, date_to=None):
+        """
+        get_chart() 와 같은 필드를 필드별 numpy 배열로 반환
+        return <ColumnarResult>
+        """
+        data_fields = self.set_chart_inputs(code, target, unit, n, date_from, date_to)
+        result = self.request(self.obj_CpSysDib_StockChart, data_fields, cntidx=3, n=n,
+                              columnar=True, dtypes=CHART_DTYPES)
+        return self.convert_chart_columns(result['data'], code)
+
+    def iter_chart(self, code, target='A', unit='D', n=None, date_from=None, date_to=None,
+                   stop=None, as_frame=False):
+        """
+        get_chart_columns() 결과를 페이지 단위로 받는 대로 반환 (최신 페이지부터)
+        stop(page): True 를 반환하면 다음 페이지를 요청하지 않음
+            예: stop=lambda page: page['date'][0] < 20200101
+        as_frame: True 이면 페이지를 pandas DataFrame 으로 반환
+        """
+        data_fields = self.set_chart_inputs(code, target, unit, n, date_from, date_to)
+        for page in self.iter_request(self.obj_CpSysDib_StockChart, data_fields, cntidx=3, n=n,
+                                      columnar=True, dtypes=CHART_DTYPES):
+            page = self.convert_chart_columns(page, code)
+            if as_frame:
+                page = page.to_frame()
+            yield page
+            if stop is not None and stop(page):
+                return
+
+    def backfill_minutes(self, codes, date_from, date_to=None, root='minutes', span_days=90, writers=2,
+                         stop_on_empty=True):
+        """
+        분봉을 span_days 일 단위로 연속조회하여 종목별 append-only 파일(backfill.MinuteStore)에 저장
+        이미 받은 날짜 이후부터 이어 받는다
+        stop_on_empty: 거래정지 중이 아닌데 봉이 없는 구간이 나오면 그 종목은 멈춘다, False 이면 계속 받는다
+        return {code: 조회한 구간 수}
+        """
+        backfill = MinuteBackfill(self, root=root, span_days=span_days, writers=writers,
+                                  stop_on_empty=stop_on_empty)
+        return backfill.run(codes, date_from, date_to)
+
+    def convert_chart_columns(self, result, code):
+        result['diffsign'] = chr_array(result['diffsign'])
+        result['code'] = np.full(len(result), code)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['diffratio'] = (result['diff'] / (result['close'] - result['diff'])) * 100
+        return result
+
+    def set_chart_inputs(self, code, target, unit, n, date_from, date_to):
+        """
+        StockChart 입력값을 설정하고 요청할 필드 {index: key} 를 반환
+        """
         _fields = []
         _keys = []
         if unit == 'm':
@@ -281,29 +636,12 @@ class Creon:
         self.obj_CpSysDib_StockChart.SetInputValue(6, ord(unit))
         self.obj_CpSysDib_StockChart.SetInputValue(
             9, ord('1'))  # 0: 무수정주가, 1: 수정주가
+        return dict(zip(range(len(_keys)), _keys))
 
-        result = self.request(self.obj_CpSysDib_StockChart, dict(
-            zip(range(len(_keys)), _keys)), cntidx=3, n=n)
-        result = result['data']
-        for dict_item in result:
-            dict_item['code'] = code
-
-            # type conversion
-            dict_item['diffsign'] = chr(dict_item['diffsign'])
-            for k in ['open', 'high', 'low', 'close', 'diff']:
-                dict_item[k] = float(dict_item[k])
-            for k in ['volume', 'price']:
-                dict_item[k] = int(dict_item[k])
-
-            # additional fields
-            dict_item['diffratio'] = (
-                dict_item['diff'] / (dict_item['close'] - dict_item['diff'])) * 100
-
-        return result
-
-    def get_shortstockselling(self, code, n=None):
+    def get_shortstockselling(self, code, n=None, as_frame=False):
         """
         종목별공매도추이
+        as_frame: True 이면 pandas DataFrame 으로 반환
         """
         _keys = ['date', 'close', 'diff', 'diffratio', 'volume', 'short_volume',
                  'short_ratio', 'short_amount', 'avg_price', 'avg_price_ratio']
@@ -311,8 +649,11 @@ class Creon:
         self.obj_CpSysDib_CpSvr7238.SetInputValue(0, 'A'+code)
 
         result = self.request(self.obj_CpSysDib_CpSvr7238, dict(
-            zip(range(len(_keys)), _keys)), n=n)
+            zip(range(len(_keys)), _keys)), n=n, columnar=as_frame)
         result = result['data']
+        if as_frame:
+            result['code'] = np.full(len(result), code)
+            return result.to_frame()
         for dict_item in result:
             dict_item['code'] = code
 
@@ -322,29 +663,32 @@ class Creon:
         """
         보유종목
         """
-        self.obj_CpTrade_CpTdUtil.TradeInit()
-        self.obj_CpTrade_CpTdNew5331B.SetInputValue(0, account)
-        self.obj_CpTrade_CpTdNew5331B.SetInputValue(
-            3, ord('1'))  # 1: 주식, 2: 채권
-        self.obj_CpTrade_CpTdNew5331B.BlockRequest()
-        cnt = self.obj_CpTrade_CpTdNew5331B.GetHeaderValue(0)
-        res = []
-        for i in range(cnt):
-            item = {
-                'code': self.obj_CpTrade_CpTdNew5331B.GetDataValue(0, i),
-                'name': self.obj_CpTrade_CpTdNew5331B.GetDataValue(1, i),
-                'holdnum': self.obj_CpTrade_CpTdNew5331B.GetDataValue(6, i),
-                'buy_yesterday': self.obj_CpTrade_CpTdNew5331B.GetDataValue(7, i),
-                'sell_yesterday': self.obj_CpTrade_CpTdNew5331B.GetDataValue(8, i),
-                'buy_today': self.obj_CpTrade_CpTdNew5331B.GetDataValue(10, i),
-                'sell_today': self.obj_CpTrade_CpTdNew5331B.GetDataValue(11, i),
-            }
-            res.append(item)
+        with self.trade_request():
+            self.obj_CpTrade_CpTdNew5331B.SetInputValue(0, account)
+            self.obj_CpTrade_CpTdNew5331B.SetInputValue(
+                3, ord('1'))  # 1: 주식, 2: 채권
+            self.limiter.acquire(constants.LT_TRADE_REQUEST)
+            self.obj_CpTrade_CpTdNew5331B.BlockRequest()
+            self.check_status(self.obj_CpTrade_CpTdNew5331B)
+            cnt = self.obj_CpTrade_CpTdNew5331B.GetHeaderValue(0)
+            res = []
+            for i in range(cnt):
+                item = {
+                    'code': self.obj_CpTrade_CpTdNew5331B.GetDataValue(0, i),
+                    'name': self.obj_CpTrade_CpTdNew5331B.GetDataValue(1, i),
+                    'holdnum': self.obj_CpTrade_CpTdNew5331B.GetDataValue(6, i),
+                    'buy_yesterday': self.obj_CpTrade_CpTdNew5331B.GetDataValue(7, i),
+                    'sell_yesterday': self.obj_CpTrade_CpTdNew5331B.GetDataValue(8, i),
+                    'buy_today': self.obj_CpTrade_CpTdNew5331B.GetDataValue(10, i),
+                    'sell_today': self.obj_CpTrade_CpTdNew5331B.GetDataValue(11, i),
+                }
+                res.append(item)
         return res
 
-    def get_investorbuysell(self, code, n=None):
+    def get_investorbuysell(self, code, n=None, as_frame=False):
         """
         투자자별 매매동향
+        as_frame: True 이면 pandas DataFrame 으로 반환
         """
         _keys = ['date', 'ind', 'foreign', 'inst', 'fin', 'ins', 'trust', 'bank', 'fin_etc', 'fund', 'corp',
                  'foreign_etc', 'private_fund', 'country', 'close', 'diff', 'diffratio', 'volume', 'confirm']
@@ -357,8 +701,12 @@ class Creon:
             6, ord('1'))  # '1': 순매수량, '2': 추정금액(백만원)
 
         result = self.request(self.obj_CpSysDib_CpSvr7254, dict(
-            zip(range(len(_keys)), _keys)), cntidx=1, n=n)
+            zip(range(len(_keys)), _keys)), cntidx=1, n=n, columnar=as_frame)
         result = result['data']
+        if as_frame:
+            result['code'] = np.full(len(result), code)
+            result['confirm'] = chr_array(result['confirm'])
+            return result.to_frame()
         for dict_item in result:
             dict_item['code'] = code
             dict_item['confirm'] = chr(dict_item['confirm'])
@@ -408,26 +756,99 @@ class Creon:
 
         return result
 
-    def subscribe_stockcur(self, code, cb):
+    def enable_tick_store(self, capacity=20000, fields=None):
+        """
+        subscribe_stockcur() 로 받는 틱을 종목별 numpy 링 버퍼(tickstore.TickRing)에 바로 쓴다
+        capacity: 종목당 보관할 틱 수
+        fields: 저장할 TICK_FIELDS 이름 목록 (subscribe_stockcur(fields=...) 와 같은 형식), None 이면 전부
+        """
+        self.tick_store = TickStore(capacity=capacity, fields=fields)
+        return self.tick_store
+
+    def subscribe_stockcur(self, code, cb=None, raw=False, fields=None):
+        """
+        cb: 틱마다 호출, tick_store 가 없으면 dict 를 넘긴다
+        raw: tick_store 가 있을 때 True 이면 dict 를 만들지 않고 cb(TickRing) 호출
+        fields: 틱마다 읽을 STOCKCUR_FIELDS 이름 목록
+            tick_store 가 없으면 cb 에 LazyTick 을 넘기고 나머지 필드는 콜백 안에서 접근할 때 읽는다
+            tick_store 가 있으면 링 버퍼에 이 필드만 저장하고, 링에 없는 필드를 요청하면 ValueError
+        return 구독 중이면 True, 구독 제한으로 실패하면 False
+        이미 구독 중인 종목이면 cb 를 기존 구독에 붙인다 (raw, fields 는 처음 구독한 것을 따른다)
+        같은 종목을 여러 콜백으로 받으려면 subscriptions.SubscriptionManager 사용
+        """
         # https://money2.creontrade.com/e5/mboard/ptype_basic/HTS_Plus_Helper/DW_Basic_Read_Page.aspx?boardseq=285&seq=16&page=3&searchString=%EC%8B%A4%EC%8B%9C%EA%B0%84&p=&v=&m=
         if not code.startswith('A'):
             code = 'A' + code
         if code in self.stockcur_handlers:
-            return
-        obj = win32com.client.Dispatch('DsCbo1.StockCur')
+            if self.tick_store is not None and fields is not None:
+                self.tick_store.ring(code).require(fields)
+            self.stockcur_cbs[code].append(cb)
+            self.update_stockcur_cb(code)
+            return True
+        if not self.limiter.try_acquire(constants.LT_SUBSCRIBE):
+            print('subscribe limit exceeded. {}'.format(code), file=sys.stderr)
+            return False
+        if self.tick_store is not None:
+            try:
+                ring = self.tick_store.ring(code, fields=fields)
+            except ValueError:
+                self.limiter.release(constants.LT_SUBSCRIBE)
+                raise
+        obj = self.com.Dispatch('DsCbo1.StockCur')
         obj.SetInputValue(0, code)
-        handler = win32com.client.WithEvents(obj, StockCurEventHandler)
-        handler.set_attrs(obj, cb)
+        if self.tick_store is not None:
+            handler = self.com.WithEvents(obj, TickStoreEventHandler)
+            handler.set_attrs(obj, cb)
+            handler.ring = ring
+            handler.raw = raw
+        else:
+            handler = self.com.WithEvents(obj, StockCurEventHandler)
+            handler.set_attrs(obj, cb)
+            handler.set_fields(fields)
         self.stockcur_handlers[code] = obj
+        self.stockcur_events[code] = handler
+        self.stockcur_args[code] = (cb, raw, fields)
+        # 재접속 후 다시 구독할 때는 구독자별 콜백으로 되돌린다
+        self.stockcur_cbs[code] = list(cb.cbs) if isinstance(cb, StockCurCallbacks) else [cb]
         obj.Subscribe()
+        return True
 
-    def unsubscribe_stockcur(self, code=None):
+    def update_stockcur_cb(self, code):
+        cbs = self.stockcur_cbs[code]
+        cb = cbs[0] if len(cbs) == 1 else StockCurCallbacks(cbs)
+        self.stockcur_events[code].cb = cb
+        _, raw, fields = self.stockcur_args[code]
+        self.stockcur_args[code] = (cb, raw, fields)
+
+    def drop_stockcur(self, code):
+        """
+        Unsubscribe() 를 부르지 않고 구독 객체를 버린다 (재접속으로 이미 끊긴 구독)
+        """
+        if not code.startswith('A'):
+            code = 'A' + code
+        if self.stockcur_handlers.pop(code, None) is not None:
+            self.stockcur_args.pop(code, None)
+            self.stockcur_events.pop(code, None)
+            self.stockcur_cbs.pop(code, None)
+            self.limiter.release(constants.LT_SUBSCRIBE)
+
+    def unsubscribe_stockcur(self, code=None, cb=None):
+        """
+        cb: 지정하면 이 콜백만 떼고 다른 구독자가 남아 있으면 구독을 유지
+        """
         lst_code = []
         if code is not None:
             if not code.startswith('A'):
                 code = 'A' + code
             if code not in self.stockcur_handlers:
                 return
+            if cb is not None:
+                cbs = self.stockcur_cbs[code]
+                if cb in cbs:
+                    cbs.remove(cb)
+                if cbs:
+                    self.update_stockcur_cb(code)
+                    return
             lst_code.append(code)
         else:
             lst_code = list(self.stockcur_handlers.keys()).copy()
@@ -435,13 +856,20 @@ class Creon:
             obj = self.stockcur_handlers[code]
             obj.Unsubscribe()
             del self.stockcur_handlers[code]
+            self.stockcur_args.pop(code, None)
+            self.stockcur_events.pop(code, None)
+            self.stockcur_cbs.pop(code, None)
+            self.limiter.release(constants.LT_SUBSCRIBE)
 
-    def subscribe_orderevent(self, cb):
+    def subscribe_orderevent(self, cb=None):
         # https://money2.creontrade.com/e5/mboard/ptype_basic/HTS_Plus_Helper/DW_Basic_Read_Page.aspx?boardseq=285&seq=16&page=3&searchString=%EC%8B%A4%EC%8B%9C%EA%B0%84&p=&v=&m=
-        obj = win32com.client.Dispatch('Dscbo1.CpConclusion')
-        handler = win32com.client.WithEvents(obj, OrderEventHandler)
+        self.unsubscribe_orderevent()
+        obj = self.com.Dispatch('Dscbo1.CpConclusion')
+        handler = self.com.WithEvents(obj, OrderEventHandler)
         handler.set_attrs(obj, cb)
+        handler.book = self.order_book
         self.orderevent_handler = obj
+        self.orderevent_cb = cb
         obj.Subscribe()
 
     def unsubscribe_orderevent(self):
@@ -449,32 +877,63 @@ class Creon:
             self.orderevent_handler.Unsubscribe()
             self.orderevent_handler = None
 
+    def enable_order_book(self, on_update=None, reconcile_interval=None):
+        """
+        주문 체결 실시간 이벤트로 주문 장부(self.order_book)를 갱신
+        reconcile_interval: 초, 지정하면 CpTd5341 과 주기적으로 대조 (놓친 이벤트 보정)
+        """
+        if self.order_book is None:
+            # 대조 스레드의 CpTd5341 조회도 COM 스레드에서 실행되도록 com_call 을 넘긴다
+            self.order_book = OrderBook(self, on_update=on_update, call=self.com_call)
+        elif on_update is not None:
+            self.order_book.on_update = on_update
+        self.subscribe_orderevent(self.orderevent_cb)
+        if reconcile_interval is not None:
+            self.order_book.start_reconcile(reconcile_interval)
+        return self.order_book
+
     def init_trade(self):
-        if self.obj_CpTrade_CpTdUtil.TradeInit(0) != 0:
-            print("TradeInit failed.", file=sys.stderr)
-            return
-        account_no = self.obj_CpTrade_CpTdUtil.AccountNumber[0]  # 계좌번호
-        account_gflags = self.obj_CpTrade_CpTdUtil.GoodsList(
-            account_no, 1)  # 주식상품 구분
-        return account_no, account_gflags
+        """
+        return (계좌번호, 상품구분 목록), 한 번 조회한 뒤에는 캐시, 실패하면 None
+        """
+        return self.trade_session.init()
+
+    @contextlib.contextmanager
+    def trade_request(self):
+        """
+        계좌 조회를 감싸서 (계좌번호, 상품구분 목록) 을 준다
+        TradeInit 이 실패하면 CreonRequestError, 안에서 조회가 실패하면 세션이 끊겼을 수 있으므로
+        invalidate() 하여 다음 조회에서 다시 초기화
+        """
+        init = self.trade_session.init()
+        if init is None:
+            self.trade_session.invalidate()
+            raise CreonRequestError(-1, 'TradeInit failed.')
+        try:
+            yield init
+        except Exception:
+            self.trade_session.invalidate()
+            raise
 
     def order(self, action, code, amount):
         if not code.startswith('A'):
             code = 'A' + code
-        account_no, account_gflags = self.init_trade()
-        self.obj_CpTrade_CpTd0311.SetInputValue(0, action)  # 1: 매도, 2: 매수
-        self.obj_CpTrade_CpTd0311.SetInputValue(1, account_no)  # 계좌번호
-        self.obj_CpTrade_CpTd0311.SetInputValue(2, account_gflags[0])  # 상품구분
-        self.obj_CpTrade_CpTd0311.SetInputValue(3, code)  # 종목코드
-        self.obj_CpTrade_CpTd0311.SetInputValue(4, amount)  # 매수수량
-        self.obj_CpTrade_CpTd0311.SetInputValue(8, '03')  # 시장가
-        result = self.obj_CpTrade_CpTd0311.BlockRequest()
+        obj = self.trade_session.order_obj(action)  # 매매구분, 계좌번호, 상품구분, 시장가
+        if obj is None:
+            return {'msg': 'TradeInit failed.', 'status': -1}
+        obj.SetInputValue(3, code)  # 종목코드
+        obj.SetInputValue(4, amount)  # 매수수량
+        self.limiter.acquire(constants.LT_TRADE_REQUEST)
+        result = obj.BlockRequest()
         if result != 0:
             print('order request failed.', file=sys.stderr)
-        status = self.obj_CpTrade_CpTd0311.GetDibStatus()
-        msg = self.obj_CpTrade_CpTd0311.GetDibMsg1()
+        status = obj.GetDibStatus()
+        msg = obj.GetDibMsg1()
         if status != 0:
             print('order failed. {}'.format(msg), file=sys.stderr)
+        if result != 0 or status != 0:
+            # 세션이 끊겼을 수 있으므로 다음 주문에서 다시 초기화
+            self.trade_session.invalidate()
         return {'msg': msg, 'status': status}
 
     def buy(self, code, amount):
@@ -483,37 +942,63 @@ class Creon:
     def sell(self, code, amount):
         return self.order('1', code, amount)
 
-    def get_trade_history(self):
-        account_no, account_gflags = self.init_trade()
-        self.obj_CpTrade_CpTd5341.SetInputValue(0, account_no)
-        self.obj_CpTrade_CpTd5341.SetInputValue(1, account_gflags[0])  # 상품구분
-
-        _fields = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
-                   11, 12, 13, 14, 16, 17, 18, 19, 22, 24]
-        _keys = [
-            '상품관리구분코드', '주문번호', '원주문번호', '종목코드', '종목이름',
-            '주문내용', '주문호가구분코드내용', '주문수량', '주문단가', '총체결수량',
-            '체결수량', '체결단가', '확인수량', '정정취소구분내용 ', '거부사유내용',
-            '채권매수일', '거래세과세구분내용', '현금신용대용구분내용', '주문입력매체코드내용',
-            '정정취소가능수량', '매매구분',
-        ]
+    def order_async(self, action, code, amount):
+        """
+        응답을 기다리지 않고 주문
+        return <asyncorder.OrderTicket> ticket.accepted 는 주문번호, ticket.done 은 주문이 끝난 뒤의 Order
+        """
+        if self.async_orderer is None:
+            self.async_orderer = AsyncOrderer(self)
+        return self.async_orderer.submit(action, code, amount)
 
-        result = self.request(self.obj_CpTrade_CpTd5341,
-                              dict(zip(_fields, _keys)), cntidx=6)
-        return result
+    def get_order_ticket(self, ticket_id):
+        """
+        order_async() 가 반환한 주문표를 번호로 다시 찾는다, 없으면 None
+        """
+        if self.async_orderer is None:
+            return None
+        return self.async_orderer.get(ticket_id)
+
+    def buy_async(self, code, amount):
+        return self.order_async('2', code, amount)
+
+    def sell_async(self, code, amount):
+        return self.order_async('1', code, amount)
+
+    def get_trade_history(self):
+        with self.trade_request() as (account_no, account_gflags):
+            self.obj_CpTrade_CpTd5341.SetInputValue(0, account_no)
+            self.obj_CpTrade_CpTd5341.SetInputValue(1, account_gflags[0])  # 상품구분
+
+            _fields = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
+                       11, 12, 13, 14, 16, 17, 18, 19, 22, 24]
+            _keys = [
+                '상품관리구분코드', '주문번호', '원주문번호', '종목코드', '종목이름',
+                '주문내용', '주문호가구분코드내용', '주문수량', '주문단가', '총체결수량',
+                '체결수량', '체결단가', '확인수량', '정정취소구분내용 ', '거부사유내용',
+                '채권매수일', '거래세과세구분내용', '현금신용대용구분내용', '주문입력매체코드내용',
+                '정정취소가능수량', '매매구분',
+            ]
+
+            result = self.request(self.obj_CpTrade_CpTd5341,
+                                  dict(zip(_fields, _keys)), cntidx=6,
+                                  limit_type=constants.LT_TRADE_REQUEST)
+            return result
 
     def get_account_balance(self):
         """
         매수가능금액
         """
 
-        account_no, account_gflags = self.init_trade()
-        self.obj_CpTrade_CpTdNew5331A.SetInputValue(0, account_no)
-        self.obj_CpTrade_CpTdNew5331A.SetInputValue(1, account_gflags[0])
+        with self.trade_request() as (account_no, account_gflags):
+            self.obj_CpTrade_CpTdNew5331A.SetInputValue(0, account_no)
+            self.obj_CpTrade_CpTdNew5331A.SetInputValue(1, account_gflags[0])
 
-        self.obj_CpTrade_CpTdNew5331A.BlockRequest()
+            self.limiter.acquire(constants.LT_TRADE_REQUEST)
+            self.obj_CpTrade_CpTdNew5331A.BlockRequest()
+            self.check_status(self.obj_CpTrade_CpTdNew5331A)
 
-        v = self.obj_CpTrade_CpTdNew5331A.GetHeaderValue(10)
+            v = self.obj_CpTrade_CpTdNew5331A.GetHeaderValue(10)
 
         return {'volume': v}
         # return object.GetHeaderValue(10)
@@ -525,49 +1010,50 @@ class Creon:
         2 - (long) 요청건수[default:14] - 최대 50개
         3 - (string) 수익률구분코드 - ( "1" : 100% 기준, "2": 0% 기준)
         """
-        account_no, account_gflags = self.init_trade()
-        self.obj_CpTrade_CpTd6033.SetInputValue(0, account_no)
-        self.obj_CpTrade_CpTd6033.SetInputValue(1, account_gflags[0])
-        self.obj_CpTrade_CpTd6033.SetInputValue(3, '2')
-
-        header_fields = {
-            0: '계좌명',
-            1: '결제잔고수량',
-            2: '체결잔고수량',
-            3: '총평가금액',
-            4: '평가손익',
-            6: '대출금액',
-            7: '수신개수',
-            8: '수익율',
-        }
+        with self.trade_request() as (account_no, account_gflags):
+            self.obj_CpTrade_CpTd6033.SetInputValue(0, account_no)
+            self.obj_CpTrade_CpTd6033.SetInputValue(1, account_gflags[0])
+            self.obj_CpTrade_CpTd6033.SetInputValue(3, '2')
+
+            header_fields = {
+                0: '계좌명',
+                1: '결제잔고수량',
+                2: '체결잔고수량',
+                3: '총평가금액',
+                4: '평가손익',
+                6: '대출금액',
+                7: '수신개수',
+                8: '수익율',
+            }
 
-        data_fields = {
-            0: '종목명',
-            1: '신용구분',
-            2: '대출일',
-            3: '결제잔고수량',
-            4: '결제장부단가',
-            5: '전일체결수량',
-            6: '금일체결수량',
-            7: '체결잔고수량',
-            9: '평가금액',
-            10: '평가손익',
-            11: '수익률',
-            12: '종목코드',
-            13: '주문구분',
-            15: '매도가능수량',
-            16: '만기일',
-            17: '체결장부단가',
-            18: '손익단가',
-        }
+            data_fields = {
+                0: '종목명',
+                1: '신용구분',
+                2: '대출일',
+                3: '결제잔고수량',
+                4: '결제장부단가',
+                5: '전일체결수량',
+                6: '금일체결수량',
+                7: '체결잔고수량',
+                9: '평가금액',
+                10: '평가손익',
+                11: '수익률',
+                12: '종목코드',
+                13: '주문구분',
+                15: '매도가능수량',
+                16: '만기일',
+                17: '체결장부단가',
+                18: '손익단가',
+            }
 
-        result = self.request(self.obj_CpTrade_CpTd6033,
-                              data_fields, header_fields=header_fields, cntidx=7)
-        return result
+            result = self.request(self.obj_CpTrade_CpTd6033,
+                                  data_fields, header_fields=header_fields, cntidx=7,
+                                  limit_type=constants.LT_TRADE_REQUEST)
+            return result
 
     def get_holdings(self):
-        account_no, account_gflags = self.init_trade()
-        return self.get_holdingstocks(account_no)
+        with self.trade_request() as (account_no, account_gflags):
+            return self.get_holdingstocks(account_no)
 
 
 class EventHandler:
@@ -580,43 +1066,109 @@ class EventHandler:
         pass
 
 
+class StockCurCallbacks:
+    """
+    한 종목 구독을 여러 콜백에 나눠 준다 (subscribe_stockcur() 를 같은 종목으로 여러 번 부를 때)
+    cbs: 구독자별 콜백, 콜백 없이 구독한 구독자는 None
+    """
+    def __init__(self, cbs):
+        self.cbs = list(cbs)
+
+    def __call__(self, item):
+        for cb in self.cbs:
+            if cb is None:
+                continue
+            try:
+                cb(item)
+            except Exception as e:
+                print('stockcur callback failed. {}'.format(e), file=sys.stderr)
+
+
 class StockCurEventHandler(EventHandler):
+    fields = None
+
+    def set_fields(self, fields=None):
+        """
+        fields: 읽을 STOCKCUR_FIELDS 이름 목록, None 이면 전체를 dict 로 넘긴다
+        """
+        self.fields = None
+        if fields is not None:
+            self.fields = [(i, k) for i, k in STOCKCUR_FIELDS if k in fields]
+
     def OnReceived(self):
-        item = {
-            'code': self.obj.GetHeaderValue(0),
-            'name': self.obj.GetHeaderValue(1),
-            'diffratio': self.obj.GetHeaderValue(2),
-            'timestamp': self.obj.GetHeaderValue(3),  # 시간 형태 확인 필요
-            'price_open': self.obj.GetHeaderValue(4),
-            'price_high': self.obj.GetHeaderValue(5),
-            'price_low': self.obj.GetHeaderValue(6),
-            'bid_sell': self.obj.GetHeaderValue(7),
-            'bid_buy': self.obj.GetHeaderValue(8),
-            'cum_volume': self.obj.GetHeaderValue(9),  # 주, 거래소지수: 천주
-            'cum_trans': self.obj.GetHeaderValue(10),
-            'price': self.obj.GetHeaderValue(13),
-            'contract_type': self.obj.GetHeaderValue(14),
-            'cum_sellamount': self.obj.GetHeaderValue(15),
-            'buy_sellamount': self.obj.GetHeaderValue(16),
-            'contract_amount': self.obj.GetHeaderValue(17),
-            'second': self.obj.GetHeaderValue(18),
-            # 1: 동시호가시간 예상체결가, 2: 장중 체결가
-            'price_type': chr(self.obj.GetHeaderValue(19)),
-            # '1': 장전예상체결, '2': 장중, '4': 장후시간외, '5': 장후예상체결
-            'market_flag': chr(self.obj.GetHeaderValue(20)),
-            'premarket_volume': self.obj.GetHeaderValue(21),
-            'diffsign': chr(self.obj.GetHeaderValue(22)),
-            'LP보유수량': self.obj.GetHeaderValue(23),
-            'LP보유수량대비': self.obj.GetHeaderValue(24),
-            'LP보유율': self.obj.GetHeaderValue(25),
-            '체결상태(호가방식)': self.obj.GetHeaderValue(26),
-            '누적매도체결수량(호가방식)': self.obj.GetHeaderValue(27),
-            '누적매수체결수량(호가방식)': self.obj.GetHeaderValue(28),
-        }
+        if self.fields is not None:
+            tick = LazyTick(self.obj, self.fields)
+            try:
+                self.cb(tick)
+            finally:
+                # 이벤트가 끝나면 헤더 값이 다음 틱으로 바뀌므로 더 읽지 않는다
+                tick.close()
+            return
+        item = {}
+        for i, k in STOCKCUR_FIELDS:
+            item[k] = self.obj.GetHeaderValue(i)
+        for k in STOCKCUR_CHAR_KEYS:
+            item[k] = chr(item[k])
         self.cb(item)
 
 
+class LazyTick:
+    """
+    요청한 필드만 미리 읽고 나머지는 처음 접근할 때 GetHeaderValue() 로 읽는 틱
+    콜백이 끝난 뒤에는 읽어 둔 필드만 볼 수 있다
+    """
+    def __init__(self, obj, fields):
+        self.obj = obj
+        self.values = {}
+        for i, k in fields:
+            self.values[k] = self.read(i, k)
+
+    def read(self, i, k):
+        v = self.obj.GetHeaderValue(i)
+        return chr(v) if k in STOCKCUR_CHAR_KEYS else v
+
+    def __getitem__(self, k):
+        if k in self.values:
+            return self.values[k]
+        if self.obj is None:
+            raise KeyError('{} was not read during the event.'.format(k))
+        i = STOCKCUR_INDEXES[k]
+        self.values[k] = self.read(i, k)
+        return self.values[k]
+
+    def __contains__(self, k):
+        return k in STOCKCUR_INDEXES
+
+    def get(self, k, default=None):
+        try:
+            return self[k]
+        except KeyError:
+            return default
+
+    def close(self):
+        self.obj = None
+
+    def to_dict(self):
+        return dict(self.values)
+
+
+class TickStoreEventHandler(EventHandler):
+    """
+    틱을 dict 로 만들지 않고 TickRing 에 바로 쓴다
+    """
+    def OnReceived(self):
+        self.ring.append_from(self.obj)
+        if self.cb is None:
+            return
+        if self.raw:
+            self.cb(self.ring)
+        else:
+            self.cb(self.ring.row(-1))
+
+
 class OrderEventHandler(EventHandler):
+    book = None
+
     def OnReceived(self):
         item = {
             '계좌명': self.obj.GetHeaderValue(1),
@@ -630,16 +1182,19 @@ class OrderEventHandler(EventHandler):
             '종목코드': self.obj.GetHeaderValue(9),
             '매매구분코드': self.obj.GetHeaderValue(12),
             '체결구분코드': self.obj.GetHeaderValue(14),
-            '체결구분코드': self.obj.GetHeaderValue(14),
-            '체결구분코드': self.obj.GetHeaderValue(14),
+            '신용대출구분코드': self.obj.GetHeaderValue(15),
+            '정정취소구분코드': self.obj.GetHeaderValue(16),
             '현금신용대용구분코드': self.obj.GetHeaderValue(17),
         }
-        self.cb(item)
+        if self.book is not None:
+            self.book.on_event(item)
+        if self.cb is not None:
+            self.cb(item)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('action', choices=['connect', 'disconnect'])
+    parser.add_argument('action', choices=['connect', 'reconnect', 'disconnect'])
     parser.add_argument('--id')
     parser.add_argument('--pwd')
     parser.add_argument('--pwdcert')
@@ -649,5 +1204,7 @@ if __name__ == '__main__':
 
     if args.action == 'connect':
         c.connect(args.id, args.pwd, args.pwdcert)
+    elif args.action == 'reconnect':
+        c.reconnect(args.id, args.pwd, args.pwdcert)
     elif args.action == 'disconnect':
         c.disconnect()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+BlockRequest() 로 응답을 기다리지 않는 주문
+CpTd0311.Request() 로 보내고 수신 이벤트에서 주문번호로 Future 를 완료한다
+이후 주문 체결 실시간 이벤트는 주문 장부(OrderBook)를 거쳐 주문번호로 같은 주문표에 이어진다
+"""
+import sys
+import itertools
+import threading
+import concurrent.futures
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+
+# from quantylab.systrader.creon import constants
+
+import constants as constants
+
+
+# 응답을 아직 받지 못한 주문의 status (GetDibStatus() 의 1: 수신대기), 실패가 아니므로 다시 주문하면 안 된다
+STATUS_PENDING = 1
+
+# 주문번호 조회(AsyncOrderer.get)를 위해 보관할 주문표 수
+MAX_TICKETS = 10000
+
+
+class OrderTicket:
+    """
+    order_async() 가 반환하는 주문 하나
+    accepted: 주문번호로 완료되는 Future, 주문이 실패하면 예외
+    done: 체결/취소/거부로 주문이 끝나면 orderbook.Order 로 완료되는 Future
+    """
+    def __init__(self, action, code, amount, hoga='03', ticket_id=None):
+        self.id = ticket_id  # AsyncOrderer.get() 으로 결과를 다시 조회할 때 쓰는 번호
+        self.action = action
+        self.code = code
+        self.amount = amount
+        self.hoga = hoga
+        self.order_no = None
+        self.msg = None
+        self.book = None
+        self.accepted = Future()
+        self.done = Future()
+
+    @property
+    def key(self):
+        return self.action, self.hoga
+
+    @property
+    def order(self):
+        """
+        주문 장부의 현재 상태 (체결 수량, 평균 단가 등), 주문번호를 받기 전에는 None
+        """
+        if self.book is None or self.order_no is None:
+            return None
+        return self.book.get(self.order_no)
+
+    def result(self, timeout=None):
+        """
+        return 주문번호
+        """
+        return self.accepted.result(timeout)
+
+    def wait(self, timeout=None):
+        """
+        응답을 기다려 Creon.order() 와 같은 형식으로 반환
+        timeout 까지 응답이 없으면 status 는 STATUS_PENDING, 주문은 이미 보냈을 수 있으므로
+        실패로 보고 다시 주문하지 말고 ticket 번호로 결과를 조회한다
+        return {'msg', 'status', 'order_no', 'ticket'}
+        """
+        try:
+            order_no = self.accepted.result(timeout)
+        except concurrent.futures.TimeoutError:
+            return {'msg': 'order pending.', 'status': STATUS_PENDING, 'order_no': None, 'ticket': self.id}
+        except Exception as e:
+            return {'msg': str(e), 'status': -1, 'order_no': None, 'ticket': self.id}
+        return {'msg': self.msg, 'status': 0, 'order_no': order_no, 'ticket': self.id}
+
+    def fail(self, msg):
+        e = RuntimeError(msg)
+        for future in [self.accepted, self.done]:
+            if not future.done():
+                future.set_exception(e)
+
+    def __repr__(self):
+        return 'OrderTicket({}, {}, {}, order_no={})'.format(self.action, self.code, self.amount, self.order_no)
+
+
+class OrderReplyEventHandler:
+    def set_attrs(self, obj, cb):
+        self.obj = obj
+        self.cb = cb
+
+    def OnReceived(self):
+        self.cb(self.obj)
+
+
+class AsyncOrderer:
+    """
+    (매매구분, 호가구분)마다 고정 입력값을 넣어 둔 CpTd0311 을 pool_size 개까지 만들어 돌려 쓴다
+    응답을 기다리는 객체는 다시 쓸 수 없으므로 모두 사용 중이면 주문표를 대기열에 넣었다가 응답이 오는 대로 보낸다
+    응답과 체결은 COM 이벤트로 오므로 메시지 펌프가 돌아야 한다 (comworker.ComWorker)
+    보내는 곳이 이벤트 처리 경로이므로 요청 제한에 걸리면 기다리지 않고 대기열에 되돌려 두었다가
+    창이 열리면 Creon.com_call 로 COM 스레드에서 다시 보낸다
+    """
+    def __init__(self, creon, pool_size=4):
+        self.creon = creon
+        self.session = creon.trade_session
+        self.pool_size = pool_size
+        self.generation = self.session.generation
+        self.idle = {}  # key -> [CpTd0311]
+        self.n_objs = {}  # key -> 만든 객체 수
+        self.busy = {}  # id(obj) -> (obj, ticket, generation)
+        self.waiting = deque()
+        self.tickets = {}  # 주문번호 -> OrderTicket (끝나지 않은 주문)
+        self.by_id = OrderedDict()  # 주문표 번호 -> OrderTicket (최근 MAX_TICKETS 개)
+        self.ids = itertools.count(1)
+        self.retry_timer = None
+        self.lock = threading.RLock()
+        self.book = creon.order_book if creon.order_book is not None else creon.enable_order_book()
+        self.book.add_listener(self.on_update)
+
+    def submit(self, action, code, amount, hoga='03'):
+        """
+        return <OrderTicket> 바로 반환, 주문번호는 ticket.accepted 로 받는다
+        """
+        if not code.startswith('A'):
+            code = 'A' + code
+        with self.lock:
+            ticket = OrderTicket(action, code, amount, hoga=hoga, ticket_id=next(self.ids))
+            ticket.book = self.book
+            self.by_id[ticket.id] = ticket
+            while len(self.by_id) > MAX_TICKETS:
+                self.by_id.popitem(last=False)
+            if self.waiting:
+                # 먼저 들어온 주문이 기다리는 중이면 순서를 지키도록 뒤에 선다
+                self.waiting.append(ticket)
+                return ticket
+            obj = self.acquire_obj(ticket)
+            if obj is None:
+                if not ticket.accepted.done():
+                    self.waiting.append(ticket)
+                return ticket
+        self.send(obj, ticket)
+        return ticket
+
+    def acquire_obj(self, ticket):
+        """
+        ticket 에 쓸 수 있는 객체, 모두 사용 중이면 None
+        """
+        if self.generation != self.session.generation:
+            # 재접속 등으로 세션이 바뀌면 이전 계좌 정보로 만든 객체는 버린다
+            self.generation = self.session.generation
+            self.idle = {}
+            self.n_objs = {}
+        idle = self.idle.setdefault(ticket.key, [])
+        if idle:
+            return idle.pop()
+        if self.n_objs.get(ticket.key, 0) >= self.pool_size:
+            return None
+        obj = self.session.new_order_obj(*ticket.key)
+        if obj is None:
+            ticket.fail('TradeInit failed.')
+            return None
+        handler = self.creon.com.WithEvents(obj, OrderReplyEventHandler)
+        handler.set_attrs(obj, self.on_reply)
+        self.n_objs[ticket.key] = self.n_objs.get(ticket.key, 0) + 1
+        return obj
+
+    def release_obj(self, obj, ticket, generation):
+        if generation == self.generation:
+            self.idle.setdefault(ticket.key, []).append(obj)
+
+    def get(self, ticket_id):
+        """
+        return 주문표 번호의 OrderTicket, 없으면 None
+        """
+        try:
+            ticket_id = int(ticket_id)
+        except (TypeError, ValueError):
+            return None
+        with self.lock:
+            return self.by_id.get(ticket_id)
+
+    def send(self, obj, ticket):
+        """
+        return 보냈으면 True, 요청 제한으로 대기열에 되돌렸으면 False
+        """
+        if not self.creon.limiter.try_acquire(constants.LT_TRADE_REQUEST):
+            # 여기서 기다리면 이벤트 처리가 멈추므로 대기열 맨 앞에 되돌리고 창이 열리면 다시 보낸다
+            with self.lock:
+                self.release_obj(obj, ticket, self.generation)
+                self.waiting.appendleft(ticket)
+            self.schedule_retry()
+            return False
+        obj.SetInputValue(3, ticket.code)  # 종목코드
+        obj.SetInputValue(4, ticket.amount)  # 주문수량
+        with self.lock:
+            self.busy[id(obj)] = (obj, ticket, self.generation)
+        if obj.Request() != 0:
+            with self.lock:
+                _, _, generation = self.busy.pop(id(obj))
+                self.release_obj(obj, ticket, generation)
+            self.session.invalidate()
+            print('order request failed.', file=sys.stderr)
+            ticket.fail('order request failed.')
+        return True
+
+    def schedule_retry(self):
+        with self.lock:
+            if self.retry_timer is not None:
+                return
+            delay = max(self.creon.limiter.delay(constants.LT_TRADE_REQUEST), 0.01)
+            self.retry_timer = threading.Timer(delay, self.retry)
+            self.retry_timer.daemon = True
+            self.retry_timer.start()
+
+    def retry(self):
+        with self.lock:
+            self.retry_timer = None
+        try:
+            if self.creon.com_call is not None:
+                self.creon.com_call(self.dispatch_waiting)
+            else:
+                self.dispatch_waiting()
+        except Exception as e:
+            print('order retry failed. {}'.format(e), file=sys.stderr)
+
+    def on_reply(self, obj):
+        with self.lock:
+            entry = self.busy.pop(id(obj), None)
+        if entry is None:
+            return
+        obj, ticket, generation = entry
+        status = obj.GetDibStatus()
+        msg = obj.GetDibMsg1()
+        ticket.msg = msg
+        if status != 0:
+            print('order failed. {}'.format(msg), file=sys.stderr)
+            self.session.invalidate()
+            ticket.fail('order failed. {}'.format(msg))
+        else:
+            ticket.order_no = int(obj.GetHeaderValue(8))  # 주문번호
+            with self.lock:
+                self.tickets[ticket.order_no] = ticket
+            ticket.accepted.set_result(ticket.order_no)
+            # 응답보다 체결 이벤트가 먼저 올 수 있다
+            order = self.book.get(ticket.order_no)
+            if order is not None and not order.is_open:
+                self.finish(ticket, order)
+        with self.lock:
+            self.release_obj(obj, ticket, generation)
+        self.dispatch_waiting()
+
+    def dispatch_waiting(self):
+        while True:
+            with self.lock:
+                if not self.waiting:
+                    return
+                ticket = self.waiting[0]
+                obj = self.acquire_obj(ticket)
+                if obj is None and not ticket.accepted.done():
+                    return
+                self.waiting.popleft()
+            if obj is not None and not self.send(obj, ticket):
+                return
+
+    def on_update(self, order, item):
+        """
+        OrderBook 리스너, 끝난 주문의 주문표를 완료
+        """
+        ticket = self.tickets.get(order.order_no)
+        if ticket is not None and not order.is_open:
+            self.finish(ticket, order)
+
+    def finish(self, ticket, order):
+        with self.lock:
+            self.tickets.pop(ticket.order_no, None)
+        if not ticket.done.done():
+            ticket.done.set_result(order)
+
+    def pending(self):
+        """
+        return (응답을 기다리는 주문 수, 대기열의 주문 수)
+        """
+        with self.lock:
+            return len(self.busy), len(self.waiting)
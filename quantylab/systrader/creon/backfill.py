@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import queue
+import argparse
+import threading
+
+import numpy as np
+
+# from quantylab.systrader import util
+# from quantylab.systrader.creon.columnar import ColumnarResult
+# from quantylab.systrader.creon.chartcache import shift_date, bar_keys
+# from quantylab.systrader.creon.krxcalendar import get_calendar
+
+import util as util
+from columnar import ColumnarResult
+from chartcache import shift_date, bar_keys
+from krxcalendar import get_calendar
+
+
+MINUTE_KEYS = ['date', 'time', 'open', 'high', 'low', 'close', 'diff', 'volume', 'price', 'diffsign']
+MINUTE_DTYPES = {
+    'date': np.int64,
+    'time': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'diff': np.float64,
+    'volume': np.int64,
+    'price': np.int64,
+    'diffsign': np.uint32,
+}
+
+
+class MinuteStore:
+    """
+    종목별 분봉 저장소, 종목마다 디렉터리 하나에 필드별 바이너리 파일(append-only)
+    meta.json 의 rows 까지만 유효한 데이터로 보므로 쓰다가 중단되어도 다음에 열 때 잘라낸다
+    root/A005930/date.bin, time.bin, ..., meta.json
+    """
+    def __init__(self, root):
+        self.root = root
+        self.locks = {}
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, code, name):
+        return os.path.join(self.root, 'A' + code, name)
+
+    def code_lock(self, code):
+        with self.lock:
+            return self.locks.setdefault(code, threading.Lock())
+
+    def load_meta(self, code):
+        path = self.path(code, 'meta.json')
+        if not os.path.exists(path):
+            return {'rows': 0, 'first': None, 'last': None, 'covered': None}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_meta(self, code, meta):
+        path = self.path(code, 'meta.json')
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def append(self, code, result, covered=None):
+        """
+        마지막으로 저장된 봉 이후의 행만 덧붙인다
+        covered: 빈틈없이 받은 마지막 날짜 (yyyymmdd), 다음 백필의 시작점
+        return 덧붙인 행 수
+        """
+        with self.code_lock(code):
+            os.makedirs(os.path.dirname(self.path(code, 'meta.json')), exist_ok=True)
+            meta = self.load_meta(code)
+            n = 0
+            if len(result) > 0:
+                keys = bar_keys(result)
+                mask = keys > meta['last'] if meta['last'] is not None else np.ones(len(keys), dtype=bool)
+                n = int(mask.sum())
+            if n > 0:
+                for k in MINUTE_KEYS:
+                    arr = np.ascontiguousarray(result[k][mask], dtype=MINUTE_DTYPES[k])
+                    with open(self.path(code, k + '.bin'), 'r+b' if meta['rows'] else 'wb') as f:
+                        # 이전에 중단된 쓰기가 남긴 꼬리를 잘라낸다
+                        f.truncate(meta['rows'] * np.dtype(MINUTE_DTYPES[k]).itemsize)
+                        f.seek(0, os.SEEK_END)
+                        f.write(arr.tobytes())
+                keys = keys[mask]
+                meta['rows'] += n
+                meta['last'] = int(keys[-1])
+                if meta['first'] is None:
+                    meta['first'] = int(keys[0])
+            if covered is not None:
+                meta['covered'] = max(meta['covered'] or 0, int(covered))
+            self.save_meta(code, meta)
+            return n
+
+    def read(self, code, date_from=None, date_to=None, mmap=True):
+        """
+        return <ColumnarResult> mmap 이면 파일을 복사하지 않고 memmap 으로 연다
+        """
+        meta = self.load_meta(code)
+        rows = meta['rows']
+        if rows == 0:
+            return ColumnarResult(
+                {k: np.empty(0, dtype=MINUTE_DTYPES[k]) for k in MINUTE_KEYS}, keys=MINUTE_KEYS)
+        columns = {}
+        for k in MINUTE_KEYS:
+            path = self.path(code, k + '.bin')
+            if mmap:
+                columns[k] = np.memmap(path, dtype=MINUTE_DTYPES[k], mode='r', shape=(rows,))
+            else:
+                columns[k] = np.fromfile(path, dtype=MINUTE_DTYPES[k], count=rows)
+        dates = columns['date']
+        a = 0 if date_from is None else int(np.searchsorted(dates, int(date_from), side='left'))
+        b = rows if date_to is None else int(np.searchsorted(dates, int(date_to), side='right'))
+        result = ColumnarResult(columns, keys=MINUTE_KEYS)
+        return result.take(slice(a, b))
+
+
+class MinuteBackfill:
+    """
+    분봉을 큰 날짜 구간 단위로 연속조회하여 MinuteStore 에 바로 덧붙인다
+    조회(COM)는 호출한 스레드에서, 파일 쓰기는 writer 스레드에서 하므로 쓰는 동안에도 다음 조회를 한다
+    종목은 항상 같은 writer 에 배정되어 덧붙이는 순서가 유지된다
+    쓰기에 실패한 종목은 뒤 구간을 덧붙이지 않아 covered 가 빈틈을 넘어가지 않는다
+    stop_on_empty: 받은 봉이 없는 구간에서 멈출지, 거래정지 중인 종목은 멈추지 않고 받은 것으로 기록
+        False 이면 봉이 없는 구간도 받은 것으로 기록하고 계속 받는다
+    """
+    def __init__(self, creon, root='minutes', span_days=90, writers=2, queue_size=16, stop_on_empty=True):
+        self.creon = creon
+        self.store = MinuteStore(root)
+        self.span_days = span_days
+        self.n_writers = writers
+        self.queue_size = queue_size
+        self.stop_on_empty = stop_on_empty
+        self.errors = []
+        self.failed = set()  # 쓰기에 실패한 종목
+
+    def spans(self, date_from, date_to):
+        """
+        [date_from, date_to] 의 거래일을 span_days 일 단위로 나눈 구간 목록, 휴장일만 있는 구간은 없다
+        """
+        sessions = get_calendar().sessions(date_from, date_to)
+        spans = []
+        while len(sessions) > 0:
+            a = int(sessions[0])
+            end = shift_date(a, self.span_days - 1)
+            i = int(np.searchsorted(sessions, end, side='right'))
+            spans.append((a, int(sessions[i - 1])))
+            sessions = sessions[i:]
+        return spans
+
+    def write(self, q):
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            code, result, covered = item
+            if code in self.failed:
+                continue
+            try:
+                self.store.append(code, result, covered=covered)
+            except Exception as e:
+                self.failed.add(code)
+                self.errors.append((code, str(e)))
+                print('write failed. {} {}'.format(code, e), file=sys.stderr)
+
+    def halted(self, code):
+        """
+        거래정지/거래중단 중이면 True
+        """
+        try:
+            return self.creon.get_stockstatus(code)['status'] != 0
+        except Exception as e:
+            print('stock status failed. {} {}'.format(code, e), file=sys.stderr)
+            return False
+
+    def run(self, codes, date_from, date_to=None, verbose=True):
+        """
+        종목마다 저장된 마지막 날짜 이후부터 date_to 까지 받는다
+        return {code: 덧붙인 구간 수}
+        """
+        today = int(util.get_str_today())
+        date_to = int(date_to) if date_to is not None else today
+        self.failed = set()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.n_writers)]
+        threads = [threading.Thread(target=self.write, args=(q,), daemon=True) for q in queues]
+        for t in threads:
+            t.start()
+
+        done = {}
+        try:
+            for i, code in enumerate(codes):
+                meta = self.store.load_meta(code)
+                start = int(date_from)
+                if meta['first'] is not None and start < meta['first'] // 10000:
+                    # 덧붙이기만 하므로 저장된 첫 날짜 이전 구간은 받지 않는다
+                    print('{} is stored from {}. skip earlier dates.'.format(
+                        code, meta['first'] // 10000), file=sys.stderr)
+                if meta['covered'] is not None:
+                    start = max(start, shift_date(meta['covered'], 1))
+                q = queues[i % self.n_writers]
+                n = 0
+                halted = None
+                for a, b in self.spans(start, date_to):
+                    if code in self.failed:
+                        # 쓰기에 실패했으면 뒤 구간은 받지 않는다 (이미 큐에 넣은 구간은 writer 가 버린다)
+                        break
+                    try:
+                        result = self.creon.get_chart_columns(
+                            code, target='A', unit='m', date_from=str(a), date_to=str(b))
+                    except Exception as e:
+                        self.errors.append((code, str(e)))
+                        print('backfill failed. {} {}~{} {}'.format(code, a, b, e), file=sys.stderr)
+                        break
+                    if len(result) == 0:
+                        if meta['last'] is None and n == 0:
+                            # 아직 받은 봉이 없으면 상장 전 구간으로 보고 다음 구간을 받는다
+                            continue
+                        if self.stop_on_empty:
+                            if halted is None:
+                                halted = self.halted(code)
+                            if not halted:
+                                # 받은 봉이 없는 구간 뒤로 covered 를 옮기면 빈틈이 다시 채워지지 않으므로 여기서 멈춘다
+                                self.errors.append((code, 'no data {}~{}'.format(a, b)))
+                                print('backfill got no data. {} {}~{}'.format(code, a, b), file=sys.stderr)
+                                break
+                        # 거래정지로 봉이 없는 구간은 다시 받지 않도록 받은 것으로 기록하고 다음 구간을 받는다
+                        q.put((code, result, min(b, shift_date(today, -1))))
+                        continue
+                    # 오늘 분봉은 아직 쌓이는 중이므로 어제까지만 받은 것으로 기록
+                    q.put((code, result, min(b, shift_date(today, -1))))
+                    n += 1
+                done[code] = n
+                if verbose:
+                    print('{}/{} {} {} spans'.format(i + 1, len(codes), code, n))
+        finally:
+            for q in queues:
+                q.put(None)
+            for t in threads:
+                t.join()
+        return done
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--codes', nargs='+', required=True)
+    parser.add_argument('--date_from', required=True)
+    parser.add_argument('--date_to')
+    parser.add_argument('--root', default='minutes')
+    parser.add_argument('--span_days', type=int, default=90)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--cover_empty', action='store_true')
+    args = parser.parse_args()
+
+    from _creon import Creon
+    c = Creon()
+    backfill = MinuteBackfill(c, root=args.root, span_days=args.span_days, writers=args.writers,
+                              stop_on_empty=not args.cover_empty)
+    backfill.run(args.codes, args.date_from, args.date_to)
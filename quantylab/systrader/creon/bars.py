@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from collections import deque
+
+import numpy as np
+
+# from quantylab.systrader import util
+# from quantylab.systrader.creon.columnar import ColumnarResult
+# from quantylab.systrader.creon.krxcalendar import get_calendar
+
+import util as util
+from columnar import ColumnarResult
+from krxcalendar import get_calendar
+
+
+BAR_KEYS = ['date', 'time', 'open', 'high', 'low', 'close', 'volume']
+
+# 봉을 만드는 데 필요한 StockCur 필드 (subscribe_stockcur(fields=...) 에 사용)
+BAR_TICK_FIELDS = ['code', 'price', 'contract_amount', 'second', 'market_flag', 'price_type']
+
+# 체결 시각이 이만큼(초) 이전으로 돌아가면 새 거래일로 본다 (종목 간 순서가 조금 섞이는 것은 무시)
+DAY_WRAP_SECONDS = 3600
+
+
+def to_seconds(hhmmss):
+    return hhmmss // 10000 * 3600 + hhmmss // 100 % 100 * 60 + hhmmss % 100
+
+
+class Bar:
+    __slots__ = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+    def __init__(self, time, price, volume):
+        self.time = time
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+
+    def update(self, price, volume):
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+
+
+class BarAggregator:
+    """
+    실시간 체결(StockCur)로 종목별 분/일봉을 틱마다 O(1) 로 갱신
+    intervals: 분 단위 주기 목록, 'D' 는 일봉
+    on_close(code, interval, bar): 봉이 완성될 때 호출, bar 는 BAR_KEYS dict
+    분봉 시각은 크레온 차트와 같이 봉이 끝나는 시각 (09:00:xx 체결 -> 0901 봉), 장 마감 동시호가는 폐장 시각 봉
+    장중(market_flag '2') 체결가(price_type '2')만 사용하여 장전/장후 예상체결가는 제외
+    체결 시각이 이전으로 돌아가거나 날짜가 바뀌면 진행 중인 봉을 모두 완성하고 새 거래일로 넘어간다
+    date: 거래일, None 이면 오늘 (이후 날짜가 바뀌면 따라간다)
+
+    c.subscribe_stockcur(code, agg.on_tick, fields=BAR_TICK_FIELDS)
+    또는 tick_store 사용 시 c.subscribe_stockcur(code, agg.on_ring, raw=True, fields=BAR_TICK_FIELDS)
+    """
+    def __init__(self, intervals=(1, 3, 5, 15, 60, 'D'), on_close=None, history=1000, date=None):
+        self.intervals = list(intervals)
+        self.minute_intervals = [k for k in self.intervals if k != 'D']
+        self.on_close = on_close
+        self.history = history
+        self.current = {}  # (code, interval) -> Bar
+        self.closed = {}  # (code, interval) -> deque of tuple
+        self.follow_today = date is None
+        self.reset(date)
+
+    def reset(self, date=None):
+        """
+        새 거래일 시작, 진행 중인 봉은 버린다
+        """
+        self.date = int(date) if date is not None else int(util.get_str_today())
+        opens, closes = get_calendar().session_hours(self.date)
+        self.close_time = int(closes[0])
+        self.current = {}
+        self.last_seconds = None  # 이 거래일에 받은 가장 늦은 체결 시각(초)
+
+    def roll(self, date):
+        """
+        진행 중인 봉을 모두 완성하고 date 거래일로 넘어간다
+        """
+        self.flush()
+        self.reset(date)
+
+    def next_date(self):
+        today = int(util.get_str_today())
+        if self.follow_today and today > self.date:
+            return today
+        return int(get_calendar().next_session(self.date))
+
+    def check_date(self):
+        """
+        오늘 날짜가 거래일과 다르면 새 거래일로 (date 를 지정하지 않았을 때만)
+        return 넘어갔으면 True
+        """
+        if not self.follow_today:
+            return False
+        today = int(util.get_str_today())
+        if today == self.date:
+            return False
+        self.roll(today)
+        return True
+
+    def label(self, hhmmss, interval):
+        """
+        체결 시각이 속한 interval 분봉의 시각 (hhmm)
+        """
+        minutes = hhmmss // 10000 * 60 + hhmmss // 100 % 100
+        end = (minutes // interval + 1) * interval
+        label = end // 60 * 100 + end % 60
+        return min(label, self.close_time)
+
+    def update(self, code, hhmmss, price, volume):
+        """
+        체결 하나 반영
+        hhmmss: 체결 시각, price: 체결가, volume: 체결 수량
+        """
+        seconds = to_seconds(hhmmss)
+        if self.last_seconds is None:
+            # 만든 뒤 첫 체결이면 그 사이 날짜가 바뀌었을 수 있다
+            self.check_date()
+        elif seconds + DAY_WRAP_SECONDS < self.last_seconds:
+            self.roll(self.next_date())
+        if self.last_seconds is None or seconds > self.last_seconds:
+            self.last_seconds = seconds
+        for interval in self.minute_intervals:
+            self.update_bar(code, interval, self.label(hhmmss, interval), price, volume)
+        if 'D' in self.intervals:
+            self.update_bar(code, 'D', 0, price, volume)
+
+    def update_bar(self, code, interval, time, price, volume):
+        key = (code, interval)
+        bar = self.current.get(key)
+        if bar is not None and bar.time == time:
+            bar.update(price, volume)
+            return
+        if bar is not None:
+            self.close_bar(code, interval, bar)
+        self.current[key] = Bar(time, price, volume)
+
+    def close_bar(self, code, interval, bar):
+        row = (self.date, bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume)
+        closed = self.closed.get((code, interval))
+        if closed is None:
+            closed = self.closed[(code, interval)] = deque(maxlen=self.history)
+        closed.append(row)
+        if self.on_close is not None:
+            item = dict(zip(BAR_KEYS, row))
+            item['code'] = code
+            item['interval'] = interval
+            self.on_close(code, interval, item)
+
+    def flush(self, hhmmss=None):
+        """
+        hhmmss 가 지난 분봉을 체결이 없어도 완성 처리, None 이면 일봉까지 모든 봉을 완성
+        (체결이 뜸한 종목은 다음 체결이 와야 봉이 닫히므로 타이머에서 호출)
+        hhmmss 를 주면 날짜가 바뀌었는지도 확인하여 지난 거래일의 봉을 모두 완성한다
+        """
+        if hhmmss is not None and self.check_date():
+            return
+        for (code, interval), bar in list(self.current.items()):
+            if hhmmss is None or (interval != 'D' and self.label(hhmmss, interval) > bar.time):
+                self.close_bar(code, interval, bar)
+                del self.current[(code, interval)]
+
+    def accept(self, market_flag, price_type):
+        return market_flag == '2' and price_type == '2'
+
+    def on_tick(self, tick):
+        """
+        subscribe_stockcur 콜백 (dict 또는 LazyTick)
+        """
+        if not self.accept(tick['market_flag'], tick['price_type']):
+            return
+        code = tick['code']
+        if code.startswith('A'):
+            code = code[1:]
+        self.update(code, tick['second'], tick['price'], tick['contract_amount'])
+
+    def on_ring(self, ring):
+        """
+        subscribe_stockcur(raw=True) 콜백 (tickstore.TickRing), 마지막 틱을 반영
+        링에 BAR_TICK_FIELDS 가 없으면 ValueError
+        """
+        i = (ring.n - 1) % ring.capacity
+        cols = ring.columns
+        try:
+            if not self.accept(chr(cols['market_flag'][i]), chr(cols['price_type'][i])):
+                return
+            self.update(ring.code, int(cols['second'][i]), int(cols['price'][i]), int(cols['contract_amount'][i]))
+        except KeyError:
+            ring.require(BAR_TICK_FIELDS)
+            raise
+
+    def last(self, code, interval=1):
+        """
+        진행 중인 봉 dict, 없으면 None
+        """
+        if code.startswith('A'):
+            code = code[1:]
+        bar = self.current.get((code, interval))
+        if bar is None:
+            return None
+        return dict(zip(BAR_KEYS, (self.date, bar.time, bar.open, bar.high, bar.low, bar.close, bar.volume)))
+
+    def bars(self, code, interval=1, include_current=True):
+        """
+        return <ColumnarResult> 완성된 봉 (과거->최신), include_current 이면 진행 중인 봉 포함
+        """
+        if code.startswith('A'):
+            code = code[1:]
+        rows = list(self.closed.get((code, interval), []))
+        if include_current:
+            bar = self.last(code, interval)
+            if bar is not None:
+                rows.append(tuple(bar[k] for k in BAR_KEYS))
+        dtypes = [np.int64, np.int64, np.float64, np.float64, np.float64, np.float64, np.int64]
+        columns = {k: np.array([row[j] for row in rows], dtype=dtype)
+                   for j, (k, dtype) in enumerate(zip(BAR_KEYS, dtypes))}
+        return ColumnarResult(columns, keys=BAR_KEYS)
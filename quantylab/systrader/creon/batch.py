@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+브릿지 /batch, 여러 조회(차트, 종목 정보, 공매도, 투자자별 매매동향, 종목 상태)를 한 번에 받아 하나의 작업으로 처리
+캐시에 있는 응답과 요청이 필요 없는 조회를 먼저 주고, 종목 정보는 MarketEye 로 묶어서 조회하고,
+같은 종목 차트는 가장 큰 범위만 조회해 잘라서 준다
+조회는 응답 캐시(ResponseCache)를 거치므로 요청 제한(Creon.limiter)에 맞춰 실행되고 결과는 단건 조회와 캐시를 같이 쓴다
+"""
+import sys
+import json
+import math
+
+# from quantylab.systrader.creon import constants
+# from quantylab.systrader.creon._creon import MARKETEYE_MAX_CODES
+# from quantylab.systrader.creon.krxcalendar import get_calendar
+# from quantylab.systrader.creon.respcache import to_json
+# from quantylab.systrader.creon.singleflight import slice_candles
+
+import constants as constants
+from _creon import MARKETEYE_MAX_CODES
+from krxcalendar import get_calendar
+from respcache import to_json
+from singleflight import slice_candles
+
+
+# 한 번에 받을 수 있는 최대 조회 수
+MAX_QUERIES = 2000
+
+MARKET_CODES = {
+    'kospi': '001',
+    'kosdaq': '201',
+    'kospi200': '180',
+}
+
+
+def to_int(v):
+    return int(v) if v not in (None, '') else None
+
+
+def parse_candles(params, target):
+    code = params.get('code')
+    if not code:
+        raise ValueError('Need to provide "code" argument.')
+    if target == 'U':
+        if code not in MARKET_CODES:
+            raise ValueError('"code" should be one of "kospi", "kosdaq" and "kospi200".')
+        code = MARKET_CODES[code]
+    n = to_int(params.get('n'))
+    if not (n or params.get('date_from')):
+        raise ValueError('Need to provide "n" or "date_from" argument.')
+    unit = params.get('unit', 'D') if target == 'A' else 'D'
+    return 'get_chart', (code,), dict(target=target, unit=unit, n=n, date_from=params.get('date_from'),
+                                      date_to=params.get('date_to'))
+
+
+def parse_code(method, n=False):
+    def parse(params):
+        code = params.get('code')
+        if not code:
+            raise ValueError('Need to provide "code" argument.')
+        if n:
+            return method, (code,), dict(n=to_int(params.get('n')))
+        return method, (code,), {}
+    return parse
+
+
+# type -> params 를 (Creon 메서드 이름, args, kwargs) 로 바꾸는 함수, type 은 단건 조회 엔드포인트 이름과 같다
+PARSERS = {
+    'stockcandles': lambda params: parse_candles(params, 'A'),
+    'marketcandles': lambda params: parse_candles(params, 'U'),
+    'stockfeatures': parse_code('get_stockfeatures'),
+    'stockstatus': parse_code('get_stockstatus'),
+    'short': parse_code('get_shortstockselling', n=True),
+    'investorbuysell': parse_code('get_investorbuysell', n=True),
+}
+
+
+class Query:
+    __slots__ = ['index', 'id', 'type', 'params', 'method', 'args', 'kwargs', 'error']
+
+    def __init__(self, index, item):
+        self.index = index
+        self.id = None
+        self.type = None
+        self.params = {}
+        self.method = None
+        self.args = ()
+        self.kwargs = {}
+        self.error = None
+        if not isinstance(item, dict):
+            self.error = 'Query should be an object.'
+            return
+        self.id = item.get('id')
+        self.type = item.get('type')
+        # 캐시 키가 단건 조회와 같도록 쿼리 파라미터만 남긴다
+        self.params = {k: v for k, v in item.items() if k not in ('id', 'type') and v not in (None, '')}
+        parser = PARSERS.get(self.type)
+        if parser is None:
+            self.error = '"type" should be one of {}.'.format(', '.join('"{}"'.format(k) for k in PARSERS))
+            return
+        try:
+            self.method, self.args, self.kwargs = parser(self.params)
+        except (TypeError, ValueError) as e:
+            self.error = str(e)
+
+
+def load_queries(data):
+    """
+    data: 요청 본문 JSON, 조회 목록 또는 {'queries': 조회 목록, 'stream': bool}
+    return (조회 목록, stream)
+    """
+    stream = False
+    if isinstance(data, dict):
+        stream = bool(data.get('stream'))
+        data = data.get('queries')
+    if not isinstance(data, list):
+        raise ValueError('Need to provide a list of queries.')
+    if len(data) > MAX_QUERIES:
+        raise ValueError('Too many queries. (max {})'.format(MAX_QUERIES))
+    return data, stream
+
+
+def estimate_requests(query):
+    """
+    조회 하나에 필요한 요청 수 (대략)
+    """
+    if query.type == 'stockstatus':
+        return 0
+    if query.method != 'get_chart':
+        return 1
+    n = query.kwargs['n']
+    if n:
+        return max(1, math.ceil(n / constants.CHART_ROWS_PER_REQUEST))
+    try:
+        bars = get_calendar().expected_bars(
+            query.kwargs['date_from'], query.kwargs['date_to'], unit=query.kwargs['unit'])
+    except Exception:
+        return 1
+    return max(1, math.ceil(bars / constants.CHART_ROWS_PER_REQUEST))
+
+
+class BatchJob:
+    """
+    creon: Creon 또는 CreonProxy, cache: respcache.ResponseCache
+    queries: [{'type': 엔드포인트 이름, 'id': 돌려줄 값 (선택), 그 밖의 키는 단건 조회의 쿼리 파라미터}]
+    run() 은 끝나는 순서대로 (Query, status, JSON bytes) 를 반환
+    """
+    def __init__(self, creon, cache, queries):
+        self.creon = creon
+        self.cache = cache
+        self.queries = [Query(i, item) for i, item in enumerate(queries)]
+
+    def prepare(self):
+        """
+        return {
+            'errors': 잘못된 조회, 'ready': 요청 없이 줄 수 있는 조회 (캐시, 종목 상태),
+            'features': MarketEye 로 묶어서 조회할 종목 정보, 'candles': {대표 조회: [잘라서 줄 조회]},
+            'single': 하나씩 조회,
+        }
+        """
+        groups = {'errors': [], 'ready': [], 'features': [], 'candles': {}, 'single': []}
+        candles = []
+        for query in self.queries:
+            if query.error is not None:
+                groups['errors'].append(query)
+            elif query.type == 'stockstatus' or self.cache.peek(query.type, query.params) is not None:
+                groups['ready'].append(query)
+            elif query.type == 'stockfeatures':
+                groups['features'].append(query)
+            elif query.method == 'get_chart':
+                candles.append(query)
+            else:
+                groups['single'].append(query)
+        # 큰 범위부터 대표로 두고 그 범위에 들어가는 조회는 대표에 붙인다
+        candles.sort(key=lambda q: (-(q.kwargs['n'] or 0), str(q.kwargs['date_from'] or '')))
+        for query in candles:
+            for leader, members in groups['candles'].items():
+                if leader.type == query.type and slice_candles(leader.params, query.params) is not None:
+                    members.append(query)
+                    break
+            else:
+                groups['candles'][query] = []
+        if len(groups['features']) == 1:
+            groups['single'] += groups['features']
+            groups['features'] = []
+        return groups
+
+    def plan(self):
+        """
+        return 조회 수, 캐시에서 줄 조회 수, 예상 요청 수, 요청 제한 창 개수, 소요 시간(초)
+        """
+        groups = self.prepare()
+        codes = set(query.params['code'] for query in groups['features'])
+        requests = math.ceil(len(codes) / MARKETEYE_MAX_CODES)
+        requests += sum(estimate_requests(query) for query in list(groups['candles']) + groups['single'])
+        capacity, period = constants.LIMIT_NONTRADE_REQUEST
+        windows = math.ceil(requests / capacity)
+        return {
+            'queries': len(self.queries),
+            'invalid': len(groups['errors']),
+            'ready': len(groups['ready']),
+            'requests': requests,
+            'windows': windows,
+            'seconds': windows * period,
+        }
+
+    def fetch(self, query):
+        """
+        return (status, JSON bytes)
+        """
+        try:
+            res = self.cache.get(query.type, query.params, None, getattr(self.creon, query.method),
+                                 *query.args, **query.kwargs)
+        except Exception as e:
+            print('batch query failed. {} {} {}'.format(query.type, query.params, e), file=sys.stderr)
+            return 500, to_json(str(e))
+        return res.status, res.body
+
+    def run(self):
+        groups = self.prepare()
+        for query in groups['errors']:
+            yield query, 400, to_json(query.error)
+        for query in groups['ready']:
+            yield (query,) + self.fetch(query)
+
+        if groups['features']:
+            try:
+                stocks = self.creon.get_stockfeatures_many(
+                    sorted(set(query.params['code'] for query in groups['features'])))
+            except Exception as e:
+                print('batch stockfeatures failed. {}'.format(e), file=sys.stderr)
+                stocks = {}
+            for query in groups['features']:
+                code = query.params['code']
+                code = code[1:] if code.startswith('A') else code
+                if code in stocks:
+                    yield query, 200, self.cache.store(query.type, query.params, stocks[code]).body
+                else:
+                    yield (query,) + self.fetch(query)
+
+        for leader, members in groups['candles'].items():
+            status, body = self.fetch(leader)
+            yield leader, status, body
+            if not members:
+                continue
+            rows = json.loads(body) if status == 200 else None
+            for query in members:
+                if rows is None:
+                    yield query, status, body
+                    continue
+                result = slice_candles(leader.params, query.params)(rows)
+                yield query, 200, self.cache.store(query.type, query.params, result).body
+
+        for query in groups['single']:
+            yield (query,) + self.fetch(query)
+
+    def line(self, query, status, body):
+        head = {'index': query.index, 'id': query.id, 'type': query.type, 'status': status}
+        return to_json(head)[:-1] + (b', "result": ' if status == 200 else b', "error": ') + body + b'}'
+
+    def iter_lines(self):
+        """
+        끝나는 대로 한 줄씩 (JSON lines)
+        """
+        for query, status, body in self.run():
+            yield self.line(query, status, body) + b'\n'
+
+    def collect(self):
+        """
+        return 모두 끝난 뒤 조회 순서대로 담은 JSON 배열 bytes
+        """
+        lines = [None] * len(self.queries)
+        for query, status, body in self.run():
+            lines[query.index] = self.line(query, status, body)
+        return b'[' + b', '.join(lines) + b']'
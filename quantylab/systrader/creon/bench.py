@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+fakecom.FakeCOM 위에서 Creon 조회/브릿지 성능을 측정 (윈도우/HTS 불필요)
+python bench.py                      # 요청 제한 없이 처리량 측정
+python bench.py --limit --window 0.1 # 요청 제한 창을 0.1 배로 줄여 제한 대기 포함 측정
+python bench.py --json > base.json; python bench.py --compare base.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+# from quantylab.systrader.creon import constants
+# from quantylab.systrader.creon import ratelimit
+# from quantylab.systrader.creon.fakecom import FakeCOM
+# from quantylab.systrader.creon.chartcache import MemoryChartCacheBackend
+# from quantylab.systrader.creon import _creon
+# from quantylab.systrader.creon.comworker import AsyncCreon
+
+import constants as constants
+import ratelimit as ratelimit
+from fakecom import FakeCOM
+from chartcache import MemoryChartCacheBackend
+import _creon as _creon
+from comworker import AsyncCreon
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    return {'mean', 'p50', 'p95', 'max'} (ms), 'ops' (초당 호출 수)
+    """
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    times = np.array(times) * 1000
+    return {
+        'mean': float(times.mean()),
+        'p50': float(np.percentile(times, 50)),
+        'p95': float(np.percentile(times, 95)),
+        'max': float(times.max()),
+        'ops': float(1000 / times.mean()) if times.mean() > 0 else float('inf'),
+    }
+
+
+def make_creon(args):
+    if args.limit:
+        limits = {
+            constants.LT_TRADE_REQUEST: (constants.LIMIT_TRADE_REQUEST[0], constants.LIMIT_TRADE_REQUEST[1] * args.window),
+            constants.LT_NONTRADE_REQUEST: (constants.LIMIT_NONTRADE_REQUEST[0], constants.LIMIT_NONTRADE_REQUEST[1] * args.window),
+            constants.LT_SUBSCRIBE: constants.LIMIT_SUBSCRIBE,
+        }
+    else:
+        limits = {}
+    com = FakeCOM(n_codes=args.codes, latency=args.latency, limits=limits, seed=args.seed)
+    c = _creon.Creon(com=com)
+    if limits:
+        c.limiter = ratelimit.RateLimiter(c.get_limit_remain, limits=limits)
+    else:
+        c.limiter = ratelimit.RateLimiter(limits={lt: (10 ** 9, 1) for lt in (0, 1, 2)})
+    return c
+
+
+def bench_request(c, args):
+    code = 'A005930'
+    data_fields = c.set_chart_inputs(code[1:], 'A', 'D', None, '20000101', None)
+    obj = c.obj_CpSysDib_StockChart
+    return {
+        'request.dicts': measure(lambda: c.request(obj, data_fields, cntidx=3), args.repeat),
+        'request.columnar': measure(
+            lambda: c.request(obj, data_fields, cntidx=3, columnar=True, dtypes=_creon.CHART_DTYPES),
+            args.repeat),
+    }
+
+
+def bench_chart(c, args):
+    code = '005930'
+    c.set_chart_cache(MemoryChartCacheBackend())
+    return {
+        'get_chart.D.dicts': measure(lambda: c.get_chart(code, n=args.bars), args.repeat),
+        'get_chart.D.frame': measure(lambda: c.get_chart(code, n=args.bars, as_frame=True), args.repeat),
+        'get_chart.m.frame': measure(
+            lambda: c.get_chart(code, unit='m', n=args.bars * 10, as_frame=True), args.repeat),
+        'get_chart.D.cached': measure(
+            lambda: c.get_chart(code, n=args.bars, use_cache=True), args.repeat),
+    }
+
+
+def bench_features(c, args):
+    codes = [code[1:] for code in c.get_stockcodes(constants.MARKET_CODE_KOSPI)]
+    return {
+        'get_stockfeatures.loop': measure(lambda: [c.get_stockfeatures(code) for code in codes], 1),
+        'get_stockfeatures_bulk': measure(lambda: c.get_stockfeatures_bulk(codes), args.repeat),
+    }
+
+
+def bench_stockcur(c, args):
+    cnt = [0]
+
+    def cb(item):
+        cnt[0] += 1
+
+    codes = [code[1:] for code in c.get_stockcodes(constants.MARKET_CODE_KOSPI)][:args.subscribe]
+    for code in codes:
+        c.subscribe_stockcur(code, cb)
+    ticks = max(1, args.ticks // max(1, len(codes)))
+    result = measure(lambda: c.com.emit_ticks(ticks), args.repeat)
+    c.unsubscribe_stockcur()
+    # 이벤트 한 번당 처리량으로 환산
+    result['ops'] *= ticks * len(codes)
+    return {'stockcur.events': result}
+
+
+def bench_async(c, args):
+    """
+    AsyncCreon 으로 전 종목 차트를 gather
+    """
+    ac = AsyncCreon(com=c.com)
+    ac.creon.limiter = c.limiter
+    codes = [code[1:] for code in c.get_stockcodes(constants.MARKET_CODE_KOSPI)]
+    try:
+        return {'async.get_charts': measure(
+            lambda: asyncio.run(ac.get_charts(codes, n=args.bars // 10, as_frame=True)), args.repeat)}
+    finally:
+        ac.close()
+
+
+def bench_bridge(args):
+    """
+    bridge_flask 를 FakeCOM 으로 띄워 test_client 로 측정
+    """
+    try:
+        import flask  # noqa: F401
+    except ImportError:
+        print('flask is not installed. skip bridge.', file=sys.stderr)
+        return {}
+    com = FakeCOM(n_codes=args.codes, latency=args.latency, limits={}, seed=args.seed)
+    default_com = _creon.DEFAULT_COM
+    _creon.DEFAULT_COM = com
+    cwd = os.getcwd()
+    try:
+        # bridge 는 현재 디렉터리에 symbolmaster.npz 를 만든다
+        os.chdir(tempfile.mkdtemp())
+        import bridge_flask
+    finally:
+        os.chdir(cwd)
+        _creon.DEFAULT_COM = default_com
+    bridge_flask.c.creon.limiter = ratelimit.RateLimiter(limits={lt: (10 ** 9, 1) for lt in (0, 1, 2)})
+    client = bridge_flask.app.test_client()
+    url = '/stockcandles?code=005930&n={}'.format(args.bars)
+    return {'bridge_flask.stockcandles': measure(lambda: client.get(url), args.repeat)}
+
+
+BENCHES = {
+    'request': bench_request,
+    'chart': bench_chart,
+    'features': bench_features,
+    'stockcur': bench_stockcur,
+    'async': bench_async,
+}
+
+
+def compare(results, baseline, threshold):
+    """
+    return 기준보다 평균 지연이 threshold 배 이상 늘어난 항목 목록
+    """
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None or base['mean'] <= 0:
+            continue
+        ratio = res['mean'] / base['mean']
+        print('{:32s} {:10.3f}ms -> {:10.3f}ms  x{:.2f}'.format(name, base['mean'], res['mean'], ratio))
+        if ratio >= threshold:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bench', nargs='*', choices=list(BENCHES.keys()) + ['bridge'])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--codes', type=int, default=200, help='시장별 종목 수')
+    parser.add_argument('--bars', type=int, default=5000)
+    parser.add_argument('--subscribe', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=10000)
+    parser.add_argument('--latency', type=float, default=0.0, help='BlockRequest 지연(초)')
+    parser.add_argument('--limit', action='store_true', help='크레온 요청 제한 적용')
+    parser.add_argument('--window', type=float, default=1.0, help='요청 제한 창 길이 배율')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--compare')
+    parser.add_argument('--threshold', type=float, default=1.5)
+    args = parser.parse_args()
+
+    names = args.bench or list(BENCHES.keys()) + ['bridge']
+    results = {}
+    throttled = 0
+    for name in names:
+        if name == 'bridge':
+            results.update(bench_bridge(args))
+            continue
+        c = make_creon(args)
+        results.update(BENCHES[name](c, args))
+        throttled += c.com.n_throttled
+
+    if args.json:
+        print(json.dumps({'results': results, 'throttled': throttled}, indent=2))
+    else:
+        for name, res in results.items():
+            print('{:32s} mean {:10.3f}ms  p50 {:10.3f}ms  p95 {:10.3f}ms  {:12.1f} ops/s'.format(
+                name, res['mean'], res['p50'], res['p95'], res['ops']))
+        print('throttled: {}'.format(throttled))
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print('regressions: {}'.format(', '.join(regressions)), file=sys.stderr)
+            sys.exit(1)
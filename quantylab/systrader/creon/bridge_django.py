@@ -1,11 +1,28 @@
 import json
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from quantylab.systrader.creon import Creon
+from quantylab.systrader.creon.comworker import CreonProxy
+from quantylab.systrader.creon.respcache import ResponseCache
+from quantylab.systrader.creon.batch import BatchJob, load_queries
 from quantylab.systrader.creon import constants
 
 
-c = Creon()
+# 요청 스레드들이 같은 COM 객체를 동시에 쓰지 않도록 전용 COM 스레드에서 호출
+c = CreonProxy()
+c.enable_symbol_master('symbolmaster.npz')
+# /connection GET 은 감시 스레드가 확인해 둔 연결 상태를 반환
+c.enable_connection_monitor()
+
+# 조회 응답 캐시, 요청 제한이 꽉 차면 만료된 응답을 먼저 준다
+cache = ResponseCache(wait=c.wait, saturated=c.limiter.saturated)
+
+
+def cached(request, endpoint, fn, *args, **kwargs):
+    res = cache.get(endpoint, request.GET, request.META.get('HTTP_IF_NONE_MATCH'), fn, *args, **kwargs)
+    response = HttpResponse(res.body, status=res.status, content_type='application/json')
+    response['ETag'] = res.etag
+    response['Cache-Control'] = 'max-age={}'.format(res.max_age)
+    return response
 
 
 @csrf_exempt 
@@ -26,27 +43,23 @@ def handle_connection(request):
 
 
 def handle_stockcodes(request):
-    c.wait()
     market = request.GET.get('market')
     if market == 'kospi':
-        return JsonResponse(c.get_stockcodes(constants.MARKET_CODE_KOSPI), safe=False)
+        return cached(request, 'stockcodes', c.get_stockcodes, constants.MARKET_CODE_KOSPI)
     elif market == 'kosdaq':
-        return JsonResponse(c.get_stockcodes(constants.MARKET_CODE_KOSDAQ), safe=False)
+        return cached(request, 'stockcodes', c.get_stockcodes, constants.MARKET_CODE_KOSDAQ)
     else:
         return HttpResponse('"market" should be one of "kospi" and "kosdaq".', status_code=400)
 
 
 def handle_stockstatus(request):
-    c.wait()
     stockcode = request.GET.get('code')
     if not stockcode:
         return HttpResponse('"code" should be provided.', status_code=400)
-    res = c.get_stockstatus(stockcode)
-    return JsonResponse(res)
+    return cached(request, 'stockstatus', c.get_stockstatus, stockcode)
 
 
 def handle_stockcandles(request):
-    c.wait()
     stockcode = request.GET.get('code')
     n = request.GET.get('n')
     if n:
@@ -55,12 +68,11 @@ def handle_stockcandles(request):
     date_to = request.GET.get('date_to')
     if not (n or date_from):
         return HttpResponse('Need to provide "n" or "date_from" argument.', status_code=400)
-    res = c.get_chart(stockcode, target='A', unit='D', n=n, date_from=date_from, date_to=date_to)
-    return JsonResponse(res, safe=False)
+    return cached(request, 'stockcandles', c.get_chart,
+                  stockcode, target='A', unit='D', n=n, date_from=date_from, date_to=date_to)
 
 
 def handle_marketcandles(request):
-    c.wait()
     marketcode = request.GET.get('code')
     n = request.GET.get('n')
     if n:
@@ -77,46 +89,60 @@ def handle_marketcandles(request):
         return HttpResponse('"code" should be one of "kospi", "kosdaq", and "kospi200".', status_code=400)
     if not (n or date_from):
         return HttpResponse('Need to provide "n" or "date_from" argument.', status_code=400)
-    res = c.get_chart(marketcode, target='U', unit='D', n=n, date_from=date_from, date_to=date_to)
-    return JsonResponse(res, safe=False)
+    return cached(request, 'marketcandles', c.get_chart,
+                  marketcode, target='U', unit='D', n=n, date_from=date_from, date_to=date_to)
 
 
 def handle_stockfeatures(request):
-    c.wait()
     stockcode = request.GET.get('code')
     if not stockcode:
         return HttpResponse('"code" should be provided.', status_code=400)
-    res = c.get_stockfeatures(stockcode)
-    return JsonResponse(res)
+    return cached(request, 'stockfeatures', c.get_stockfeatures, stockcode)
 
 
 def handle_short(request):
-    c.wait()
     stockcode = request.GET.get('code')
     n = request.GET.get('n')
     if n:
         n = int(n)
     if not stockcode:
         return HttpResponse('"code" should be provided.', status_code=400)
-    res = c.get_shortstockselling(stockcode, n=n)
-    return JsonResponse(res, safe=False)
+    return cached(request, 'short', c.get_shortstockselling, stockcode, n=n)
 
 
 def handle_investorbuysell(request):
-    c.wait()
     stockcode = request.GET.get('code')
     n = request.GET.get('n')
     if n:
         n = int(n)
     if not stockcode:
         return HttpResponse('"code" should be provided.', status_code=400)
-    res = c.get_investorbuysell(stockcode, n=n)
-    return JsonResponse(res, safe=False)
+    return cached(request, 'investorbuysell', c.get_investorbuysell, stockcode, n=n)
 
 
-def handle_marketcap(request):
-    c.wait()
+def get_marketcap_all():
     res = []
     res += c.get_marketcap(target='2')  # 코스피
     res += c.get_marketcap(target='4')  # 코스닥
-    return JsonResponse(res, safe=False)
+    return res
+
+
+def handle_marketcap(request):
+    return cached(request, 'marketcap', get_marketcap_all)
+
+
+@csrf_exempt
+def handle_batch(request):
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+    try:
+        queries, stream = load_queries(json.loads(request.body or b'null'))
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    job = BatchJob(c, cache, queries)
+    if request.GET.get('plan'):
+        return JsonResponse(job.plan())
+    if stream or request.GET.get('stream'):
+        # 끝나는 대로 한 줄씩 보낸다
+        return StreamingHttpResponse(job.iter_lines(), content_type='application/x-ndjson')
+    return HttpResponse(job.collect(), content_type='application/json')
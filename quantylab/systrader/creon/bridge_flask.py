@@ -1,15 +1,37 @@
 # from quantylab.systrader.creon import constants
-# from quantylab.systrader.creon import Creon
+# from quantylab.systrader.creon.comworker import CreonProxy
+# from quantylab.systrader.creon.respcache import ResponseCache
+# from quantylab.systrader.creon.batch import BatchJob, load_queries
 import constants as constants
-from _creon import Creon
+from comworker import CreonProxy
+from respcache import ResponseCache
+from batch import BatchJob, load_queries
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import sys
 sys.path.append("\\VBOXSVR\workspace\systrader")
 
 
 app = Flask(__name__)
-c = Creon()
+# 요청 스레드들이 같은 COM 객체를 동시에 쓰지 않도록 전용 COM 스레드에서 호출
+c = CreonProxy()
+c.enable_symbol_master('symbolmaster.npz')
+# /connection GET 은 감시 스레드가 확인해 둔 연결 상태를 반환
+c.enable_connection_monitor()
+
+# 주문 응답을 기다리는 최대 시간(초), 지나면 status 1 과 ticket 을 반환하고 /order?ticket= 으로 결과를 조회
+ORDER_TIMEOUT = 10
+
+# 조회 응답 캐시, 요청 제한이 꽉 차면 만료된 응답을 먼저 준다
+cache = ResponseCache(wait=c.wait, saturated=c.limiter.saturated)
+
+
+def cached(endpoint, fn, *args, **kwargs):
+    res = cache.get(endpoint, request.args, request.headers.get('If-None-Match'), fn, *args, **kwargs)
+    response = Response(res.body, status=res.status, mimetype='application/json')
+    response.headers['ETag'] = res.etag
+    response.headers['Cache-Control'] = 'max-age={}'.format(res.max_age)
+    return response
 
 
 @app.route('/connection', methods=['GET', 'POST', 'PUT', 'DELETE'])
@@ -31,29 +53,25 @@ def handle_connect():
 
 @app.route('/stockcodes', methods=['GET'])
 def handle_stockcodes():
-    c.wait()
     market = request.args.get('market')
     if market == 'kospi':
-        return jsonify(c.get_stockcodes(constants.MARKET_CODE_KOSPI))
+        return cached('stockcodes', c.get_stockcodes, constants.MARKET_CODE_KOSPI)
     elif market == 'kosdaq':
-        return jsonify(c.get_stockcodes(constants.MARKET_CODE_KOSDAQ))
+        return cached('stockcodes', c.get_stockcodes, constants.MARKET_CODE_KOSDAQ)
     else:
         return '"market" should be one of "kospi" and "kosdaq".', 400
 
 
 @app.route('/stockstatus', methods=['GET'])
 def handle_stockstatus():
-    c.wait()
     stockcode = request.args.get('code')
     if not stockcode:
         return '', 400
-    status = c.get_stockstatus(stockcode)
-    return jsonify(status)
+    return cached('stockstatus', c.get_stockstatus, stockcode)
 
 
 @app.route('/stockcandles', methods=['GET'])
 def handle_stockcandles():
-    c.wait()
     stockcode = request.args.get('code')
     n = request.args.get('n')
     unit = request.args.get('unit', 'D')
@@ -63,14 +81,12 @@ def handle_stockcandles():
     date_to = request.args.get('date_to')
     if not (n or date_from):
         return 'Need to provide "n" or "date_from" argument.', 400
-    stockcandles = c.get_chart(
-        stockcode, target='A', unit=unit, n=n, date_from=date_from, date_to=date_to)
-    return jsonify(stockcandles)
+    return cached('stockcandles', c.get_chart,
+                  stockcode, target='A', unit=unit, n=n, date_from=date_from, date_to=date_to)
 
 
 @app.route('/marketcandles', methods=['GET'])
 def handle_marketcandles():
-    c.wait()
     marketcode = request.args.get('code')
     n = request.args.get('n')
     if n:
@@ -87,45 +103,53 @@ def handle_marketcandles():
         return [], 400
     if not (n or date_from):
         return '', 400
-    marketcandles = c.get_chart(
-        marketcode, target='U', unit='D', n=n, date_from=date_from, date_to=date_to)
-    return jsonify(marketcandles)
+    return cached('marketcandles', c.get_chart,
+                  marketcode, target='U', unit='D', n=n, date_from=date_from, date_to=date_to)
 
 
 @app.route('/stockfeatures', methods=['GET'])
 def handle_stockfeatures():
-    c.wait()
     stockcode = request.args.get('code')
     if not stockcode:
         return '', 400
-    stockfeatures = c.get_stockfeatures(stockcode)
-    return jsonify(stockfeatures)
+    return cached('stockfeatures', c.get_stockfeatures, stockcode)
 
 
 @app.route('/short', methods=['GET'])
 def handle_short():
-    c.wait()
     stockcode = request.args.get('code')
     n = request.args.get('n')
     if n:
         n = int(n)
     if not stockcode:
         return '', 400
-    shorts = c.get_shortstockselling(stockcode, n=n)
-    return jsonify(shorts)
+    return cached('short', c.get_shortstockselling, stockcode, n=n)
 
 
 @app.route('/investorbuysell', methods=['GET'])
 def handle_investorbuysell():
-    c.wait()
     stockcode = request.args.get('code')
     n = request.args.get('n')
     if n:
         n = int(n)
     if not stockcode:
         return '', 400
-    investorbuysell = c.get_investorbuysell(stockcode, n=n)
-    return jsonify(investorbuysell)
+    return cached('investorbuysell', c.get_investorbuysell, stockcode, n=n)
+
+
+@app.route('/batch', methods=['POST'])
+def handle_batch():
+    try:
+        queries, stream = load_queries(request.get_json(silent=True))
+    except ValueError as e:
+        return str(e), 400
+    job = BatchJob(c, cache, queries)
+    if request.args.get('plan'):
+        return jsonify(job.plan())
+    if stream or request.args.get('stream'):
+        # 끝나는 대로 한 줄씩 보낸다
+        return Response(job.iter_lines(), mimetype='application/x-ndjson')
+    return Response(job.collect(), mimetype='application/json')
 
 
 @app.route('/get_balance', methods=['GET'])
@@ -145,8 +169,11 @@ def handle_buy():
     c.wait()
     stockcode = request.args.get('code')
     amount = request.args.get('amount')
+    if amount:
+        amount = int(amount)
 
-    return jsonify(c.buy(stockcode, amount))
+    # COM 스레드는 응답을 기다리지 않고 이 요청 스레드만 주문번호를 기다린다
+    return jsonify(c.buy_async(stockcode, amount).wait(ORDER_TIMEOUT))
 
 
 @app.route('/sell', methods=['GET'])
@@ -157,7 +184,16 @@ def handle_sell():
     if amount:
         amount = int(amount)
 
-    return jsonify(c.sell(stockcode, amount))
+    return jsonify(c.sell_async(stockcode, amount).wait(ORDER_TIMEOUT))
+
+
+@app.route('/order', methods=['GET'])
+def handle_order():
+    # /buy, /sell 이 ORDER_TIMEOUT 안에 응답을 받지 못해 status 1 (대기) 로 반환한 주문의 결과
+    ticket = c.get_order_ticket(request.args.get('ticket'))
+    if ticket is None:
+        return 'Unknown ticket.', 404
+    return jsonify(ticket.wait(0))
 
 
 @app.route('/holdingstocks', methods=['GET'])
@@ -174,51 +210,45 @@ def handle_get_trade_history():
 
 @app.route('/get_marketcap', methods=['GET'])
 def handle_get_marketcap():
-    c.wait()
-    return jsonify(c.get_marketcap())
+    return cached('marketcap', c.get_marketcap)
 
 
 @app.route('/get_investorbuysell', methods=['GET'])
 def handle_get_investorbuysell():
-    c.wait()
     stockcode = request.args.get('code')
     n = request.args.get('n', None)
     if n:
         n = int(n)
 
-    return jsonify(c.get_investorbuysell(stockcode, n=n))
+    return cached('investorbuysell', c.get_investorbuysell, stockcode, n=n)
 
 
 @app.route('/get_shortstockselling', methods=['GET'])
 def handle_get_shortstockselling():
-    c.wait()
     stockcode = request.args.get('code')
     n = request.args.get('n', None)
     if n:
         n = int(n)
 
-    return jsonify(c.get_shortstockselling(stockcode, n=n))
+    return cached('short', c.get_shortstockselling, stockcode, n=n)
 
 
 @app.route('/get_stockfeatures', methods=['GET'])
 def handle_get_stockfeatures():
-    c.wait()
     stockcode = request.args.get('code')
-    return jsonify(c.get_stockfeatures(stockcode))
+    return cached('stockfeatures', c.get_stockfeatures, stockcode)
 
 
 @app.route('/get_stockstatus', methods=['GET'])
 def handle_get_stockstatus():
-    c.wait()
     stockcode = request.args.get('code')
-    return jsonify(c.get_stockstatus(stockcode))
+    return cached('stockstatus', c.get_stockstatus, stockcode)
 
 
 @app.route('/get_stockcodes', methods=['GET'])
 def handle_get_stockcodes():
-    c.wait()
     code = request.args.get('code')
-    return jsonify(c.get_stockcodes(code))
+    return cached('stockcodes', c.get_stockcodes, code)
 
 
 if __name__ == "__main__":
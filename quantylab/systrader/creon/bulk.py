@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import math
+import time
+import argparse
+
+# from quantylab.systrader import util
+# from quantylab.systrader.creon import constants
+# from quantylab.systrader.creon.chartcache import NpzChartCacheBackend
+# from quantylab.systrader.creon.krxcalendar import get_calendar
+
+import util as util
+import constants as constants
+from chartcache import NpzChartCacheBackend
+from krxcalendar import get_calendar
+
+
+MARKETS = {
+    'kospi': [constants.MARKET_CODE_KOSPI],
+    'kosdaq': [constants.MARKET_CODE_KOSDAQ],
+    'all': [constants.MARKET_CODE_KOSPI, constants.MARKET_CODE_KOSDAQ],
+}
+
+
+class BulkChartDownloader:
+    """
+    시장 전체 종목 차트를 차트 캐시로 내려받는다
+    진행 상황을 checkpoint 파일(JSON lines)에 종목 단위로 남겨 중단된 곳부터 이어 받는다
+    요청 간격은 Creon.limiter 가 정하므로 별도로 쉬지 않는다
+    """
+    def __init__(self, creon, market='all', unit='D', date_from=None, date_to=None,
+                 cache_dir='chartcache', checkpoint=None):
+        self.creon = creon
+        self.market = market
+        self.unit = unit
+        self.date_from = date_from
+        self.date_to = date_to if date_to is not None else util.get_str_today()
+        self.checkpoint = checkpoint or os.path.join(
+            cache_dir, 'bulk_{}_{}_{}_{}.jsonl'.format(market, unit, date_from, self.date_to))
+        if creon.chart_cache is None:
+            creon.set_chart_cache(NpzChartCacheBackend(cache_dir))
+
+    def params(self):
+        return {
+            'market': self.market,
+            'unit': self.unit,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+        }
+
+    def get_codes(self):
+        codes = []
+        for market_code in MARKETS[self.market]:
+            codes += [code[1:] for code in self.creon.get_stockcodes(market_code)]
+        return codes
+
+    def count_bars(self, date_from=None, date_to=None):
+        """
+        종목 하나당 예상 봉 개수 (KRX 거래일 기준), 기간을 주지 않으면 전체 기간
+        """
+        date_from = date_from if date_from is not None else self.date_from
+        date_to = date_to if date_to is not None else self.date_to
+        return get_calendar().expected_bars(date_from, date_to, unit=self.unit)
+
+    def count_requests(self, spans):
+        return sum(max(1, math.ceil(self.count_bars(a, b) / constants.CHART_ROWS_PER_REQUEST))
+                   for a, b in spans)
+
+    def plan(self):
+        """
+        남은 종목과 예상 요청 수, 요청 제한 창 개수, 소요 시간(초)
+        차트 캐시에 이미 있는 구간은 빼고 세며, 받을 구간이 없는 종목은 남은 종목에서 뺀다
+        """
+        done, _ = self.load_checkpoint()
+        codes = []
+        cached = 0
+        requests = 0
+        for code in self.get_codes():
+            if code in done:
+                continue
+            spans = self.creon.chart_cache.missing((code, 'A', self.unit), self.date_from, self.date_to)
+            if not spans:
+                cached += 1
+                continue
+            codes.append(code)
+            requests += self.count_requests(spans)
+        capacity, period = constants.LIMIT_NONTRADE_REQUEST
+        windows = math.ceil(requests / capacity)
+        return {
+            'codes': codes,
+            'done': len(done),
+            'cached': cached,
+            'requests': requests,
+            'windows': windows,
+            'seconds': windows * period,
+        }
+
+    def load_checkpoint(self):
+        """
+        return (완료 종목 set, 실패 종목 {code: msg})
+        """
+        done = set()
+        failed = {}
+        if not os.path.exists(self.checkpoint):
+            return done, failed
+        with open(self.checkpoint, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+        if not lines or lines[0].get('params') != self.params():
+            return done, failed
+        for item in lines[1:]:
+            if item.get('status') == 'done':
+                done.add(item['code'])
+                failed.pop(item['code'], None)
+            else:
+                failed[item['code']] = item.get('msg')
+        return done, failed
+
+    def write_checkpoint(self, item):
+        with open(self.checkpoint, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(item, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start_checkpoint(self):
+        done, failed = self.load_checkpoint()
+        if not done and not failed:
+            os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint)), exist_ok=True)
+            with open(self.checkpoint, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'params': self.params()}) + '\n')
+
+    def run(self, verbose=True):
+        """
+        return 계획 결과에 완료/실패 개수를 더한 dict, 연결이 끊기면 중간에 멈춤
+        """
+        plan = self.plan()
+        self.start_checkpoint()
+        if verbose:
+            print('codes: {}, requests: {}, windows: {}, estimated: {}s'.format(
+                len(plan['codes']), plan['requests'], plan['windows'], plan['seconds']))
+
+        n_done = n_failed = 0
+        time_start = time.time()
+        for i, code in enumerate(plan['codes']):
+            try:
+                # dict 로 바꾸지 않고 받은 열을 그대로 캐시에 쓴다
+                self.creon.chart_cache.fetch(
+                    self.creon, code, target='A', unit=self.unit, date_from=self.date_from,
+                    date_to=self.date_to)
+            except Exception as e:
+                n_failed += 1
+                self.write_checkpoint({'code': code, 'status': 'failed', 'msg': str(e)})
+                print('download failed. {} {}'.format(code, e), file=sys.stderr)
+                if not self.creon.connected():
+                    print('disconnected. stop.', file=sys.stderr)
+                    break
+                continue
+            n_done += 1
+            self.write_checkpoint({'code': code, 'status': 'done'})
+            if verbose and (i + 1) % 100 == 0:
+                print('{}/{} {:.1f}s'.format(i + 1, len(plan['codes']), time.time() - time_start))
+
+        plan['n_done'] = n_done
+        plan['n_failed'] = n_failed
+        return plan
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--market', choices=list(MARKETS.keys()), default='all')
+    parser.add_argument('--unit', choices=['D', 'W', 'M', 'm'], default='D')
+    parser.add_argument('--date_from', required=True)
+    parser.add_argument('--date_to')
+    parser.add_argument('--cache_dir', default='chartcache')
+    parser.add_argument('--checkpoint')
+    parser.add_argument('--plan', action='store_true')
+    args = parser.parse_args()
+
+    from _creon import Creon
+    c = Creon()
+    downloader = BulkChartDownloader(
+        c, market=args.market, unit=args.unit, date_from=args.date_from, date_to=args.date_to,
+        cache_dir=args.cache_dir, checkpoint=args.checkpoint)
+    if args.plan:
+        plan = downloader.plan()
+        print('codes: {}, done: {}, cached: {}, requests: {}, windows: {}, estimated: {}s'.format(
+            len(plan['codes']), plan['done'], plan['cached'], plan['requests'], plan['windows'],
+            plan['seconds']))
+    else:
+        downloader.run()
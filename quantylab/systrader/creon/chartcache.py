@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import abc
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# from quantylab.systrader import util
+# from quantylab.systrader.creon.columnar import ColumnarResult
+# from quantylab.systrader.creon.krxcalendar import get_calendar
+
+import util as util
+from columnar import ColumnarResult
+from krxcalendar import get_calendar
+
+
+UNIT_NAMES = {'D': 'day', 'W': 'week', 'M': 'month', 'm': 'min'}
+
+
+def shift_date(date, days):
+    """
+    date: yyyymmdd 정수
+    """
+    dt = datetime.strptime(str(date), util.FORMAT_DATE) + timedelta(days=days)
+    return int(dt.strftime(util.FORMAT_DATE))
+
+
+def merge_spans(spans):
+    """
+    [from, to] 구간 목록을 정렬하고 겹치거나 이어지는 구간을 합친다
+    """
+    merged = []
+    for a, b in sorted(spans):
+        if merged and a <= shift_date(merged[-1][1], 1):
+            merged[-1][1] = max(merged[-1][1], b)
+        else:
+            merged.append([a, b])
+    return merged
+
+
+def subtract_spans(spans, a, b):
+    """
+    [a, b] 중 spans 로 덮이지 않은 구간 목록
+    """
+    missing = []
+    cur = a
+    for s, e in merge_spans(spans):
+        if e < cur:
+            continue
+        if s > b:
+            break
+        if s > cur:
+            missing.append([cur, shift_date(s, -1)])
+        cur = max(cur, shift_date(e, 1))
+        if cur > b:
+            break
+    if cur <= b:
+        missing.append([cur, b])
+    return missing
+
+
+def bar_keys(result):
+    """
+    봉 정렬/중복 판단용 키, 분봉은 date * 10000 + time
+    """
+    if 'time' in result:
+        return result['date'].astype(np.int64) * 10000 + result['time']
+    return result['date'].astype(np.int64)
+
+
+class ChartCacheBackend:
+    @abc.abstractmethod
+    def load(self, key):
+        """
+        return (ColumnarResult, meta) 또는 저장된 것이 없으면 (None, {})
+        """
+        pass
+
+    @abc.abstractmethod
+    def save(self, key, result, meta):
+        pass
+
+    def load_meta(self, key):
+        """
+        return meta, 저장된 것이 없으면 {}
+        """
+        return self.load(key)[1]
+
+
+class MemoryChartCacheBackend(ChartCacheBackend):
+    def __init__(self):
+        self.store = {}
+
+    def load(self, key):
+        return self.store.get(key, (None, {}))
+
+    def save(self, key, result, meta):
+        self.store[key] = (result, meta)
+
+
+class NpzChartCacheBackend(ChartCacheBackend):
+    """
+    (code, target, unit) 당 npz 파일 하나
+    """
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, key):
+        code, target, unit = key
+        return os.path.join(self.root, '{}{}_{}.npz'.format(target, code, UNIT_NAMES[unit]))
+
+    def load(self, key):
+        path = self.path(key)
+        if not os.path.exists(path):
+            return None, {}
+        with np.load(path, allow_pickle=False) as f:
+            meta = json.loads(str(f['__meta__']))
+            columns = {k: f[k] for k in meta['keys']}
+        return ColumnarResult(columns, keys=meta['keys']), meta
+
+    def load_meta(self, key):
+        # npz 는 읽는 항목만 풀기 때문에 봉 데이터는 읽지 않는다
+        path = self.path(key)
+        if not os.path.exists(path):
+            return {}
+        with np.load(path, allow_pickle=False) as f:
+            return json.loads(str(f['__meta__']))
+
+    def save(self, key, result, meta):
+        path = self.path(key)
+        meta = dict(meta, keys=result.keys)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, __meta__=np.array(json.dumps(meta)), **result.columns)
+        os.replace(tmp, path)
+
+
+class ChartCache:
+    """
+    (code, target, unit) 별 차트 캐시
+    캐시가 덮고 있는 날짜 구간(spans)을 함께 저장하여 빠진 구간만 새로 조회한다
+    오늘 봉은 아직 확정되지 않았으므로 구간에 넣지 않고 매번 다시 조회한다
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+
+    def fetch(self, creon, code, target='A', unit='D', n=None, date_from=None, date_to=None):
+        """
+        return <ColumnarResult> get_chart_columns() 와 같은 필드
+        """
+        key = (code, target, unit)
+        today = int(util.get_str_today())
+        date_to = int(date_to) if date_to is not None else today
+        with self.lock:
+            loaded, meta = self.backend.load(key)
+            cached, spans = loaded, meta.get('spans', [])
+
+            if date_from is not None:
+                cached, spans = self.fill(
+                    creon, key, cached, spans, int(date_from), date_to, today)
+                result = self.select(cached, int(date_from), date_to)
+            else:
+                if spans:
+                    cached, spans = self.fill(
+                        creon, key, cached, spans, spans[-1][0], date_to, today)
+                result = self.select(cached, None, date_to)
+                if n is not None and not self.covers(result, spans, n, date_to):
+                    fetched = creon.get_chart_columns(
+                        code, target=target, unit=unit, n=n, date_to=str(date_to))
+                    if len(fetched) > 0:
+                        a = int(fetched['date'][0])
+                        # 분봉은 첫날 중간부터 받으므로 그 날의 앞쪽 캐시 봉은 남긴다
+                        cached = self.merge(cached, fetched, a, date_to, key_from=int(bar_keys(fetched)[0]))
+                        # 개수로 받은 분봉은 첫날이 중간부터 잘려 있으므로 다음 거래일부터 받은 것으로 기록
+                        start = a if unit in ('D', 'W', 'M') else int(get_calendar().next_session(a))
+                        spans = self.cover(spans, start, date_to, today)
+                    result = self.select(cached, None, date_to)
+                if n is not None:
+                    result = result.take(slice(-n, None)) if len(result) > n else result
+
+            if cached is not None and (cached is not loaded or spans != meta.get('spans')):
+                self.backend.save(key, cached, dict(meta, spans=spans))
+
+        result = ColumnarResult(dict(result.columns), keys=result.keys)
+        result['code'] = np.full(len(result), code)
+        return result
+
+    def missing(self, key, date_from, date_to):
+        """
+        [date_from, date_to] 중 캐시에 없어 조회해야 할 구간 목록 (휴장일만 있는 구간 제외)
+        """
+        spans = self.backend.load_meta(key).get('spans', [])
+        calendar = get_calendar()
+        return [[a, b] for a, b in subtract_spans(spans, int(date_from), int(date_to))
+                if calendar.count_sessions(a, b) > 0]
+
+    def fill(self, creon, key, cached, spans, date_from, date_to, today):
+        """
+        [date_from, date_to] 중 캐시에 없는 구간을 조회하여 합친다
+        """
+        code, target, unit = key
+        calendar = get_calendar()
+        for a, b in subtract_spans(spans, date_from, date_to):
+            if calendar.count_sessions(a, b) == 0:
+                # 휴장일만 있는 구간은 조회하지 않고 받은 것으로 기록
+                spans = self.cover(spans, a, b, today)
+                continue
+            if spans and a > spans[-1][1]:
+                # 마지막 구간 끝 날짜부터 겹쳐 조회해서 수정주가 변경 여부를 확인
+                a = spans[-1][1]
+            # 조회가 실패하면 (CreonRequestError) 구간을 기록하지 않고 그대로 올려 보낸다
+            fetched = creon.get_chart_columns(
+                code, target=target, unit=unit, date_from=str(a), date_to=str(b))
+            if cached is not None and self.adjusted(cached, fetched, unit, today):
+                # 과거 수정주가가 바뀌었으면 캐시를 버리고 요청 구간 전체를 다시 받는다
+                cached, spans = None, []
+                fetched = creon.get_chart_columns(
+                    code, target=target, unit=unit, date_from=str(date_from), date_to=str(date_to))
+                if len(fetched) > 0:
+                    cached = self.merge(None, fetched, date_from, date_to)
+                    spans = self.cover(spans, date_from, date_to, today)
+                # 이전 구간으로 계산한 나머지 빈 구간은 방금 다시 받았으므로 더 조회하지 않는다
+                break
+            if len(fetched) == 0:
+                # 거래일이 있는데 받은 봉이 없으면 받은 것으로 기록하지 않고 다음 조회에서 다시 확인
+                continue
+            cached = self.merge(cached, fetched, a, b)
+            spans = self.cover(spans, a, b, today)
+        return cached, spans
+
+    def adjusted(self, cached, fetched, unit, today):
+        common, idx_cached, idx_fetched = np.intersect1d(
+            bar_keys(cached), bar_keys(fetched), return_indices=True)
+        # 오늘 봉과 진행 중인 주/월봉은 아직 확정되지 않았으므로 비교에서 제외
+        mask = cached['date'][idx_cached] < today
+        if unit in ('W', 'M') and len(common) > 0:
+            mask[-1] = False
+        idx_cached, idx_fetched = idx_cached[mask], idx_fetched[mask]
+        return not np.array_equal(
+            cached['close'][idx_cached], fetched['close'][idx_fetched])
+
+    def merge(self, cached, fetched, date_from, date_to, key_from=None):
+        """
+        cached 의 [date_from, date_to] 봉을 fetched 로 바꾼다
+        key_from: 있으면 bar_keys() 가 key_from 이상인 봉만 바꾼다
+        """
+        fetched = ColumnarResult(
+            {k: v for k, v in fetched.columns.items() if k != 'code'},
+            keys=[k for k in fetched.keys if k != 'code'])
+        if cached is None:
+            return fetched
+        if len(fetched) == 0 and len(cached) > 0:
+            return cached
+        dates = cached['date']
+        keep = (dates < date_from) | (dates > date_to)
+        if key_from is not None:
+            keep |= bar_keys(cached) < key_from
+        cached = cached.take(keep)
+        merged = ColumnarResult.concat([cached, fetched], keys=fetched.keys)
+        return merged.take(np.argsort(bar_keys(merged), kind='stable'))
+
+    def cover(self, spans, date_from, date_to, today):
+        date_to = min(date_to, shift_date(today, -1))
+        if date_from > date_to:
+            return spans
+        return merge_spans(spans + [[date_from, date_to]])
+
+    def select(self, cached, date_from, date_to):
+        if cached is None:
+            return ColumnarResult({}, keys=[])
+        dates = cached['date']
+        mask = dates <= date_to
+        if date_from is not None:
+            mask &= dates >= date_from
+        return cached.take(mask)
+
+    def covers(self, result, spans, n, date_to):
+        """
+        캐시에 있는 마지막 n 개 봉이 빈틈없이 조회된 구간 안에 있는지
+        """
+        if len(result) < n:
+            return False
+        a = int(result['date'][-n])
+        for s, e in spans:
+            if s <= a and date_to <= shift_date(e, 1):
+                return True
+        return False
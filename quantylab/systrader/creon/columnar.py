@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import numpy as np
+
+
+class ColumnarResult:
+    """
+    필드별 numpy 배열로 구성된 조회 결과
+    기존 dict 리스트 형태는 to_dicts() 로 필요할 때만 만든다
+    """
+    def __init__(self, columns, keys=None):
+        self.keys = list(keys) if keys is not None else list(columns.keys())
+        self.columns = columns
+        self._dicts = None
+
+    def __len__(self):
+        if not self.keys:
+            return 0
+        return len(self.columns[self.keys[0]])
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.columns[key]
+        return self.to_dicts()[key]
+
+    def __setitem__(self, key, values):
+        if key not in self.columns:
+            self.keys.append(key)
+        self.columns[key] = values
+        self._dicts = None
+
+    def __iter__(self):
+        return iter(self.to_dicts())
+
+    def take(self, idx):
+        """
+        idx: slice, 정수 배열 또는 bool 배열
+        """
+        return ColumnarResult(
+            {k: self.columns[k][idx] for k in self.keys}, keys=self.keys)
+
+    def to_dicts(self):
+        if self._dicts is None:
+            lists = [self.columns[k].tolist() for k in self.keys]
+            self._dicts = [dict(zip(self.keys, row)) for row in zip(*lists)]
+        return self._dicts
+
+    def to_frame(self):
+        import pandas as pd
+        return pd.DataFrame(self.columns, columns=self.keys)
+
+    @classmethod
+    def concat(cls, results, keys=None, dtypes=None):
+        """
+        results 순서대로 이어 붙인 결과, 복사는 한 번만 일어난다
+        dtypes: 결과가 비었을 때 만들 빈 배열의 필드별 dtype
+        """
+        results = [r for r in results if r is not None]
+        if keys is None:
+            keys = results[0].keys if results else []
+        if not results:
+            dtypes = dtypes or {}
+            return cls({k: np.empty(0, dtype=dtypes.get(k)) for k in keys}, keys=keys)
+        if len(results) == 1:
+            return results[0]
+        return cls(
+            {k: np.concatenate([r.columns[k] for r in results]) for k in keys},
+            keys=keys)
+
+
+def read_page(obj, data_fields, cnt, dtypes=None):
+    """
+    연속조회 한 페이지를 필드별 배열로 읽는다
+    크레온은 최신 데이터부터 내려주므로 인덱스를 뒤집어 과거->최신 순으로 채운다
+    """
+    dtypes = dtypes or {}
+    columns = {}
+    for j, k in data_fields.items():
+        columns[k] = np.array(
+            [obj.GetDataValue(j, cnt-1-i) for i in range(cnt)], dtype=dtypes.get(k))
+    return ColumnarResult(columns, keys=data_fields.values())
+
+
+def chr_array(arr):
+    """
+    문자 코드 배열을 길이 1 문자열 배열로 변환 (chr() 의 벡터 버전)
+    """
+    return np.ascontiguousarray(arr, dtype=np.uint32).view('U1')
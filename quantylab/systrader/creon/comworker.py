@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import sys
+import time
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
+
+try:
+    import pythoncom
+except ImportError:
+    pythoncom = None
+
+# from quantylab.systrader.creon import Creon
+
+from _creon import Creon
+
+
+class ComWorker:
+    """
+    COM 객체를 만들고 호출하는 전용 스레드 (STA)
+    다른 스레드는 submit() 으로 호출을 큐에 넣고 Future 로 결과를 받는다
+    큐가 비어 있는 동안 메시지를 펌프하여 실시간 이벤트(OnReceived)를 이 스레드에서 처리한다
+    호출 안에서 기다릴 때 (요청 제한, 연속조회 페이지 사이, 재접속) 도 pump(seconds) 로 메시지를 펌프한다
+    """
+    def __init__(self, name='creon-com', pump_interval=0.01):
+        self.name = name
+        self.pump_interval = pump_interval
+        self.queue = queue.Queue()
+        self.thread = None
+        self.pumps = []  # 메시지 펌프 대신 호출할 함수 (예: FakeCOM.pump)
+        self.running = False
+
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        if self.thread is None:
+            return
+        self.running = False
+        self.queue.put(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def in_worker(self):
+        return threading.current_thread() is self.thread
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        return <concurrent.futures.Future>
+        """
+        future = Future()
+        if self.in_worker():
+            # 워커 안에서의 호출은 큐를 거치면 교착되므로 바로 실행
+            self.execute(future, fn, args, kwargs)
+            return future
+        if self.thread is None:
+            raise RuntimeError('ComWorker is not started.')
+        self.queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        return self.submit(fn, *args, **kwargs).result()
+
+    def execute(self, future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def pump(self, seconds=0):
+        """
+        쌓인 메시지를 처리하고, seconds 가 있으면 그동안 pump_interval 마다 펌프하며 기다린다
+        워커 밖에서 부르면 펌프하지 않고 기다리기만 한다
+        """
+        if not self.in_worker():
+            if seconds > 0:
+                time.sleep(seconds)
+            return
+        deadline = time.monotonic() + seconds
+        while True:
+            if pythoncom is not None:
+                pythoncom.PumpWaitingMessages()
+            for fn in self.pumps:
+                try:
+                    fn()
+                except Exception as e:
+                    print('pump failed. {}'.format(e), file=sys.stderr)
+            remain = deadline - time.monotonic()
+            if remain <= 0:
+                return
+            time.sleep(min(remain, self.pump_interval))
+
+    def run(self):
+        if pythoncom is not None:
+            pythoncom.CoInitialize()
+        try:
+            while self.running:
+                try:
+                    item = self.queue.get(timeout=self.pump_interval)
+                except queue.Empty:
+                    self.pump()
+                    continue
+                if item is None:
+                    break
+                self.execute(*item)
+                self.pump()
+        finally:
+            # 남은 요청은 취소
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+            if pythoncom is not None:
+                pythoncom.CoUninitialize()
+
+
+class CreonProxy:
+    """
+    Creon 을 ComWorker 스레드에서 만들고 모든 메서드 호출을 그 스레드로 보낸다
+    여러 요청 스레드가 하나의 Creon 을 공유하는 브릿지에서 Creon 대신 사용
+    """
+    def __init__(self, account_no='', com=None, worker=None):
+        self.worker = worker if worker is not None else ComWorker().start()
+        self.creon = self.worker.call(Creon, account_no=account_no, com=com)
+        # Creon 내부의 다른 스레드(주문 장부 대조 등)도 COM 호출은 워커로 보낸다
+        self.creon.com_call = self.worker.call
+        # 워커에서 기다리는 동안에도 실시간 이벤트를 받는다
+        self.creon.pump = self.worker.pump
+        if hasattr(self.creon.com, 'pump'):
+            self.worker.pumps.append(self.creon.com.pump)
+
+    def __getattr__(self, name):
+        if name == 'creon':
+            raise AttributeError(name)
+        attr = getattr(self.creon, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.worker.call(attr, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def connected(self):
+        # 연결 감시 중이면 워커 큐를 거치지 않고 캐시된 값을 반환 (헬스 체크가 조회 뒤에 밀리지 않게)
+        monitor = self.creon.connection_monitor
+        if monitor is not None and monitor.running:
+            return monitor.connected()
+        return self.worker.call(self.creon.connected)
+
+    def close(self):
+        self.worker.stop()
+
+
+class AsyncCreon(CreonProxy):
+    """
+    Creon 메서드를 awaitable 로 반환
+    예: charts = await asyncio.gather(*[ac.get_chart(code, n=100) for code in codes])
+    요청은 워커 큐에 쌓인 순서대로 처리되고 간격은 Creon.limiter 가 정한다
+    """
+    def __getattr__(self, name):
+        if name == 'creon':
+            raise AttributeError(name)
+        attr = getattr(self.creon, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return asyncio.wrap_future(self.worker.submit(attr, *args, **kwargs))
+        call.__name__ = name
+        return call
+
+    async def connected(self):
+        monitor = self.creon.connection_monitor
+        if monitor is not None and monitor.running:
+            return monitor.connected()
+        return await asyncio.wrap_future(self.worker.submit(self.creon.connected))
+
+    async def get_charts(self, codes, **kwargs):
+        """
+        return {code: get_chart() 결과}, 실패한 종목은 예외 객체
+        """
+        results = await asyncio.gather(
+            *[self.get_chart(code, **kwargs) for code in codes], return_exceptions=True)
+        return dict(zip(codes, results))
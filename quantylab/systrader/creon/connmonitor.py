@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+크레온 연결 상태 감시
+백그라운드 스레드가 DibServer/CpStart 프로세스 핸들과 IsConnect 를 확인해 두고
+connected() 는 그 값을 바로 반환한다 (TASKLIST 는 프로세스를 새로 찾을 때만 가끔 실행)
+"""
+import sys
+import time
+import threading
+import subprocess
+
+try:
+    import pythoncom
+    import win32api
+    import win32event
+except ImportError:
+    pythoncom = None
+    win32api = None
+
+SYNCHRONIZE = 0x00100000
+PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+
+PROCESSES = ['DibServer.exe', 'CpStart.exe']
+
+
+def find_pids(names):
+    """
+    return {프로세스 이름: [pid]}, TASKLIST 한 번으로 찾는다
+    """
+    output = subprocess.check_output(['TASKLIST', '/FO', 'CSV', '/NH'])
+    pids = {name: [] for name in names}
+    lower = {name.lower(): name for name in names}
+    for line in output.decode('cp949', errors='ignore').splitlines():
+        cols = [col.strip('"') for col in line.split('","')]
+        if len(cols) > 1 and cols[0].lower() in lower:
+            pids[lower[cols[0].lower()]].append(int(cols[1]))
+    return pids
+
+
+class ProcessWatcher:
+    """
+    이름으로 한 번 찾은 프로세스의 핸들을 들고 있다가 종료 여부만 확인
+    """
+    def __init__(self, names=None, discover_interval=10.0):
+        self.names = list(names) if names is not None else PROCESSES
+        self.discover_interval = discover_interval
+        self.handles = {}  # name -> handle
+        self.discovered = None  # 마지막으로 TASKLIST 를 실행한 시각
+
+    def alive(self, handle):
+        return win32event.WaitForSingleObject(handle, 0) == win32event.WAIT_TIMEOUT
+
+    def close(self, name):
+        handle = self.handles.pop(name, None)
+        if handle is not None:
+            win32api.CloseHandle(handle)
+
+    def discover(self):
+        self.discovered = time.monotonic()
+        for name, pids in find_pids([name for name in self.names if name not in self.handles]).items():
+            for pid in pids:
+                try:
+                    handle = win32api.OpenProcess(SYNCHRONIZE | PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+                except Exception:
+                    continue
+                self.handles[name] = handle
+                break
+
+    def check(self, force=False):
+        """
+        return 모든 프로세스가 떠 있으면 True
+        """
+        for name in list(self.handles):
+            if not self.alive(self.handles[name]):
+                self.close(name)
+        missing = len(self.handles) < len(self.names)
+        if missing and (force or self.discovered is None
+                        or time.monotonic() - self.discovered >= self.discover_interval):
+            self.discover()
+        return len(self.handles) == len(self.names)
+
+    def close_all(self):
+        for name in list(self.handles):
+            self.close(name)
+
+
+class ConnectionMonitor:
+    """
+    interval 초마다 연결 상태를 확인해 캐시
+    com: Creon.com, 감시 스레드에서 CpCybos 를 따로 만든다
+    check_processes: 크레온 프로세스도 확인할지, None 이면 win32com 을 쓸 때만
+    on_change(connected): 연결 상태가 바뀔 때 감시 스레드에서 호출, add_listener() 로 더 붙일 수 있다
+    """
+    def __init__(self, com, interval=0.5, discover_interval=10.0, check_processes=None, on_change=None):
+        self.com = com
+        self.interval = interval
+        # 실제 크레온이면 감시 스레드도 COM 을 초기화해야 한다
+        self.native = pythoncom is not None and getattr(com, '__name__', '') == 'win32com.client'
+        if check_processes is None:
+            check_processes = self.native
+        self.watcher = ProcessWatcher(discover_interval=discover_interval) if check_processes else None
+        self.listeners = [on_change] if on_change is not None else []
+        self.state = None  # 아직 확인하지 않았으면 None
+        self.checked = None  # 마지막 확인 시각
+        self.changed = None  # 마지막으로 상태가 바뀐 시각
+        self.cond = threading.Condition()
+        self.wakeup = threading.Event()
+        self.force = False
+        self.thread = None
+        self.running = False
+
+    def add_listener(self, cb):
+        if cb not in self.listeners:
+            self.listeners.append(cb)
+
+    def remove_listener(self, cb):
+        if cb in self.listeners:
+            self.listeners.remove(cb)
+
+    def start(self):
+        if self.thread is not None:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='creon-connection', daemon=True)
+        self.thread.start()
+        # 첫 확인이 끝날 때까지 기다려 start() 직후에도 connected() 가 맞는 값을 돌려주게 한다
+        self.wait_checked(max(1.0, self.interval * 2))
+        return self
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.running = False
+        self.wakeup.set()
+        self.thread.join()
+        self.thread = None
+
+    def connected(self):
+        return bool(self.state)
+
+    def refresh(self):
+        """
+        다음 주기를 기다리지 않고 바로 다시 확인 (프로세스도 다시 찾는다)
+        """
+        self.force = True
+        self.wakeup.set()
+
+    def wait_checked(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(lambda: self.checked is not None, timeout)
+
+    def wait_for(self, state=True, timeout=None, after=None):
+        """
+        연결 상태가 state 가 될 때까지 기다린다
+        after: time.time() 값, 이 시각 이후에 확인한 상태만 본다 (재시작 직전의 상태를 무시)
+        return 시간 안에 그렇게 되었으면 True
+        """
+        def ready():
+            if self.state is None or bool(self.state) != state:
+                return False
+            return after is None or self.checked >= after
+        with self.cond:
+            return self.cond.wait_for(ready, timeout)
+
+    def check(self, cybos, force=False):
+        if self.watcher is not None and not self.watcher.check(force=force):
+            return False
+        return cybos.IsConnect != 0
+
+    def update(self, state):
+        with self.cond:
+            # 첫 확인은 상태 변화로 보지 않는다
+            changed = self.state is not None and state != self.state
+            self.state = state
+            self.checked = time.time()
+            if changed:
+                self.changed = self.checked
+            self.cond.notify_all()
+        if not changed:
+            return
+        for cb in list(self.listeners):
+            try:
+                cb(state)
+            except Exception as e:
+                print('connection callback failed. {}'.format(e), file=sys.stderr)
+
+    def run(self):
+        if self.native:
+            pythoncom.CoInitialize()
+        try:
+            cybos = self.com.Dispatch('CpUtil.CpCybos')
+            while self.running:
+                self.wakeup.clear()
+                force, self.force = self.force, False
+                try:
+                    state = self.check(cybos, force=force)
+                except Exception as e:
+                    print('connection check failed. {}'.format(e), file=sys.stderr)
+                    state = False
+                self.update(state)
+                self.wakeup.wait(self.interval)
+        finally:
+            if self.watcher is not None:
+                self.watcher.close_all()
+            if self.native:
+                pythoncom.CoUninitialize()
@@ -4,3 +4,18 @@ MARKET_CODE_KOSDAQ = 2
 CREON_MARKET_CODE_KOSPI = '001'
 CREON_MARKET_CODE_KOSDAQ = '201'
 CREON_MARKET_CODE_KOSPI200 = '180'
+
+# 요청 제한 구분 (CpCybos.GetLimitRemainCount)
+LT_TRADE_REQUEST = 0  # 주문/계좌 관련 RQ 요청
+LT_NONTRADE_REQUEST = 1  # 시세 관련 RQ 요청
+LT_SUBSCRIBE = 2  # 시세 관련 SB (실시간 구독)
+
+# 요청 제한 (건수, 기간(초)); 실시간 구독은 기간 없이 동시 구독 건수 제한
+LIMIT_TRADE_REQUEST = (20, 15)
+LIMIT_NONTRADE_REQUEST = (60, 15)
+LIMIT_SUBSCRIBE = (400, None)
+
+# StockChart 요청 한 번에 받는 최대 개수 (계획 시 추정용)
+CHART_ROWS_PER_REQUEST = 2856
+# 정규장 분봉 개수 (09:00~15:30 + 동시호가)
+MINUTES_PER_SESSION = 381
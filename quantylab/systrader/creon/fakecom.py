@@ -0,0 +1,859 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+win32com.client 대신 쓰는 크레온 COM 시뮬레이터
+Creon(com=FakeCOM()) 으로 윈도우/HTS 없이 _creon.py 를 실행할 수 있다
+- FakeCOM: 합성 데이터로 응답 (연속조회, 요청 제한 카운터, 실시간 이벤트 포함)
+- RecordingCOM: 실제 COM 응답을 기록
+- ReplayCOM: 기록한 응답을 재생
+"""
+import time
+import zlib
+import pickle
+import threading
+from collections import deque
+
+import numpy as np
+
+# from quantylab.systrader.creon import constants
+
+import constants as constants
+
+
+START_DATE = '2000-01-03'
+
+# StockChart 필드 index -> 이름
+CHART_FIELDS = {0: 'date', 1: 'time', 2: 'open', 3: 'high', 4: 'low', 5: 'close',
+                6: 'diff', 8: 'volume', 9: 'price', 37: 'diffsign'}
+
+
+def code_seed(code, seed=0):
+    return (zlib.crc32(code.encode()) + seed) % (2 ** 32)
+
+
+def to_int_dates(days):
+    """
+    datetime64[D] 배열을 yyyymmdd 정수 배열로
+    """
+    days = days.astype('datetime64[D]')
+    y = days.astype('datetime64[Y]').astype(int) + 1970
+    m = days.astype('datetime64[M]').astype(int) % 12 + 1
+    d = (days - days.astype('datetime64[M]')).astype(int) + 1
+    return y * 10000 + m * 100 + d
+
+
+def to_datetime64(date):
+    date = str(date)
+    return np.datetime64('{}-{}-{}'.format(date[:4], date[4:6], date[6:8]))
+
+
+def minute_times():
+    """
+    정규장 분봉 시각 (hhmm): 0901 ~ 1520, 1530
+    """
+    minutes = np.arange(9 * 60 + 1, 15 * 60 + 21)
+    times = (minutes // 60) * 100 + minutes % 60
+    return np.append(times, 1530)
+
+
+def diffsigns(diff):
+    """
+    대비부호: '2' 상승, '3' 보합, '5' 하락
+    """
+    return np.where(diff > 0, ord('2'), np.where(diff < 0, ord('5'), ord('3')))
+
+
+def pyvalue(v):
+    return v.item() if hasattr(v, 'item') else v
+
+
+class FakeObject:
+    """
+    조회(RQ)/실시간(SB) 객체 공통 동작
+    respond() 가 {field_index: 배열}, 전체 행 수를 최신 행부터 돌려주면 page_size 단위로 연속조회한다
+    """
+    limit_type = constants.LT_NONTRADE_REQUEST
+    cntidx = 0
+    page_size = 20
+
+    def __init__(self, com, progid):
+        self.com = com
+        self.progid = progid
+        self.inputs = {}
+        self.header = {}
+        self.columns = {}
+        self.offset = 0
+        self.nrows = 0
+        self.cursor = 0
+        self.total = 0
+        self.status = 0
+        self.msg = ''
+        self.Continue = 0
+        self.dirty = True
+        self.handlers = []
+
+    def SetInputValue(self, i, v):
+        self.inputs[i] = v
+        self.dirty = True
+
+    def GetInputValue(self, i):
+        return self.inputs.get(i)
+
+    def GetDibStatus(self):
+        return self.status
+
+    def GetDibMsg1(self):
+        return self.msg
+
+    def GetHeaderValue(self, i):
+        return pyvalue(self.header.get(i, 0))
+
+    def data_field(self, j):
+        return j
+
+    def GetDataValue(self, j, i):
+        col = self.columns.get(self.data_field(j))
+        if col is None:
+            return 0
+        return pyvalue(col[self.offset + i])
+
+    def respond(self):
+        return {}, 0
+
+    def BlockRequest(self):
+        if self.com.latency:
+            time.sleep(self.com.latency)
+        if not self.com.consume(self.limit_type):
+            self.status = -1
+            self.msg = '요청 제한 개수 초과'
+            self.Continue = 0
+            return 4
+        if self.dirty or not self.Continue:
+            self.header = {}
+            self.columns, self.total = self.respond()
+            self.cursor = 0
+            self.dirty = False
+        self.offset = self.cursor
+        self.nrows = min(self.page_size, self.total - self.cursor)
+        self.cursor += self.nrows
+        self.Continue = 1 if self.cursor < self.total else 0
+        self.header[self.cntidx] = self.nrows
+        self.status = 0
+        self.msg = '정상 처리되었습니다.'
+        return 0
+
+    def Request(self):
+        ret = self.BlockRequest()
+        self.com.post(self.fire)
+        return ret
+
+    def fire(self):
+        for handler in list(self.handlers):
+            handler.OnReceived()
+
+    def Subscribe(self):
+        self.com.subscribe(self)
+
+    def Unsubscribe(self):
+        self.com.unsubscribe(self)
+
+
+class FakeCpCybos(FakeObject):
+    @property
+    def IsConnect(self):
+        return 1 if self.com.connected else 0
+
+    @property
+    def LimitRequestRemainTime(self):
+        return self.com.remain(constants.LT_NONTRADE_REQUEST)[1]
+
+    def GetLimitRemainCount(self, limit_type):
+        return self.com.remain(limit_type)[0]
+
+
+class FakeCpCodeMgr(FakeObject):
+    def GetStockListByMarket(self, market):
+        return tuple(self.com.codes.get(market, []))
+
+    def CodeToName(self, code):
+        return '종목{}'.format(code[1:])
+
+    def GetStockMarketKind(self, code):
+        return self.com.market_of(code)
+
+    def GetStockYdClosePrice(self, code):
+        return int(self.com.daily(code)['close'][-2])
+
+    def __getattr__(self, name):
+        if name.startswith('Get') or name.startswith('Is'):
+            return lambda *args: 0
+        raise AttributeError(name)
+
+
+class FakeStockChart(FakeObject):
+    cntidx = 3
+    page_size = constants.CHART_ROWS_PER_REQUEST
+
+    def data_field(self, j):
+        fields = self.inputs.get(5, [])
+        return fields[j] if isinstance(fields, (list, tuple)) else fields
+
+    def respond(self):
+        code = self.inputs[0]
+        unit = chr(self.inputs.get(6, ord('D')))
+        mode = chr(self.inputs.get(1, ord('2')))
+        date_to = int(self.inputs.get(2) or self.com.today)
+        date_from = int(self.inputs.get(3) or 0) if mode == '1' else 0
+        n = self.inputs.get(4) if mode == '2' else None
+
+        if unit in ('m', 'T'):
+            bars = self.com.minutely(code, date_from, date_to, n)
+        else:
+            bars = self.com.daily(code, unit)
+            mask = (bars['date'] <= date_to) & (bars['date'] >= date_from)
+            bars = {k: v[mask] for k, v in bars.items()}
+        total = len(bars['date'])
+        if n is not None:
+            total = min(total, n)
+        # 최신 행부터
+        columns = {i: bars[k][::-1][:total] for i, k in CHART_FIELDS.items() if k in bars}
+        self.header[1] = len(self.inputs.get(5, []))
+        return columns, total
+
+
+class FakeMarketEye(FakeObject):
+    def fields(self):
+        fields = self.inputs.get(0, [])
+        if not isinstance(fields, (list, tuple)):
+            fields = [fields]
+        return sorted(fields)
+
+    def codes(self):
+        codes = self.inputs.get(1, [])
+        if isinstance(codes, str):
+            codes = [codes]
+        return list(codes)
+
+    def BlockRequest(self):
+        ret = super().BlockRequest()
+        self.header = {0: len(self.fields()), 1: self.fields(), 2: len(self.codes())}
+        return ret
+
+    def data_field(self, j):
+        return self.fields()[j]
+
+    def GetDataValue(self, j, i):
+        field = self.data_field(j)
+        code = self.codes()[i]
+        if field == 0:
+            return code
+        if field == 4:
+            return int(self.com.daily(code)['close'][-1])
+        return (code_seed(code, field) % 10000) / 100
+
+    def respond(self):
+        return {}, 0
+
+
+class FakeCpSvr7238(FakeObject):
+    """
+    종목별공매도추이
+    """
+    def respond(self):
+        bars = self.com.daily(self.inputs[0])
+        close = bars['close'][::-1]
+        volume = bars['volume'][::-1]
+        short_volume = volume // 20
+        columns = {
+            0: bars['date'][::-1],
+            1: close.astype(np.int64),
+            2: bars['diff'][::-1].astype(np.int64),
+            3: np.round(bars['diff'][::-1] / close * 100, 2),
+            4: volume,
+            5: short_volume,
+            6: np.round(short_volume / np.maximum(volume, 1) * 100, 2),
+            7: short_volume * close.astype(np.int64) // 1000,
+            8: close.astype(np.int64),
+            9: np.zeros(len(close)),
+        }
+        return columns, len(close)
+
+
+class FakeCpSvr7254(FakeObject):
+    """
+    투자자별 매매동향
+    """
+    cntidx = 1
+
+    def respond(self):
+        bars = self.com.daily(self.inputs[0])
+        total = len(bars['date'])
+        rng = np.random.RandomState(code_seed(self.inputs[0], 7254))
+        columns = {0: bars['date'][::-1]}
+        for i in range(1, 14):
+            columns[i] = rng.randint(-100000, 100000, total)
+        columns[14] = bars['close'][::-1].astype(np.int64)
+        columns[15] = bars['diff'][::-1].astype(np.int64)
+        columns[16] = np.round(columns[15] / columns[14] * 100, 2)
+        columns[17] = bars['volume'][::-1]
+        columns[18] = np.full(total, ord('1'))
+        return columns, total
+
+
+class FakeCpSvr8548(FakeObject):
+    """
+    시가총액비중
+    """
+    page_size = 200
+
+    def respond(self):
+        market = constants.MARKET_CODE_KOSDAQ if chr(self.inputs.get(0, ord('2'))) == '4' \
+            else constants.MARKET_CODE_KOSPI
+        codes = self.com.codes[market]
+        close = np.array([self.com.daily(code)['close'][-1] for code in codes])
+        columns = {
+            0: np.array(codes),
+            1: np.array(['종목{}'.format(code[1:]) for code in codes]),
+            2: close.astype(np.int64),
+            3: np.zeros(len(codes), dtype=np.int64),
+            4: np.zeros(len(codes)),
+            5: np.full(len(codes), 1000, dtype=np.int64),
+            6: close.astype(np.int64) // 100,
+        }
+        for i in range(7, 12):
+            columns[i] = np.zeros(len(codes))
+        return columns, len(codes)
+
+
+class FakeCpTdUtil(FakeObject):
+    AccountNumber = ('333033333',)
+
+    def TradeInit(self, flag=0):
+        return 0
+
+    def GoodsList(self, account_no, flag):
+        return ('01',)
+
+
+class FakeCpTd0311(FakeObject):
+    """
+    주식 주문: 주문 시 접수/체결 실시간 이벤트를 CpConclusion 구독자에게 보낸다
+    """
+    limit_type = constants.LT_TRADE_REQUEST
+
+    def respond(self):
+        order_no = self.com.place_order(self.inputs)
+        self.header = {i: v for i, v in self.inputs.items()}
+        self.header[8] = order_no
+        return {}, 0
+
+
+class FakeCpTd5341(FakeObject):
+    """
+    금일 주문 체결 내역
+    """
+    limit_type = constants.LT_TRADE_REQUEST
+    cntidx = 6
+
+    def respond(self):
+        orders = self.com.orders[::-1]
+        columns = {
+            1: np.array([o['order_no'] for o in orders], dtype=np.int64),
+            2: np.zeros(len(orders), dtype=np.int64),
+            3: np.array([o['code'] for o in orders]),
+            4: np.array(['종목{}'.format(o['code'][1:]) for o in orders]),
+            5: np.array(['매수' if o['action'] == '2' else '매도' for o in orders]),
+            7: np.array([o['amount'] for o in orders], dtype=np.int64),
+            9: np.array([o['filled'] for o in orders], dtype=np.int64),
+            11: np.array([o['price'] for o in orders], dtype=np.int64),
+            22: np.array([o.get('cancelable', 0) for o in orders], dtype=np.int64),
+        }
+        return columns, len(orders)
+
+
+class FakeCpTd6033(FakeObject):
+    """
+    계좌 잔고
+    """
+    limit_type = constants.LT_TRADE_REQUEST
+    cntidx = 7
+
+    def respond(self):
+        codes = sorted(self.com.positions)
+        columns = {
+            0: np.array(['종목{}'.format(code[1:]) for code in codes]),
+            3: np.array([self.com.positions[code] for code in codes], dtype=np.int64),
+            7: np.array([self.com.positions[code] for code in codes], dtype=np.int64),
+            12: np.array(codes),
+            15: np.array([self.com.positions[code] for code in codes], dtype=np.int64),
+        }
+        self.header = {0: '모의계좌', 3: 0, 4: 0, 8: 0.0}
+        return columns, len(codes)
+
+
+class FakeCpTdNew5331A(FakeObject):
+    limit_type = constants.LT_TRADE_REQUEST
+
+    def respond(self):
+        self.header = {10: 10000000}
+        return {}, 0
+
+
+class FakeCpTdNew5331B(FakeCpTd6033):
+    cntidx = 0
+
+    def respond(self):
+        codes = sorted(self.com.positions)
+        columns = {
+            0: np.array(codes),
+            1: np.array(['종목{}'.format(code[1:]) for code in codes]),
+            6: np.array([self.com.positions[code] for code in codes], dtype=np.int64),
+        }
+        return columns, len(codes)
+
+
+class FakeStockCur(FakeObject):
+    """
+    주식 현재가 실시간, FakeCOM.emit_ticks() 로 이벤트 발생
+    """
+    pass
+
+
+class FakeCpConclusion(FakeObject):
+    """
+    주문 체결 실시간
+    """
+    pass
+
+
+PROGIDS = {
+    'cputil.cpcybos': FakeCpCybos,
+    'cputil.cpcodemgr': FakeCpCodeMgr,
+    'cpsysdib.stockchart': FakeStockChart,
+    'cpsysdib.marketeye': FakeMarketEye,
+    'cpsysdib.cpsvr7238': FakeCpSvr7238,
+    'cpsysdib.cpsvr7254': FakeCpSvr7254,
+    'cpsysdib.cpsvr8548': FakeCpSvr8548,
+    'cptrade.cptdutil': FakeCpTdUtil,
+    'cptrade.cptd0311': FakeCpTd0311,
+    'cptrade.cptd5341': FakeCpTd5341,
+    'cptrade.cptd6033': FakeCpTd6033,
+    'cptrade.cptdnew5331a': FakeCpTdNew5331A,
+    'cptrade.cptdnew5331b': FakeCpTdNew5331B,
+    'dscbo1.stockcur': FakeStockCur,
+    'dscbo1.cpconclusion': FakeCpConclusion,
+}
+
+
+class FakeCOM:
+    """
+    n_codes: 시장별 종목 수
+    latency: BlockRequest 한 번의 지연 시간(초)
+    limits: {limit_type: (건수, 기간(초))}, None 이면 크레온 요청 제한, {} 이면 제한 없음
+    today: yyyymmdd, 합성 데이터의 마지막 날짜
+    """
+    def __init__(self, n_codes=100, latency=0.0, limits=None, seed=0, today=None):
+        self.latency = latency
+        self.seed = seed
+        if limits is None:
+            limits = {
+                constants.LT_TRADE_REQUEST: constants.LIMIT_TRADE_REQUEST,
+                constants.LT_NONTRADE_REQUEST: constants.LIMIT_NONTRADE_REQUEST,
+                constants.LT_SUBSCRIBE: constants.LIMIT_SUBSCRIBE,
+            }
+        self.limits = limits
+        self.counters = {}  # limit_type -> [사용 건수, 창 시작 시각]
+        self.today = int(today) if today is not None else int(time.strftime('%Y%m%d'))
+        self.connected = True
+        self.codes = {
+            constants.MARKET_CODE_KOSPI: ['A{:06d}'.format(i * 10) for i in range(1, n_codes + 1)],
+            constants.MARKET_CODE_KOSDAQ: ['A{:06d}'.format(100000 + i * 10) for i in range(1, n_codes + 1)],
+        }
+        self.n_requests = 0
+        self.n_throttled = 0
+        self.series = {}
+        self.subscriptions = {}  # code -> [StockCur]
+        self.conclusions = []
+        self.orders = []
+        self.positions = {}
+        self.pending = deque()
+        self.lock = threading.RLock()
+
+    # COM 인터페이스
+    def Dispatch(self, progid):
+        return PROGIDS[progid.lower()](self, progid)
+
+    def WithEvents(self, obj, handler_cls):
+        handler = handler_cls()
+        obj.handlers.append(handler)
+        return handler
+
+    # 요청 제한
+    def consume(self, limit_type):
+        with self.lock:
+            self.n_requests += 1
+            if limit_type not in self.limits:
+                return True
+            capacity, period = self.limits[limit_type]
+            now = time.monotonic()
+            counter = self.counters.setdefault(limit_type, [0, now])
+            if period is not None and now - counter[1] >= period:
+                counter[0], counter[1] = 0, now
+            if counter[0] >= capacity:
+                self.n_throttled += 1
+                return False
+            counter[0] += 1
+            return True
+
+    def remain(self, limit_type):
+        """
+        return (남은 건수, 창이 다시 열리기까지 남은 시간(ms))
+        """
+        with self.lock:
+            if limit_type not in self.limits:
+                return 10 ** 6, 0
+            capacity, period = self.limits[limit_type]
+            if limit_type == constants.LT_SUBSCRIBE:
+                n = sum(len(objs) for objs in self.subscriptions.values())
+                return capacity - n, 0
+            counter = self.counters.get(limit_type)
+            now = time.monotonic()
+            if counter is None or now - counter[1] >= period:
+                return capacity, 0
+            return capacity - counter[0], int((counter[1] + period - now) * 1000)
+
+    # 합성 데이터
+    def market_of(self, code):
+        for market, codes in self.codes.items():
+            if code in codes:
+                return market
+        return 0
+
+    def daily(self, code, unit='D'):
+        if not code.startswith('A') and not code.startswith('U'):
+            code = 'A' + code
+        key = (code, 'D')
+        if key not in self.series:
+            days = np.arange(np.datetime64(START_DATE), to_datetime64(self.today) + 1)
+            days = days[np.is_busday(days)]
+            rng = np.random.RandomState(code_seed(code, self.seed))
+            base = 1000 + code_seed(code) % 100000
+            close = np.round(base * np.exp(np.cumsum(rng.normal(0, 0.02, len(days)))))
+            prev = np.concatenate([[close[0]], close[:-1]])
+            open_ = np.round(prev * (1 + rng.normal(0, 0.005, len(days))))
+            high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, len(days))))
+            low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, len(days))))
+            volume = rng.randint(10000, 1000000, len(days)).astype(np.int64)
+            diff = close - prev
+            self.series[key] = {
+                'day': days,
+                'date': to_int_dates(days),
+                'open': open_,
+                'high': np.round(high),
+                'low': np.round(low),
+                'close': close,
+                'diff': diff,
+                'volume': volume,
+                'price': (volume * close).astype(np.int64),
+                'diffsign': diffsigns(diff),
+            }
+        bars = self.series[key]
+        if unit == 'D':
+            return bars
+        if (code, unit) not in self.series:
+            self.series[(code, unit)] = self.aggregate(bars, unit)
+        return self.series[(code, unit)]
+
+    def aggregate(self, bars, unit):
+        """
+        일봉을 주/월봉으로 묶는다, 날짜는 기간의 마지막 거래일
+        """
+        if unit == 'W':
+            # 1970-01-05 는 월요일
+            groups = (bars['day'] - np.datetime64('1970-01-05')).astype(int) // 7
+        else:
+            groups = bars['date'] // 100
+        last = np.flatnonzero(np.diff(groups)) + 1
+        starts = np.concatenate([[0], last])
+        ends = np.concatenate([last, [len(groups)]]) - 1
+        diff = bars['close'][ends] - np.concatenate([[bars['open'][0]], bars['close'][ends][:-1]])
+        return {
+            'date': bars['date'][ends],
+            'open': bars['open'][starts],
+            'high': np.maximum.reduceat(bars['high'], starts),
+            'low': np.minimum.reduceat(bars['low'], starts),
+            'close': bars['close'][ends],
+            'diff': diff,
+            'volume': np.add.reduceat(bars['volume'], starts),
+            'price': np.add.reduceat(bars['price'], starts),
+            'diffsign': diffsigns(diff),
+        }
+
+    def minutely(self, code, date_from, date_to, n=None):
+        bars = self.daily(code)
+        dates = bars['date']
+        mask = (dates <= date_to) & (dates >= date_from)
+        idx = np.flatnonzero(mask)
+        times = minute_times()
+        if n is not None:
+            idx = idx[-(n // len(times) + 1):]
+        ndays = len(idx)
+        # 날짜마다 따로 만들어 조회 구간이 달라도 같은 날의 분봉은 같다
+        steps = np.empty((ndays, len(times)))
+        volume = np.empty((ndays, len(times)), dtype=np.int64)
+        for i, date in enumerate(dates[idx]):
+            rng = np.random.RandomState(code_seed(code, self.seed + 1 + int(date)))
+            steps[i] = rng.normal(0, 0.001, len(times))
+            volume[i] = rng.randint(10, 10000, len(times))
+        close = np.round(bars['close'][idx][:, None] * np.exp(steps - steps[:, -1:]))
+        prev = np.round(bars['close'][idx] - bars['diff'][idx])
+        close = close.ravel()
+        diff = close - np.repeat(prev, len(times))
+        return {
+            'date': np.repeat(dates[idx], len(times)),
+            'time': np.tile(times, ndays),
+            'open': close,
+            'high': close,
+            'low': close,
+            'close': close,
+            'diff': diff,
+            'volume': volume.ravel(),
+            'price': (volume.ravel() * close).astype(np.int64),
+            'diffsign': diffsigns(diff),
+        }
+
+    # 실시간
+    def subscribe(self, obj):
+        with self.lock:
+            if isinstance(obj, FakeCpConclusion):
+                self.conclusions.append(obj)
+            else:
+                self.subscriptions.setdefault(obj.inputs.get(0), []).append(obj)
+
+    def unsubscribe(self, obj):
+        with self.lock:
+            if isinstance(obj, FakeCpConclusion):
+                if obj in self.conclusions:
+                    self.conclusions.remove(obj)
+                return
+            objs = self.subscriptions.get(obj.inputs.get(0), [])
+            if obj in objs:
+                objs.remove(obj)
+            if not objs:
+                self.subscriptions.pop(obj.inputs.get(0), None)
+
+    def post(self, fn):
+        """
+        이벤트를 쌓아 두었다가 pump() 에서 발생시킨다 (COM 메시지 펌프 흉내)
+        """
+        self.pending.append(fn)
+
+    def pump(self):
+        n = 0
+        while self.pending:
+            self.pending.popleft()()
+            n += 1
+        return n
+
+    def emit_ticks(self, n=1, codes=None):
+        """
+        구독 중인 종목마다 틱 n 개를 바로 발생시킨다
+        return 발생시킨 이벤트 수
+        """
+        cnt = 0
+        codes = list(self.subscriptions.keys()) if codes is None else codes
+        for code in codes:
+            bars = self.daily(code)
+            rng = np.random.RandomState(code_seed(code, self.seed + 2))
+            price = int(bars['close'][-1])
+            prev = int(bars['close'][-2])
+            cum_volume = 0
+            for i in range(n):
+                price = max(1, price + int(rng.randint(-2, 3)))
+                amount = int(rng.randint(1, 100))
+                cum_volume += amount
+                second = 90000 + (i // 60) * 100 + i % 60
+                header = {
+                    0: code, 1: '종목{}'.format(code[1:]), 2: price - prev, 3: second // 100,
+                    4: prev, 5: price + 10, 6: price - 10, 7: price + 1, 8: price - 1,
+                    9: cum_volume, 10: cum_volume * price, 13: price, 14: ord('1') + i % 2,
+                    15: cum_volume // 2, 16: cum_volume - cum_volume // 2, 17: amount, 18: second,
+                    19: ord('2'), 20: ord('2'), 21: 0, 22: ord('2') if price > prev else ord('5'),
+                }
+                for obj in list(self.subscriptions.get(code, [])):
+                    obj.header = header
+                    obj.fire()
+                    cnt += 1
+        return cnt
+
+    def place_order(self, inputs):
+        """
+        주문을 기록하고 접수/체결 이벤트를 쌓아 둔다
+        """
+        with self.lock:
+            order_no = len(self.orders) + 1
+            code = inputs.get(3)
+            amount = int(inputs.get(4, 0))
+            action = str(inputs.get(0))
+            price = int(self.daily(code)['close'][-1])
+            # cancelable: 정정취소가능수량, 바로 전량 체결되므로 0
+            order = {'order_no': order_no, 'code': code, 'amount': amount, 'action': action,
+                     'filled': amount, 'price': price, 'cancelable': 0}
+            self.orders.append(order)
+            self.positions[code] = self.positions.get(code, 0) + (amount if action == '2' else -amount)
+        base = {1: '모의계좌', 2: '종목{}'.format(code[1:]), 3: amount, 4: 0, 5: order_no, 6: 0,
+                7: inputs.get(1), 8: inputs.get(2), 9: code, 12: action, 16: '1', 17: '1'}
+        self.post(lambda: self.conclude({**base, 14: '4'}))
+        self.post(lambda: self.conclude({**base, 4: price, 14: '1'}))
+        return order_no
+
+    def conclude(self, header):
+        for obj in list(self.conclusions):
+            obj.header = header
+            obj.fire()
+
+
+class RecordingObject:
+    """
+    실제 COM 객체를 감싸서 BlockRequest 단위로 응답을 기록
+    """
+    def __init__(self, recorder, progid, obj):
+        self.__dict__['recorder'] = recorder
+        self.__dict__['progid'] = progid.lower()
+        self.__dict__['obj'] = obj
+        self.__dict__['inputs'] = {}
+        self.__dict__['pages'] = None
+        self.__dict__['page'] = None
+
+    def SetInputValue(self, i, v):
+        self.inputs[i] = v
+        self.__dict__['pages'] = None
+        return self.obj.SetInputValue(i, v)
+
+    def BlockRequest(self):
+        ret = self.obj.BlockRequest()
+        if self.pages is None:
+            self.__dict__['pages'] = self.recorder.start(self.progid, self.inputs)
+        self.__dict__['page'] = {'ret': ret, 'header': {}, 'data': {}}
+        self.pages.append(self.page)
+        return ret
+
+    def GetDibStatus(self):
+        return self.record('status', self.obj.GetDibStatus())
+
+    def GetDibMsg1(self):
+        return self.record('msg', self.obj.GetDibMsg1())
+
+    def GetHeaderValue(self, i):
+        v = self.obj.GetHeaderValue(i)
+        if self.page is not None:
+            self.page['header'][i] = v
+        return v
+
+    def GetDataValue(self, j, i):
+        v = self.obj.GetDataValue(j, i)
+        if self.page is not None:
+            self.page['data'][(j, i)] = v
+        return v
+
+    def record(self, k, v):
+        if self.page is not None:
+            self.page[k] = v
+        return v
+
+    def __getattr__(self, name):
+        v = getattr(self.obj, name)
+        if name == 'Continue':
+            self.record('continue', v)
+        return v
+
+    def __setattr__(self, name, v):
+        setattr(self.obj, name, v)
+
+
+class RecordingCOM:
+    """
+    com: 실제 win32com.client
+    save(path) 로 기록을 저장하고 ReplayCOM(path) 로 재생
+    """
+    def __init__(self, com):
+        self.com = com
+        self.records = {}
+
+    def Dispatch(self, progid):
+        return RecordingObject(self, progid, self.com.Dispatch(progid))
+
+    def WithEvents(self, obj, handler_cls):
+        if isinstance(obj, RecordingObject):
+            obj = obj.obj
+        return self.com.WithEvents(obj, handler_cls)
+
+    def start(self, progid, inputs):
+        pages = []
+        self.records[record_key(progid, inputs)] = pages
+        return pages
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.records, f)
+
+
+def record_key(progid, inputs):
+    return progid.lower(), repr(sorted((k, tuple(v) if isinstance(v, list) else v)
+                                      for k, v in inputs.items()))
+
+
+class ReplayObject(FakeObject):
+    def __init__(self, com, progid):
+        super().__init__(com, progid)
+        self.pages = None
+        self.page = None
+
+    def SetInputValue(self, i, v):
+        super().SetInputValue(i, v)
+        self.pages = None
+
+    def BlockRequest(self):
+        if self.pages is None:
+            self.pages = deque(self.com.records.get(record_key(self.progid, self.inputs), []))
+        if not self.pages:
+            self.page = {'ret': 1, 'status': -1, 'msg': '기록되지 않은 요청입니다.',
+                         'header': {}, 'data': {}, 'continue': 0}
+        else:
+            self.page = self.pages.popleft()
+        self.Continue = self.page.get('continue', 0)
+        return self.page.get('ret', 0)
+
+    def GetDibStatus(self):
+        return self.page.get('status', 0)
+
+    def GetDibMsg1(self):
+        return self.page.get('msg', '')
+
+    def GetHeaderValue(self, i):
+        return self.page['header'][i]
+
+    def GetDataValue(self, j, i):
+        return self.page['data'][(j, i)]
+
+
+class ReplayCOM:
+    """
+    RecordingCOM 으로 기록한 응답을 같은 입력값에 대해 순서대로 재생
+    기록에 없는 객체(CpCybos 등)는 fallback(FakeCOM) 으로 처리
+    """
+    def __init__(self, records, fallback=None):
+        if isinstance(records, str):
+            with open(records, 'rb') as f:
+                records = pickle.load(f)
+        self.records = records
+        self.progids = set(k[0] for k in records)
+        self.fallback = fallback if fallback is not None else FakeCOM(limits={})
+
+    def Dispatch(self, progid):
+        if progid.lower() in self.progids:
+            return ReplayObject(self, progid)
+        return self.fallback.Dispatch(progid)
+
+    def WithEvents(self, obj, handler_cls):
+        return self.fallback.WithEvents(obj, handler_cls)
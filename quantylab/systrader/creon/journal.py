@@ -0,0 +1,365 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+실시간 체결 저널
+root/yyyymmdd/A005930.tj  : 헤더 + 고정 길이 레코드 (직전 틱과의 차이로 저장)
+root/yyyymmdd/A005930.idx : 분이 바뀌는 레코드 번호와 그 직전의 절대값 (시간으로 찾기/중간부터 복원)
+"""
+import os
+import sys
+import time
+import queue
+import threading
+from datetime import datetime
+
+import numpy as np
+
+# from quantylab.systrader import util
+# from quantylab.systrader.creon.columnar import ColumnarResult
+
+import util as util
+from columnar import ColumnarResult
+
+
+MAGIC = b'CTJ1'
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'), ('version', '<u4'), ('date', '<i4'), ('code', 'S12'), ('base_ts', '<i8'),
+    ('reserved', 'S32'),
+])
+
+# ts: 수신 시각(ms), second: 체결 시각(hhmmss), ask/bid: 매도/매수호가
+RECORD_DTYPE = np.dtype([
+    ('dts', '<u4'), ('dsecond', '<i4'), ('dprice', '<i4'), ('dask', '<i4'), ('dbid', '<i4'),
+    ('volume', '<u4'), ('contract_type', 'u1'), ('market_flag', 'u1'), ('price_type', 'u1'),
+    ('diffsign', 'u1'),
+])
+
+# 레코드 record 를 복원할 때 시작값 (record 직전 틱의 절대값)
+INDEX_DTYPE = np.dtype([
+    ('hhmm', '<i4'), ('record', '<i8'), ('ts', '<i8'), ('second', '<i4'), ('price', '<i4'),
+    ('ask', '<i4'), ('bid', '<i4'),
+])
+
+ABS_KEYS = ['ts', 'second', 'price', 'ask', 'bid']
+FLAG_KEYS = ['contract_type', 'market_flag', 'price_type', 'diffsign']
+JOURNAL_KEYS = ABS_KEYS + ['volume'] + FLAG_KEYS
+
+# 저널에 필요한 StockCur 필드 (subscribe_stockcur(fields=...) 에 사용)
+JOURNAL_TICK_FIELDS = ['code', 'second', 'price', 'bid_sell', 'bid_buy', 'contract_amount',
+                       'contract_type', 'market_flag', 'price_type', 'diffsign']
+
+
+def to_code(v):
+    return v if isinstance(v, int) else ord(v)
+
+
+def segment_path(root, date, code, ext='tj'):
+    return os.path.join(root, str(date), 'A{}.{}'.format(code, ext))
+
+
+def midnight_ms(date):
+    return int(datetime.strptime(str(date), util.FORMAT_DATE).timestamp() * 1000)
+
+
+class Segment:
+    """
+    쓰는 중인 종목별 파일과 직전 틱의 절대값
+    """
+    def __init__(self, root, date, code):
+        path = segment_path(root, date, code)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.base_ts = midnight_ms(date)
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER_DTYPE.itemsize
+        self.f = open(path, 'r+b' if exists else 'wb')
+        self.prev = np.array([self.base_ts, 0, 0, 0, 0], dtype=np.int64)
+        self.hhmm = -1
+        self.n = 0
+        if exists:
+            self.resume(root, date, code)
+        else:
+            if os.path.exists(segment_path(root, date, code, 'idx')):
+                os.remove(segment_path(root, date, code, 'idx'))
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header['magic'] = MAGIC
+            header['version'] = 1
+            header['date'] = int(date)
+            header['code'] = code.encode()
+            header['base_ts'] = self.base_ts
+            self.f.write(header.tobytes())
+        self.fidx = open(segment_path(root, date, code, 'idx'), 'ab')
+
+    def resume(self, root, date, code):
+        """
+        재시작하면 기존 파일 끝에 이어 쓴다, 쓰다 만 레코드는 잘라낸다
+        """
+        reader = TickJournalReader(root, date, code)
+        self.n = len(reader)
+        self.f.truncate(HEADER_DTYPE.itemsize + self.n * RECORD_DTYPE.itemsize)
+        self.f.seek(0, os.SEEK_END)
+        idx_path = segment_path(root, date, code, 'idx')
+        if os.path.exists(idx_path):
+            os.truncate(idx_path, len(reader.index) * INDEX_DTYPE.itemsize)
+        if self.n > 0:
+            last = reader.decode(self.n - 1, self.n)
+            self.prev = np.array([int(last[k][0]) for k in ABS_KEYS], dtype=np.int64)
+            self.hhmm = int(last['second'][0]) // 100
+
+    def write(self, rows):
+        """
+        rows: (ts, second, price, ask, bid, volume, contract_type, market_flag, price_type, diffsign) 목록
+        """
+        values = np.array(rows, dtype=np.int64)
+        absolute = values[:, :5]
+        prev = np.vstack([self.prev, absolute[:-1]])
+        deltas = absolute - prev
+        deltas[:, 0] = np.maximum(deltas[:, 0], 0)  # 시계가 되돌아가도 음수가 되지 않게
+
+        # 시계 보정 후 복원될 수신 시각
+        ts = np.cumsum(deltas[:, 0]) + self.prev[0]
+        prev[:, 0] = np.concatenate([[self.prev[0]], ts[:-1]])
+
+        records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+        for j, k in enumerate(['dts', 'dsecond', 'dprice', 'dask', 'dbid']):
+            records[k] = deltas[:, j]
+        records['volume'] = values[:, 5]
+        for j, k in enumerate(FLAG_KEYS):
+            records[k] = values[:, 6 + j]
+
+        # 분이 바뀌는 레코드마다 인덱스
+        hhmm = values[:, 1] // 100
+        changed = np.flatnonzero(hhmm != np.concatenate([[self.hhmm], hhmm[:-1]]))
+        if len(changed) > 0:
+            index = np.zeros(len(changed), dtype=INDEX_DTYPE)
+            index['hhmm'] = hhmm[changed]
+            index['record'] = self.n + changed
+            # 복원 시작값은 직전 틱의 절대값
+            for j, k in enumerate(ABS_KEYS):
+                index[k] = prev[changed, j]
+            self.hhmm = int(hhmm[-1])
+
+        # 레코드를 먼저 써야 인덱스가 없는 레코드를 가리키지 않는다
+        self.f.write(records.tobytes())
+        if len(changed) > 0:
+            self.fidx.write(index.tobytes())
+        self.prev = absolute[-1].copy()
+        self.prev[0] = ts[-1]
+        self.n += len(rows)
+
+    def flush(self):
+        self.f.flush()
+        self.fidx.flush()
+
+    def close(self):
+        self.f.close()
+        self.fidx.close()
+
+
+class TickJournal:
+    """
+    subscribe_stockcur 콜백에서 틱을 큐에 넣기만 하고 기록은 writer 스레드가 모아서 한다
+    c.subscribe_stockcur(code, journal.on_tick, fields=JOURNAL_TICK_FIELDS)
+    또는 tick_store 사용 시 c.subscribe_stockcur(code, journal.on_ring, raw=True, fields=JOURNAL_TICK_FIELDS)
+    """
+    def __init__(self, root='journal', date=None, flush_interval=1.0):
+        self.root = root
+        self.date = int(date) if date is not None else int(util.get_str_today())
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()
+        self.segments = {}
+        self.thread = threading.Thread(target=self.run, name='tick-journal', daemon=True)
+        self.running = True
+        self.thread.start()
+
+    def on_tick(self, tick):
+        code = tick['code']
+        if code.startswith('A'):
+            code = code[1:]
+        self.queue.put((code, (
+            int(time.time() * 1000), tick['second'], tick['price'], tick['bid_sell'], tick['bid_buy'],
+            tick['contract_amount'], to_code(tick['contract_type']), to_code(tick['market_flag']),
+            to_code(tick['price_type']), to_code(tick['diffsign']))))
+
+    def on_ring(self, ring):
+        """
+        링에 JOURNAL_TICK_FIELDS 가 없으면 ValueError
+        """
+        i = (ring.n - 1) % ring.capacity
+        cols = ring.columns
+        try:
+            row = (
+                int(time.time() * 1000), int(cols['second'][i]), int(cols['price'][i]),
+                int(cols['bid_sell'][i]), int(cols['bid_buy'][i]), int(cols['contract_amount'][i]),
+                int(cols['contract_type'][i]), int(cols['market_flag'][i]), int(cols['price_type'][i]),
+                int(cols['diffsign'][i]))
+        except KeyError:
+            ring.require(JOURNAL_TICK_FIELDS)
+            raise
+        self.queue.put((ring.code, row))
+
+    def roll(self, date):
+        """
+        새 거래일 파일로 넘어간다
+        """
+        self.queue.put(('__roll__', int(date)))
+
+    def segment(self, code):
+        seg = self.segments.get(code)
+        if seg is None:
+            seg = self.segments[code] = Segment(self.root, self.date, code)
+        return seg
+
+    def close_segments(self):
+        for seg in self.segments.values():
+            seg.close()
+        self.segments = {}
+
+    def run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                items = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                items = []
+            # 쌓인 틱을 한꺼번에 가져와 종목별로 모아 쓴다
+            while True:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = {}
+            stop = False
+            for code, row in items:
+                if code is None:
+                    stop = True
+                    continue
+                if code == '__roll__':
+                    self.write(batch)
+                    batch = {}
+                    self.close_segments()
+                    self.date = row
+                    continue
+                batch.setdefault(code, []).append(row)
+            self.write(batch)
+            if stop or time.time() - last_flush >= self.flush_interval:
+                for seg in self.segments.values():
+                    seg.flush()
+                last_flush = time.time()
+            if stop:
+                self.close_segments()
+                return
+
+    def write(self, batch):
+        for code, rows in batch.items():
+            try:
+                self.segment(code).write(rows)
+            except Exception as e:
+                print('journal write failed. {} {}'.format(code, e), file=sys.stderr)
+
+    def close(self):
+        if self.running:
+            self.running = False
+            self.queue.put((None, None))
+            self.thread.join()
+
+
+class TickJournalReader:
+    """
+    저널 파일을 memmap 으로 열어 복원
+    """
+    def __init__(self, root, date, code):
+        if code.startswith('A'):
+            code = code[1:]
+        self.code = code
+        path = segment_path(root, date, code)
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header['magic'][0] != MAGIC:
+            raise ValueError('not a tick journal: {}'.format(path))
+        self.date = int(header['date'][0])
+        self.base_ts = int(header['base_ts'][0])
+        n = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+        if n > 0:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode='r',
+                                     offset=HEADER_DTYPE.itemsize, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        idx_path = segment_path(root, date, code, 'idx')
+        index = np.fromfile(idx_path, dtype=INDEX_DTYPE) if os.path.exists(idx_path) else \
+            np.zeros(0, dtype=INDEX_DTYPE)
+        self.index = index[index['record'] < n]
+
+    def __len__(self):
+        return len(self.records)
+
+    def base(self, start):
+        """
+        start 레코드를 복원하기 위한 (시작 레코드 번호, 절대값)
+        """
+        i = int(np.searchsorted(self.index['record'], start, side='right')) - 1
+        if i < 0:
+            return 0, [self.base_ts, 0, 0, 0, 0]
+        entry = self.index[i]
+        return int(entry['record']), [int(entry[k]) for k in ABS_KEYS]
+
+    def decode(self, start=0, stop=None):
+        """
+        return <ColumnarResult> [start, stop) 레코드의 절대값
+        """
+        stop = len(self.records) if stop is None else min(stop, len(self.records))
+        start = max(0, min(start, stop))
+        begin, values = self.base(start)
+        records = self.records[begin:stop]
+        columns = {}
+        for k, dk, v in zip(ABS_KEYS, ['dts', 'dsecond', 'dprice', 'dask', 'dbid'], values):
+            columns[k] = (np.cumsum(records[dk], dtype=np.int64) + v)[start - begin:]
+        columns['volume'] = records['volume'][start - begin:].astype(np.int64)
+        for k in FLAG_KEYS:
+            columns[k] = records[k][start - begin:]
+        return ColumnarResult(columns, keys=JOURNAL_KEYS)
+
+    def seek(self, hhmmss):
+        """
+        체결 시각이 hhmmss 이상인 첫 레코드 번호
+        """
+        hhmm = hhmmss // 100
+        i = int(np.searchsorted(self.index['hhmm'], hhmm, side='left'))
+        if i >= len(self.index):
+            return len(self.records)
+        start = int(self.index['record'][i])
+        stop = int(self.index['record'][i + 1]) if i + 1 < len(self.index) else len(self.records)
+        seconds = self.decode(start, stop)['second']
+        return start + int(np.searchsorted(seconds, hhmmss, side='left'))
+
+    def read(self, time_from=None, time_to=None):
+        """
+        체결 시각 [time_from, time_to] (hhmmss) 의 틱
+        """
+        start = self.seek(time_from) if time_from is not None else 0
+        stop = self.seek(time_to + 1) if time_to is not None else len(self.records)
+        return self.decode(start, stop)
+
+    def scan(self):
+        """
+        return <ColumnarResult> 하루 전체 틱
+        """
+        return self.decode()
+
+    def replay(self, cb, time_from=None, time_to=None, speed=None, chunk=10000):
+        """
+        cb(dict) 를 틱마다 호출
+        speed: None 이면 최대 속도, 1.0 이면 수신 간격대로
+        """
+        start = self.seek(time_from) if time_from is not None else 0
+        stop = self.seek(time_to + 1) if time_to is not None else len(self.records)
+        time_start = prev_ts = None
+        for a in range(start, stop, chunk):
+            result = self.decode(a, min(a + chunk, stop))
+            for item in result.to_dicts():
+                if speed is not None:
+                    if time_start is None:
+                        time_start, prev_ts = time.time(), item['ts']
+                    delay = (item['ts'] - prev_ts) / 1000 / speed - (time.time() - time_start)
+                    if delay > 0:
+                        time.sleep(delay)
+                item['code'] = self.code
+                cb(item)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+KRX 거래일 달력
+휴장일 표로 np.busdaycalendar 를 만들고 거래일 배열을 미리 계산해 두어 벡터 연산으로 조회한다
+날짜는 yyyymmdd 정수/문자열 또는 그 배열
+"""
+import os
+import threading
+
+import numpy as np
+
+
+# 주말 외 KRX 휴장일 (공휴일, 대체공휴일, 임시공휴일, 선거일, 근로자의날, 연말 휴장일)
+# 표에 없는 연도는 주말만 휴장으로 본다
+HOLIDAYS = [
+    # 2020
+    20200101, 20200124, 20200127, 20200415, 20200430, 20200501, 20200505, 20200817,
+    20200930, 20201001, 20201002, 20201009, 20201225, 20201231,
+    # 2021
+    20210101, 20210211, 20210212, 20210301, 20210505, 20210519, 20210816, 20210920,
+    20210921, 20210922, 20211004, 20211011, 20211231,
+    # 2022
+    20220131, 20220201, 20220202, 20220301, 20220309, 20220505, 20220601, 20220606,
+    20220815, 20220909, 20220912, 20221003, 20221010, 20221230,
+    # 2023
+    20230123, 20230124, 20230301, 20230501, 20230505, 20230529, 20230606, 20230815,
+    20230928, 20230929, 20231002, 20231003, 20231009, 20231225, 20231229,
+    # 2024
+    20240101, 20240209, 20240212, 20240301, 20240410, 20240501, 20240506, 20240515,
+    20240606, 20240815, 20240916, 20240917, 20240918, 20241001, 20241003, 20241009,
+    20241225, 20241231,
+    # 2025
+    20250101, 20250127, 20250128, 20250129, 20250130, 20250303, 20250501, 20250505,
+    20250506, 20250603, 20250606, 20250815, 20251003, 20251006, 20251007, 20251008,
+    20251009, 20251225, 20251231,
+    # 2026
+    20260101, 20260216, 20260217, 20260218, 20260302, 20260501, 20260505, 20260525,
+    20260603, 20260817, 20260924, 20260925, 20261005, 20261009, 20261225, 20261231,
+]
+
+# 대학수학능력시험일: 개장 10:00, 폐장 16:30
+CSAT_DATES = [20201203, 20211118, 20221117, 20231116, 20241114, 20251113, 20261119]
+
+# 정규장 시간 (hhmm), 2016-08-01 부터 폐장 15:30
+SESSION_OPEN = 900
+SESSION_CLOSE = 1530
+SESSION_CLOSE_BEFORE_20160801 = 1500
+
+# 장 마감 동시호가 시간(분), 이 동안은 분봉이 없고 폐장 시각에 봉 하나
+CLOSING_AUCTION_MINUTES = 10
+
+
+def to_datetime64(dates):
+    """
+    yyyymmdd (정수, 문자열 또는 배열) -> datetime64[D]
+    """
+    dates = np.asarray(dates).astype(np.int64)
+    years = (dates // 10000 - 1970).astype('datetime64[Y]')
+    months = years.astype('datetime64[M]') + (dates // 100 % 100 - 1)
+    return months.astype('datetime64[D]') + (dates % 100 - 1)
+
+
+def to_int(days):
+    """
+    datetime64[D] (또는 배열) -> yyyymmdd 정수
+    """
+    days = np.asarray(days).astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    y = months.astype('datetime64[Y]').astype(np.int64) + 1970
+    m = months.astype(np.int64) % 12 + 1
+    d = (days - months).astype(np.int64) + 1
+    return y * 10000 + m * 100 + d
+
+
+def to_minutes(hhmm):
+    hhmm = np.asarray(hhmm)
+    return hhmm // 100 * 60 + hhmm % 100
+
+
+class KRXCalendar:
+    """
+    start ~ end 의 거래일을 미리 계산해 둔다
+    holidays: 휴장일 목록 (yyyymmdd), None 이면 HOLIDAYS
+    special: {yyyymmdd: (개장 hhmm, 폐장 hhmm)} 지연 개장/조기 폐장, None 이면 수능일과 새해 첫 거래일
+    """
+    def __init__(self, holidays=None, special=None, start=20000101, end=None):
+        self.holidays = sorted(set(HOLIDAYS if holidays is None else holidays))
+        self.busdaycal = np.busdaycalendar(holidays=to_datetime64(self.holidays))
+        self.start = int(start)
+        self.end = int(end) if end is not None else (max(self.holidays) // 10000 + 1) * 10000 + 1231
+        days = np.arange(to_datetime64(self.start), to_datetime64(self.end) + 1)
+        self.days = days[np.is_busday(days, busdaycal=self.busdaycal)]
+        self.dates = to_int(self.days)
+
+        if special is None:
+            special = {date: (1000, 1630) for date in CSAT_DATES}
+            # 새해 첫 거래일은 한 시간 늦게 개장
+            years = self.dates // 10000
+            first = self.start // 10000 - (1 if self.start % 10000 == 101 else 0)
+            for date in self.dates[np.flatnonzero(np.diff(years, prepend=first))].tolist():
+                special.setdefault(date, (1000, self.default_hours(date)[1]))
+        self.special = {int(k): tuple(v) for k, v in special.items()}
+
+    def default_hours(self, date):
+        if date < 20160801:
+            return SESSION_OPEN, SESSION_CLOSE_BEFORE_20160801
+        return SESSION_OPEN, SESSION_CLOSE
+
+    def is_session(self, dates):
+        return np.is_busday(to_datetime64(dates), busdaycal=self.busdaycal)
+
+    def next_session(self, dates, n=1):
+        """
+        dates 이후 n 번째 거래일 (dates 가 휴장일이어도 다음 거래일부터 센다)
+        """
+        days = np.busday_offset(to_datetime64(dates), 0, roll='backward', busdaycal=self.busdaycal)
+        return to_int(np.busday_offset(days, n, busdaycal=self.busdaycal))
+
+    def prev_session(self, dates, n=1):
+        """
+        dates 이전 n 번째 거래일
+        """
+        days = np.busday_offset(to_datetime64(dates), 0, roll='forward', busdaycal=self.busdaycal)
+        return to_int(np.busday_offset(days, -n, busdaycal=self.busdaycal))
+
+    def rollforward(self, dates):
+        """
+        거래일이면 그대로, 아니면 다음 거래일
+        """
+        return to_int(np.busday_offset(to_datetime64(dates), 0, roll='forward', busdaycal=self.busdaycal))
+
+    def rollback(self, dates):
+        """
+        거래일이면 그대로, 아니면 이전 거래일
+        """
+        return to_int(np.busday_offset(to_datetime64(dates), 0, roll='backward', busdaycal=self.busdaycal))
+
+    def sessions(self, date_from, date_to):
+        """
+        return [date_from, date_to] 거래일 배열 (yyyymmdd)
+        """
+        date_from, date_to = int(date_from), int(date_to)
+        if date_from >= self.start and date_to <= self.end:
+            a = np.searchsorted(self.dates, date_from, side='left')
+            b = np.searchsorted(self.dates, date_to, side='right')
+            return self.dates[a:b]
+        days = np.arange(to_datetime64(date_from), to_datetime64(date_to) + 1)
+        return to_int(days[np.is_busday(days, busdaycal=self.busdaycal)])
+
+    def count_sessions(self, date_from, date_to):
+        """
+        [date_from, date_to] 거래일 수, 배열도 받는다
+        """
+        days_to = to_datetime64(date_to) + 1
+        return np.busday_count(to_datetime64(date_from), days_to, busdaycal=self.busdaycal)
+
+    def session_hours(self, dates):
+        """
+        return (개장 hhmm 배열, 폐장 hhmm 배열)
+        """
+        dates = np.atleast_1d(np.asarray(dates).astype(np.int64))
+        opens = np.full(len(dates), SESSION_OPEN)
+        closes = np.where(dates < 20160801, SESSION_CLOSE_BEFORE_20160801, SESSION_CLOSE)
+        if self.special:
+            keys = np.array(sorted(self.special))
+            idx = np.searchsorted(keys, dates)
+            idx[idx >= len(keys)] = 0
+            mask = keys[idx] == dates
+            for i in np.flatnonzero(mask):
+                opens[i], closes[i] = self.special[int(dates[i])]
+        return opens, closes
+
+    def bars_per_session(self, dates, interval=1):
+        """
+        거래일별 분봉 개수 (interval 분봉)
+        접속매매 구간의 봉과 장 마감 동시호가 봉 하나
+        """
+        opens, closes = self.session_hours(dates)
+        minutes = to_minutes(closes) - to_minutes(opens) - CLOSING_AUCTION_MINUTES
+        return -(-minutes // interval) + 1
+
+    def expected_bars(self, date_from, date_to, unit='D'):
+        """
+        [date_from, date_to] 에 있어야 할 봉 개수
+        unit: 'D', 'W', 'M', 'm'
+        """
+        dates = self.sessions(date_from, date_to)
+        if unit == 'D':
+            return len(dates)
+        if unit == 'W':
+            weeks = (to_datetime64(dates) - np.datetime64('1970-01-05')).astype(np.int64) // 7
+            return len(np.unique(weeks))
+        if unit == 'M':
+            return len(np.unique(dates // 100))
+        if unit == 'm':
+            return int(self.bars_per_session(dates).sum())
+        raise ValueError('unsupported unit: {}'.format(unit))
+
+    def save(self, path):
+        tmp = path + '.tmp.npz'
+        keys = sorted(self.special)
+        np.savez(tmp, holidays=np.array(self.holidays, dtype=np.int64), start=self.start, end=self.end,
+                 special_dates=np.array(keys, dtype=np.int64),
+                 special_hours=np.array([self.special[k] for k in keys], dtype=np.int64).reshape(-1, 2))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            special = dict(zip(f['special_dates'].tolist(), map(tuple, f['special_hours'].tolist())))
+            return cls(holidays=f['holidays'].tolist(), special=special,
+                       start=int(f['start']), end=int(f['end']))
+
+
+calendar = None
+calendar_lock = threading.Lock()
+
+
+def get_calendar():
+    """
+    기본 KRX 달력 (처음 호출할 때 한 번 만든다)
+    """
+    global calendar
+    if calendar is None:
+        with calendar_lock:
+            if calendar is None:
+                calendar = KRXCalendar()
+    return calendar
+
+
+def set_calendar(cal):
+    """
+    휴장일 표를 갱신한 달력으로 교체
+    """
+    global calendar
+    calendar = cal
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+주문 체결 실시간(CpConclusion) 이벤트로 갱신하는 주문 장부
+주문번호/원주문번호로 바로 찾고 종목별 미체결 주문을 따로 모아 둔다
+CpTd5341 (금일 주문 체결 내역) 조회는 이벤트를 놓쳤을 때를 대비해 가끔만 대조한다
+"""
+import sys
+import time
+import threading
+
+
+# 체결구분코드 (CpConclusion 14)
+CONCLUSION_FILLED = '1'
+CONCLUSION_CONFIRMED = '2'
+CONCLUSION_REJECTED = '3'
+CONCLUSION_ACCEPTED = '4'
+
+# 정정취소구분코드 (CpConclusion 16)
+MODIFY_NORMAL = '1'
+MODIFY_MODIFY = '2'
+MODIFY_CANCEL = '3'
+
+# 주문 상태
+STATUS_ACCEPTED = 'accepted'
+STATUS_PARTIAL = 'partial'
+STATUS_FILLED = 'filled'
+STATUS_CANCELLED = 'cancelled'
+STATUS_REJECTED = 'rejected'
+STATUS_CLOSED = [STATUS_FILLED, STATUS_CANCELLED, STATUS_REJECTED]
+
+
+def strip_code(code):
+    code = str(code)
+    return code[1:] if code.startswith('A') else code
+
+
+class Order:
+    __slots__ = ['order_no', 'org_order_no', 'code', 'name', 'action', 'amount', 'price',
+                 'filled', 'filled_value', 'status', 'modify_type', 'updated']
+
+    def __init__(self, order_no, code, action=None, amount=0, price=0, org_order_no=0, name=None,
+                 modify_type=MODIFY_NORMAL):
+        self.order_no = order_no
+        self.org_order_no = org_order_no
+        self.code = code
+        self.name = name
+        self.action = action  # 1: 매도, 2: 매수
+        self.amount = amount  # 주문수량 (정정/취소로 줄어든 수량 반영)
+        self.price = price
+        self.filled = 0
+        self.filled_value = 0
+        self.status = STATUS_ACCEPTED
+        self.modify_type = modify_type
+        self.updated = time.time()
+
+    @property
+    def remaining(self):
+        return max(0, self.amount - self.filled)
+
+    @property
+    def avg_price(self):
+        return self.filled_value / self.filled if self.filled > 0 else 0
+
+    @property
+    def is_open(self):
+        return self.status not in STATUS_CLOSED
+
+    def to_dict(self):
+        item = {k: getattr(self, k) for k in self.__slots__}
+        item['remaining'] = self.remaining
+        item['avg_price'] = self.avg_price
+        return item
+
+    def __repr__(self):
+        return 'Order({}, {}, {}, {}/{})'.format(
+            self.order_no, self.code, self.status, self.filled, self.amount)
+
+
+class OrderBook:
+    """
+    c.enable_order_book() 로 만들거나 c.subscribe_orderevent(book.on_event) 로 연결
+    on_update(order, item): 이벤트로 주문 상태가 바뀔 때마다 호출, add_listener() 로 더 붙일 수 있다
+    call(fn, *args): COM 호출을 실행할 함수 (예: ComWorker.call), None 이면 부른 스레드에서 바로 호출
+    """
+    def __init__(self, creon=None, on_update=None, call=None):
+        self.creon = creon
+        self.on_update = on_update
+        self.call = call
+        self.listeners = []
+        self.orders = {}  # 주문번호 -> Order
+        self.children = {}  # 원주문번호 -> [정정/취소 주문번호]
+        self.open_by_code = {}  # 종목코드 -> {주문번호: Order}
+        self.lock = threading.RLock()
+        self.reconciled = None  # 마지막 대조 시각
+        self.reconcile_thread = None
+        self.stop_event = threading.Event()
+
+    def __len__(self):
+        return len(self.orders)
+
+    def __contains__(self, order_no):
+        return int(order_no) in self.orders
+
+    def add_listener(self, cb):
+        if cb not in self.listeners:
+            self.listeners.append(cb)
+
+    def remove_listener(self, cb):
+        if cb in self.listeners:
+            self.listeners.remove(cb)
+
+    def get(self, order_no):
+        return self.orders.get(int(order_no))
+
+    def get_children(self, org_order_no):
+        """
+        원주문번호로 정정/취소 주문 목록
+        """
+        with self.lock:
+            return [self.orders[no] for no in self.children.get(int(org_order_no), [])]
+
+    def open_orders(self, code=None):
+        with self.lock:
+            if code is not None:
+                return list(self.open_by_code.get(strip_code(code), {}).values())
+            return [order for orders in self.open_by_code.values() for order in orders.values()]
+
+    def add(self, order):
+        self.orders[order.order_no] = order
+        if order.org_order_no:
+            self.children.setdefault(order.org_order_no, []).append(order.order_no)
+        self.index(order)
+        return order
+
+    def index(self, order):
+        """
+        상태에 따라 종목별 미체결 목록에 넣거나 뺀다
+        """
+        orders = self.open_by_code.setdefault(order.code, {})
+        if order.is_open:
+            orders[order.order_no] = order
+        else:
+            orders.pop(order.order_no, None)
+            if not orders:
+                del self.open_by_code[order.code]
+
+    def close(self, order, status):
+        order.status = status
+        self.index(order)
+
+    def on_event(self, item):
+        """
+        subscribe_orderevent 콜백 (OrderEventHandler 의 dict)
+        """
+        with self.lock:
+            order = self.apply(item)
+        if order is None:
+            return
+        listeners = self.listeners if self.on_update is None else [self.on_update] + self.listeners
+        for cb in listeners:
+            try:
+                cb(order, item)
+            except Exception as e:
+                print('order update callback failed. {}'.format(e), file=sys.stderr)
+
+    def apply(self, item):
+        order_no = int(item['주문번호'])
+        org_order_no = int(item.get('원주문번호') or 0)
+        kind = str(item['체결구분코드'])
+        modify_type = str(item.get('정정취소구분코드') or MODIFY_NORMAL)
+        amount = int(item['체결수량'])
+        price = item['체결가격']
+
+        order = self.orders.get(order_no)
+        if order is None:
+            # 접수 이벤트를 놓치고 체결부터 받은 경우에도 만든다
+            order = self.add(Order(
+                order_no, strip_code(item['종목코드']), action=str(item['매매구분코드']),
+                amount=amount if kind == CONCLUSION_ACCEPTED else 0, price=price,
+                org_order_no=org_order_no, name=item.get('name'), modify_type=modify_type))
+        order.updated = time.time()
+
+        if kind == CONCLUSION_ACCEPTED:
+            # 접수: 체결수량/체결가격 자리에 주문수량/주문가격
+            order.amount = max(order.amount, amount)
+            order.price = price
+        elif kind == CONCLUSION_FILLED:
+            order.filled += amount
+            order.filled_value += amount * price
+            order.amount = max(order.amount, order.filled)
+            self.close(order, STATUS_FILLED if order.remaining == 0 else STATUS_PARTIAL)
+        elif kind == CONCLUSION_CONFIRMED:
+            self.confirm(order, org_order_no, modify_type, amount)
+        elif kind == CONCLUSION_REJECTED:
+            self.close(order, STATUS_REJECTED)
+        return order
+
+    def confirm(self, order, org_order_no, modify_type, amount):
+        """
+        정정/취소 확인: 원주문의 남은 수량을 줄이고 정정 주문은 새 주문번호로 이어간다
+        """
+        org = self.orders.get(org_order_no)
+        if org is not None and org is not order:
+            org.amount = max(org.filled, org.amount - amount)
+            org.updated = order.updated
+            if org.remaining == 0:
+                self.close(org, STATUS_FILLED if org.filled > 0 and modify_type == MODIFY_MODIFY
+                           else STATUS_CANCELLED)
+        if modify_type == MODIFY_CANCEL:
+            order.amount = amount
+            self.close(order, STATUS_CANCELLED)
+        else:
+            order.amount = max(order.amount, amount)
+            self.index(order)
+
+    def reconcile(self):
+        """
+        CpTd5341 금일 주문 체결 내역과 대조하여 놓친 접수/체결을 반영
+        return 바뀐 주문 수
+        """
+        if self.creon is None:
+            return 0
+        if self.call is not None:
+            rows = self.call(self.creon.get_trade_history)['data']
+        else:
+            rows = self.creon.get_trade_history()['data']
+        changed = 0
+        with self.lock:
+            for row in rows:
+                order_no = int(row['주문번호'])
+                if order_no == 0:
+                    continue
+                amount = int(row['주문수량'] or 0)
+                filled = int(row['총체결수량'] or 0)
+                order = self.orders.get(order_no)
+                if order is None:
+                    order = self.add(Order(
+                        order_no, strip_code(row['종목코드']), amount=amount, price=row['주문단가'],
+                        org_order_no=int(row['원주문번호'] or 0), name=row['종목이름']))
+                    changed += 1
+                if filled > order.filled:
+                    # 빠진 체결은 체결단가(없으면 주문단가)로 채운다
+                    order.filled_value += (filled - order.filled) * (row['체결단가'] or order.price)
+                    order.filled = filled
+                    order.amount = max(order.amount, amount, filled)
+                    self.close(order, STATUS_FILLED if order.remaining == 0 else STATUS_PARTIAL)
+                    order.updated = time.time()
+                    changed += 1
+                cancelable = row.get('정정취소가능수량')
+                if order.is_open and cancelable is not None and order.filled + int(cancelable or 0) < order.amount:
+                    # 놓친 취소/정정 확인: 체결되지 않았는데 정정/취소할 수 없는 수량은 취소된 것
+                    order.amount = order.filled + int(cancelable or 0)
+                    if order.remaining == 0:
+                        self.close(order, STATUS_CANCELLED)
+                    order.updated = time.time()
+                    changed += 1
+            self.reconciled = time.time()
+        return changed
+
+    def start_reconcile(self, interval=60):
+        """
+        interval 초마다 대조, 이벤트가 주 경로이므로 길게 둔다
+        미체결 주문이 없어도 대조한다 (접수 이벤트를 놓친 주문은 장부에 없으므로)
+        CpTd5341 조회는 call 로 COM 스레드에서 실행한다 (CreonProxy 를 쓰면 Creon.com_call 로 설정됨)
+        """
+        if self.call is None:
+            print('order book reconcile runs COM calls on its own thread. use CreonProxy.', file=sys.stderr)
+        self.stop_reconcile()
+        self.stop_event.clear()
+
+        def run():
+            while not self.stop_event.wait(interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    print('order book reconcile failed. {}'.format(e), file=sys.stderr)
+
+        self.reconcile_thread = threading.Thread(target=run, name='orderbook-reconcile', daemon=True)
+        self.reconcile_thread.start()
+
+    def stop_reconcile(self):
+        if self.reconcile_thread is not None:
+            self.stop_event.set()
+            self.reconcile_thread.join()
+            self.reconcile_thread = None
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import threading
+
+# from quantylab.systrader.creon import constants
+
+import constants as constants
+
+
+class TokenBucket:
+    """
+    크레온 요청 제한 창(window) 단위 토큰 버킷
+    capacity: 창 당 요청 가능 건수
+    period: 창 길이(초), None 이면 반납(release) 방식 (실시간 구독 건수 제한)
+    tokens 가 음수이면 다음 창 이후로 예약된 요청이 있다는 뜻
+    """
+    def __init__(self, capacity, period=None):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = capacity
+        self.reset_at = None  # 다음 창 시작 시각 (time.monotonic 기준)
+        self.synced_at = None
+
+    def refill(self, now):
+        if self.period is None or self.reset_at is None:
+            return
+        if now >= self.reset_at:
+            n = int((now - self.reset_at) // self.period) + 1
+            self.tokens = min(self.capacity, self.tokens + n * self.capacity)
+            self.reset_at += n * self.period
+
+    def delay(self, now):
+        """
+        다음 토큰을 쓸 수 있을 때까지 남은 시간(초)
+        """
+        if self.tokens > 0 or self.period is None or self.reset_at is None:
+            return 0
+        pending = -self.tokens
+        return max(self.reset_at + (pending // self.capacity) * self.period - now, 0)
+
+    def reserve(self, now):
+        """
+        토큰 하나를 예약하고 예약된 창이 열릴 때까지 기다려야 할 시간(초)을 반환
+        """
+        delay = self.delay(now)
+        if self.reset_at is None and self.period is not None:
+            self.reset_at = now + self.period
+        self.tokens -= 1
+        return delay
+
+    def release(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+    def sync(self, remain_count, remain_time, now):
+        """
+        remain_count: GetLimitRemainCount() 값
+        remain_time: LimitRequestRemainTime 값 (ms)
+        """
+        self.tokens = min(self.capacity, remain_count)
+        if self.period is not None:
+            if remain_time > 0:
+                self.reset_at = now + remain_time / 1000
+            else:
+                self.reset_at = None
+        self.synced_at = now
+
+
+class RateLimiter:
+    """
+    요청 제한 구분별 토큰 버킷으로 요청 가능 시점을 예측하여 요청을 예약한다
+    counter(limit_type) -> (remain_count, remain_time_ms) 로 COM 카운터와 가끔씩만 동기화
+    """
+    def __init__(self, counter=None, sync_interval=5.0, limits=None, sleep=None):
+        """
+        limits: {limit_type: (건수, 기간(초))}, None 이면 constants 의 크레온 요청 제한
+        sleep(seconds): 기다릴 때 쓰는 함수, None 이면 time.sleep (Creon 은 COM 워커에서 메시지를 펌프하며 기다린다)
+        """
+        self.counter = counter
+        self.sync_interval = sync_interval
+        self.sleep = sleep if sleep is not None else time.sleep
+        if limits is None:
+            limits = {
+                constants.LT_TRADE_REQUEST: constants.LIMIT_TRADE_REQUEST,
+                constants.LT_NONTRADE_REQUEST: constants.LIMIT_NONTRADE_REQUEST,
+                constants.LT_SUBSCRIBE: constants.LIMIT_SUBSCRIBE,
+            }
+        self.buckets = {k: TokenBucket(*v) for k, v in limits.items()}
+        self.lock = threading.Lock()
+
+    def sync(self, limit_type, bucket, now, force=False):
+        if self.counter is None:
+            return
+        if bucket.tokens < 0:
+            # 다음 창으로 예약된 요청이 있으면 예측값을 유지
+            return
+        if not force and bucket.synced_at is not None \
+                and now - bucket.synced_at < self.sync_interval:
+            return
+        remain_count, remain_time = self.counter(limit_type)
+        bucket.sync(remain_count, remain_time, now)
+
+    def prepare(self, limit_type):
+        bucket = self.buckets[limit_type]
+        now = time.monotonic()
+        bucket.refill(now)
+        # 토큰이 바닥났다고 예측되면 기다리기 전에 COM 카운터로 확인
+        self.sync(limit_type, bucket, now, force=bucket.tokens == 0)
+        return bucket, now
+
+    def acquire(self, limit_type=constants.LT_NONTRADE_REQUEST):
+        """
+        요청 하나를 예약하고 예약된 시점까지 대기
+        """
+        with self.lock:
+            bucket, now = self.prepare(limit_type)
+            delay = bucket.reserve(now)
+        if delay > 0:
+            self.sleep(delay)
+        return delay
+
+    def wait(self, limit_type=constants.LT_NONTRADE_REQUEST):
+        """
+        토큰을 쓰지 않고 요청 가능한 시점까지만 대기
+        """
+        with self.lock:
+            bucket, now = self.prepare(limit_type)
+            delay = bucket.delay(now)
+        if delay:
+            self.sleep(delay)
+        return delay
+
+    def delay(self, limit_type=constants.LT_NONTRADE_REQUEST):
+        """
+        기다리지 않고 다음 토큰을 쓸 수 있을 때까지 남은 시간(초)만 반환
+        """
+        with self.lock:
+            bucket, now = self.prepare(limit_type)
+            return bucket.delay(now)
+
+    def try_acquire(self, limit_type=constants.LT_SUBSCRIBE):
+        """
+        기다리지 않고 토큰을 얻을 수 있으면 True
+        """
+        with self.lock:
+            bucket, now = self.prepare(limit_type)
+            if bucket.tokens <= 0:
+                return False
+            bucket.reserve(now)
+            return True
+
+    def release(self, limit_type=constants.LT_SUBSCRIBE):
+        with self.lock:
+            self.buckets[limit_type].release()
+
+    def remain(self, limit_type=constants.LT_NONTRADE_REQUEST):
+        with self.lock:
+            bucket = self.buckets[limit_type]
+            bucket.refill(time.monotonic())
+            return bucket.tokens
+
+    def saturated(self, limit_type=constants.LT_NONTRADE_REQUEST):
+        return self.remain(limit_type) <= 0
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+크레온 시작/재접속 절차
+teardown: 크레온 프로세스를 동시에 종료하고 프로세스 핸들로 종료를 기다린다
+start: coStarter 실행
+wait: 연결 감시(ConnectionMonitor)의 연결 이벤트를 기다린다
+restore: 주문 초기화, 실시간 구독을 재접속 전 상태로 되돌린다
+단계별 소요 시간은 timings 에 남는다
+"""
+import sys
+import time
+import subprocess
+
+try:
+    import win32api
+    import win32event
+except ImportError:
+    win32api = None
+
+try:
+    from pywinauto import application
+except ImportError:
+    application = None
+
+# from quantylab.systrader.creon.connmonitor import find_pids, SYNCHRONIZE
+
+from connmonitor import find_pids, SYNCHRONIZE
+
+
+STARTER = 'C:\\CREON\\STARTER\\coStarter.exe'
+CLIENT_PROCESSES = ['coStarter.exe', 'CpStart.exe', 'DibServer.exe']
+
+
+class Reconnector:
+    """
+    creon: Creon, 실시간 구독과 주문 초기화 상태를 읽어 두었다가 되돌린다
+    timeout: 연결을 기다리는 최대 시간(초)
+    """
+    def __init__(self, creon, id_, pwd, pwdcert, timeout=300, starter=STARTER, processes=None,
+                 poll_interval=0.2):
+        self.creon = creon
+        self.id_ = id_
+        self.pwd = pwd
+        self.pwdcert = pwdcert
+        self.timeout = timeout
+        self.starter = starter
+        self.processes = processes if processes is not None else CLIENT_PROCESSES
+        self.poll_interval = poll_interval
+        self.timings = {}  # 단계 -> 소요 시간(초)
+        self.failed = None  # 실패한 단계
+        self.state = None
+        self.started = None  # coStarter 를 실행한 시각
+
+    def phase(self, name, fn):
+        t = time.perf_counter()
+        try:
+            ok = fn()
+        except Exception as e:
+            print('{} failed. {}'.format(name, e), file=sys.stderr)
+            ok = False
+        self.timings[name] = time.perf_counter() - t
+        if not ok:
+            self.failed = name
+        return ok
+
+    def run(self, force=True):
+        """
+        force: False 이면 이미 연결되어 있을 때 재시작하지 않는다
+        return 연결되었으면 True
+        """
+        self.timings = {}
+        self.failed = None
+        self.phase('snapshot', self.snapshot)
+        if not force and self.creon.connected():
+            print("already connected!")
+            return True
+        ok = self.phase('teardown', self.teardown) and self.phase('start', self.start) \
+            and self.phase('wait', self.wait) and self.phase('restore', self.restore)
+        print('reconnect {}. {}'.format(
+            'done' if ok else 'failed at {}'.format(self.failed),
+            ', '.join('{} {:.2f}s'.format(k, v) for k, v in self.timings.items())))
+        return ok
+
+    def snapshot(self):
+        """
+        재접속 후 되돌릴 상태
+        """
+        c = self.creon
+        self.state = {
+            'trade': c.trade_session.ready,
+            'stockcur': dict(c.stockcur_args),
+            'orderevent': c.orderevent_handler is not None,
+            'orderevent_cb': c.orderevent_cb,
+        }
+        return True
+
+    def teardown(self):
+        """
+        프로세스를 동시에 종료하고 모두 끝날 때까지 기다린다
+        """
+        self.creon.trade_session.invalidate()
+        pids = find_pids(self.processes)
+        handles = []
+        if win32api is not None:
+            for pid in [pid for name in self.processes for pid in pids[name]]:
+                try:
+                    handles.append(win32api.OpenProcess(SYNCHRONIZE, False, pid))
+                except Exception:
+                    pass
+        procs = [subprocess.Popen('taskkill /IM {} /F /T'.format(name), shell=True,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for name in self.processes if pids[name]]
+        for proc in procs:
+            proc.wait()
+        try:
+            if handles:
+                # 마지막 프로세스가 끝나는 순간 반환
+                for i in range(0, len(handles), 64):
+                    win32event.WaitForMultipleObjects(handles[i:i + 64], True, int(self.timeout * 1000))
+        finally:
+            for handle in handles:
+                win32api.CloseHandle(handle)
+        remain = [name for name, pids in find_pids(self.processes).items() if pids]
+        for name in remain:
+            # taskkill 로 끝나지 않은 프로세스만 wmic 으로 다시 종료
+            subprocess.call('wmic process where "name like \'%{}%\'" call terminate'.format(name.split('.')[0]),
+                            shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return not [name for name, pids in find_pids(self.processes).items() if pids]
+
+    def start(self):
+        self.started = time.time()
+        app = application.Application()
+        app.start('{starter} /prj:cp /id:{id} /pwd:{pwd} /pwdcert:{pwdcert} /autostart'.format(
+            starter=self.starter, id=self.id_, pwd=self.pwd, pwdcert=self.pwdcert))
+        return True
+
+    def wait(self):
+        """
+        연결될 때까지 기다린다, 연결 감시 중이면 연결 이벤트를 기다리고 아니면 poll_interval 마다 확인
+        COM 워커에서 실행 중이면 (Creon.pump) 기다리는 동안 메시지를 펌프한다
+        """
+        monitor = self.creon.connection_monitor
+        if monitor is not None and monitor.running:
+            monitor.refresh()
+            if self.creon.pump is None:
+                return monitor.wait_for(True, timeout=self.timeout, after=self.started)
+
+            def ready():
+                return monitor.wait_for(True, timeout=0, after=self.started)
+        else:
+            ready = self.creon.connected
+        deadline = time.monotonic() + self.timeout
+        while not ready():
+            if time.monotonic() >= deadline:
+                return False
+            self.creon.sleep(self.poll_interval)
+        return True
+
+    def restore(self):
+        """
+        주문 초기화와 실시간 구독을 재접속 전 상태로
+        """
+        c = self.creon
+        state = self.state or {}
+        ok = True
+        if state.get('trade') and c.init_trade() is None:
+            ok = False
+        # 이전 구독 객체는 끊긴 서버에 묶여 있으므로 버리고 새로 구독
+        for code, args in state.get('stockcur', {}).items():
+            c.drop_stockcur(code)
+            if not c.subscribe_stockcur(code, *args):
+                ok = False
+        if state.get('orderevent'):
+            c.orderevent_handler = None
+            c.subscribe_orderevent(state.get('orderevent_cb'))
+        return ok
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+브릿지(bridge_flask, bridge_django) 공용 응답 캐시
+엔드포인트별 유효 시간, 장 시간에 따른 유효 시간, ETag/If-None-Match (304), LRU 로 메모리 제한,
+요청 제한이 꽉 찼을 때는 만료된 응답을 먼저 주고 뒤에서 새로 조회 (stale-while-revalidate)
+"""
+import sys
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# from quantylab.systrader.creon.krxcalendar import get_calendar, to_minutes
+# from quantylab.systrader.creon.singleflight import SingleFlight, normalize
+
+from krxcalendar import get_calendar, to_minutes
+from singleflight import SingleFlight, normalize
+
+
+# 장 시작 전/마감 후에도 데이터가 바뀌는 시간 (동시호가, 시간외), 분
+ACTIVE_BEFORE_OPEN = 60
+ACTIVE_AFTER_CLOSE = 150
+
+# 빈 응답의 유효 시간(초), 조회가 잘못된 것일 수 있으므로 짧게 두고 다시 조회
+EMPTY_TTL = 5
+EMPTY_BODIES = (b'[]', b'{}', b'null', b'""')
+
+
+class Policy:
+    """
+    ttl: 장중 유효 시간(초), None 이면 다음 장 시작 전까지 (하루 동안 바뀌지 않는 데이터)
+    ttl_closed: 장이 끝난 뒤 유효 시간(초), None 이면 다음 장 시작 전까지
+    stale: 만료 후 요청 제한이 꽉 찼을 때 대신 줄 수 있는 시간(초)
+    empty_ttl: 빈 응답(빈 목록 등)의 유효 시간(초), 장 시간과 관계없이 이 값을 넘지 않는다
+    """
+    def __init__(self, ttl=None, ttl_closed=None, stale=0, empty_ttl=EMPTY_TTL):
+        self.ttl = ttl
+        self.ttl_closed = ttl_closed
+        self.stale = stale
+        self.empty_ttl = empty_ttl
+
+
+POLICIES = {
+    'stockcodes': Policy(None),
+    # 장중 거래정지 등을 반영하도록 짧게
+    'stockstatus': Policy(30),
+    'stockfeatures': Policy(5, stale=30),
+    'stockcandles': Policy(10, stale=60),
+    'marketcandles': Policy(10, stale=60),
+    'short': Policy(60, stale=300),
+    'investorbuysell': Policy(60, stale=300),
+    'marketcap': Policy(60, stale=300),
+}
+
+
+class CachedResponse:
+    __slots__ = ['status', 'body', 'etag', 'max_age']
+
+    def __init__(self, status, body, etag, max_age):
+        self.status = status  # 200 또는 304
+        self.body = body  # JSON bytes, 304 이면 b''
+        self.etag = etag
+        self.max_age = max_age  # Cache-Control max-age (초)
+
+
+class Entry:
+    __slots__ = ['body', 'etag', 'expires', 'stale_until', 'refreshing']
+
+    def __init__(self, body, expires, stale):
+        self.body = body
+        self.etag = '"{}"'.format(hashlib.blake2b(body, digest_size=12).hexdigest())
+        self.expires = expires
+        self.stale_until = expires + stale
+        self.refreshing = False
+
+
+def to_json(result):
+    return json.dumps(result, ensure_ascii=False, default=str).encode('utf-8')
+
+
+class ResponseCache:
+    """
+    get(endpoint, params, if_none_match, fn, *args, **kwargs)
+    params: 쿼리 파라미터 dict (캐시 키), fn(*args, **kwargs): 캐시에 없을 때 조회
+    wait: 조회 전에 호출 (예: Creon.wait), saturated: 요청 제한이 꽉 찼으면 True 를 반환하는 함수
+    flight: 캐시에 없는 같은 조회가 동시에 들어오면 한 번만 실행 (SingleFlight), None 이면 각자 조회
+    """
+    def __init__(self, policies=None, max_entries=10000, max_bytes=256 * 1024 * 1024, wait=None,
+                 saturated=None, workers=2, flight=True):
+        self.policies = dict(POLICIES if policies is None else policies)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.wait = wait
+        self.saturated = saturated
+        self.flight = SingleFlight() if flight is True else flight
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='respcache')
+        self.stats = {'hit': 0, 'miss': 0, 'stale': 0, 'not_modified': 0}
+
+    def key(self, endpoint, params):
+        return normalize(endpoint, params)
+
+    def market_active(self, now):
+        """
+        return (장중 여부, 다음 장 시작 시각의 timestamp)
+        """
+        cal = get_calendar()
+        today = int(now.strftime('%Y%m%d'))
+        minutes = now.hour * 60 + now.minute
+        opens, closes = cal.session_hours(today)
+        begin = int(to_minutes(opens[0])) - ACTIVE_BEFORE_OPEN
+        end = int(to_minutes(closes[0])) + ACTIVE_AFTER_CLOSE
+        if bool(cal.is_session(today)) and minutes < begin:
+            next_day, next_begin = today, begin
+        else:
+            next_day = int(cal.next_session(today))
+            next_begin = int(to_minutes(cal.session_hours(next_day)[0][0])) - ACTIVE_BEFORE_OPEN
+        d = datetime.strptime(str(next_day), '%Y%m%d').replace(hour=next_begin // 60, minute=next_begin % 60)
+        active = bool(cal.is_session(today)) and begin <= minutes < end
+        return active, d.timestamp()
+
+    def ttl(self, policy, now):
+        active, next_open = self.market_active(datetime.fromtimestamp(now))
+        ttl = policy.ttl if active else policy.ttl_closed
+        if ttl is None or (not active and now + ttl > next_open):
+            ttl = next_open - now
+        return max(0.0, ttl)
+
+    def make_entry(self, policy, body):
+        now = time.time()
+        if body in EMPTY_BODIES:
+            # 빈 응답은 장이 끝난 뒤에도 다음 장까지 남지 않도록 짧게, 만료 후 대신 주지도 않는다
+            return Entry(body, now + min(policy.empty_ttl, self.ttl(policy, now)), 0)
+        return Entry(body, now + self.ttl(policy, now), policy.stale)
+
+    def get(self, endpoint, params, if_none_match, fn, *args, **kwargs):
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return self.respond(self.fetch(endpoint, params, fn, args, kwargs), None, if_none_match)
+        key = self.key(endpoint, params)
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                if now < entry.expires:
+                    self.stats['hit'] += 1
+                    return self.respond(entry, entry.expires - now, if_none_match)
+                if now < entry.stale_until and self.saturated is not None and self.saturated():
+                    # 요청 제한이 꽉 찼으면 만료된 응답을 주고 새 응답은 뒤에서 받는다
+                    self.stats['stale'] += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        self.executor.submit(self.refresh, key, params, policy, fn, args, kwargs)
+                    return self.respond(entry, 0, if_none_match)
+            self.stats['miss'] += 1
+        entry = self.refresh(key, params, policy, fn, args, kwargs)
+        return self.respond(entry, entry.expires - time.time(), if_none_match)
+
+    def call(self, fn, args, kwargs):
+        if self.wait is not None:
+            self.wait()
+        return fn(*args, **kwargs)
+
+    def fetch(self, endpoint, params, fn, args, kwargs):
+        if self.flight is not None:
+            result = self.flight.do(endpoint, params, self.call, fn, args, kwargs)
+        else:
+            result = self.call(fn, args, kwargs)
+        return Entry(to_json(result), 0, 0)
+
+    def refresh(self, key, params, policy, fn, args, kwargs):
+        try:
+            body = self.fetch(key[0], params, fn, args, kwargs).body
+        except Exception as e:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+            print('cache refresh failed. {} {}'.format(key, e), file=sys.stderr)
+            raise
+        entry = self.make_entry(policy, body)
+        self.put(key, entry)
+        return entry
+
+    def peek(self, endpoint, params):
+        """
+        return 만료되지 않은 캐시 응답 (Entry), 없으면 None (통계에 세지 않는다)
+        """
+        if endpoint not in self.policies:
+            return None
+        with self.lock:
+            entry = self.entries.get(self.key(endpoint, params))
+        if entry is None or time.time() >= entry.expires:
+            return None
+        return entry
+
+    def store(self, endpoint, params, result):
+        """
+        밖에서 조회한 결과를 캐시에 넣는다 (예: 여러 종목을 묶어서 조회한 결과)
+        return Entry
+        """
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return Entry(to_json(result), 0, 0)
+        entry = self.make_entry(policy, to_json(result))
+        self.put(self.key(endpoint, params), entry)
+        return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= len(old.body)
+            self.entries[key] = entry
+            self.nbytes += len(entry.body)
+            while self.entries and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= len(evicted.body)
+
+    def respond(self, entry, max_age, if_none_match):
+        max_age = int(max_age) if max_age is not None else 0
+        if if_none_match and entry.etag in [tag.strip() for tag in if_none_match.split(',')]:
+            self.stats['not_modified'] += 1
+            return CachedResponse(304, b'', entry.etag, max_age)
+        return CachedResponse(200, entry.body, entry.etag, max_age)
+
+    def invalidate(self, endpoint=None):
+        """
+        endpoint 의 캐시를 비운다, None 이면 전체
+        """
+        with self.lock:
+            for key in [key for key in self.entries if endpoint is None or key[0] == endpoint]:
+                self.nbytes -= len(self.entries.pop(key).body)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+같은 조회가 동시에 들어오면 한 번만 실행하고 결과를 나눠 준다
+진행 중인 조회가 요청 범위를 포함하면 (예: n=500 진행 중에 n=100) 그 결과를 잘라서 준다
+"""
+import threading
+from concurrent.futures import Future
+
+
+def normalize(endpoint, params):
+    """
+    return (endpoint, 빈 값을 뺀 (이름, 값) 정렬 튜플)
+    """
+    return endpoint, tuple(sorted((k, str(v)) for k, v in params.items() if v not in (None, '')))
+
+
+def to_int(v):
+    return int(v) if v not in (None, '') else None
+
+
+def slice_candles(running, params):
+    """
+    running: 진행 중인 조회의 파라미터, params: 새 요청의 파라미터
+    return 진행 중인 결과(과거->최신 dict 리스트)에서 요청 범위를 잘라내는 함수, 포함하지 않으면 None
+    """
+    others = [k for k in set(running) | set(params) if k not in ('n', 'date_from', 'date_to')]
+    if any(running.get(k) != params.get(k) for k in others):
+        return None
+    n, running_n = to_int(params.get('n')), to_int(running.get('n'))
+    date_from, running_from = to_int(params.get('date_from')), to_int(running.get('date_from'))
+    date_to, running_to = to_int(params.get('date_to')), to_int(running.get('date_to'))
+    if date_from is None and running_from is None and date_to == running_to:
+        # 최근 n 개
+        if n is None or running_n is None or n > running_n:
+            return None
+        return lambda rows: rows[-n:] if n > 0 else []
+    if n is None and running_n is None and date_from is not None and running_from is not None:
+        # 기간: date_to 가 없으면 오늘까지
+        if running_from > date_from:
+            return None
+        if running_to is not None and (date_to is None or running_to < date_to):
+            return None
+        return lambda rows: [row for row in rows
+                             if row['date'] >= date_from and (date_to is None or row['date'] <= date_to)]
+    return None
+
+
+SLICERS = {
+    'stockcandles': slice_candles,
+    'marketcandles': slice_candles,
+}
+
+
+class Call:
+    __slots__ = ['endpoint', 'params', 'future', 'followers']
+
+    def __init__(self, endpoint, params):
+        self.endpoint = endpoint
+        self.params = params
+        self.future = Future()
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    do(endpoint, params, fn, *args, **kwargs): 같은 (endpoint, params) 조회가 진행 중이면 그 결과를 기다린다
+    slicers: {endpoint: slicer(running_params, params)}, 진행 중인 더 큰 조회를 잘라 쓰는 규칙
+    """
+    def __init__(self, slicers=None):
+        self.slicers = dict(SLICERS if slicers is None else slicers)
+        self.calls = {}  # key -> Call
+        self.lock = threading.Lock()
+        self.stats = {'leader': 0, 'shared': 0, 'sliced': 0}
+
+    def find(self, endpoint, params):
+        """
+        return (진행 중인 Call, 자르는 함수 또는 None)
+        """
+        key = normalize(endpoint, params)
+        call = self.calls.get(key)
+        if call is not None:
+            return call, None
+        slicer = self.slicers.get(endpoint)
+        if slicer is None:
+            return None, None
+        for call in self.calls.values():
+            if call.endpoint != endpoint:
+                continue
+            cut = slicer(call.params, params)
+            if cut is not None:
+                return call, cut
+        return None, None
+
+    def do(self, endpoint, params, fn, *args, **kwargs):
+        params = {k: v for k, v in params.items() if v not in (None, '')}
+        key = normalize(endpoint, params)
+        with self.lock:
+            call, cut = self.find(endpoint, params)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call(endpoint, params)
+                self.stats['leader'] += 1
+            else:
+                call.followers += 1
+                self.stats['sliced' if cut is not None else 'shared'] += 1
+        if not leader:
+            result = call.future.result()
+            return cut(result) if cut is not None else result
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.calls.pop(key, None)
+        call.future.set_result(result)
+        return result
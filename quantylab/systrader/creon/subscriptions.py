@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import sys
+import threading
+
+# from quantylab.systrader.creon import constants
+
+import constants as constants
+
+
+class Subscription:
+    """
+    subscribe() 가 반환하는 구독 하나 (해지할 때 사용)
+    """
+    __slots__ = ['code', 'cb', 'priority', 'owner', 'active']
+
+    def __init__(self, code, cb, priority, owner):
+        self.code = code
+        self.cb = cb
+        self.priority = priority
+        self.owner = owner
+        self.active = True
+
+    def __repr__(self):
+        return 'Subscription({}, priority={}, owner={})'.format(self.code, self.priority, self.owner)
+
+
+class SubscriptionManager:
+    """
+    종목당 StockCur 구독 하나를 여러 콜백에 나눠 주고 구독자 수를 세어 마지막 구독자가 해지할 때만 해지한다
+    capacity: 동시에 구독할 수 있는 종목 수, None 이면 크레온 실시간 구독 제한
+    policy: 가득 찼을 때 'evict' 이면 우선순위가 더 낮은 종목을 해지하고 구독, 'reject' 이면 거절
+    on_evict(sub): 밀려난 구독마다 호출
+    fields: subscribe_stockcur() 에 넘길 필드 목록
+    """
+    def __init__(self, creon, capacity=None, policy='evict', on_evict=None, fields=None):
+        self.creon = creon
+        self.capacity = capacity if capacity is not None else constants.LIMIT_SUBSCRIBE[0]
+        self.policy = policy
+        self.on_evict = on_evict
+        self.fields = fields
+        self.subs = {}  # code -> [Subscription]
+        self.dispatchers = {}  # code -> subscribe_stockcur() 에 넘긴 콜백, 해지할 때 이 콜백만 뗀다
+        self.watchlists = {}  # owner -> {code: Subscription}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.subs)
+
+    def codes(self):
+        return list(self.subs.keys())
+
+    def priority(self, code):
+        return max(sub.priority for sub in self.subs[code])
+
+    def dispatch(self, code, item):
+        for sub in list(self.subs.get(code, [])):
+            try:
+                sub.cb(item)
+            except Exception as e:
+                print('stockcur callback failed. {} {}'.format(code, e), file=sys.stderr)
+
+    def subscribe(self, code, cb, priority=0, owner=None):
+        """
+        return <Subscription>, 구독할 수 없으면 None
+        """
+        if code.startswith('A'):
+            code = code[1:]
+        with self.lock:
+            sub = Subscription(code, cb, priority, owner)
+            if code in self.subs:
+                self.subs[code].append(sub)
+                return sub
+            if len(self.subs) >= self.capacity and not self.make_room(priority):
+                print('subscription rejected. {}'.format(code), file=sys.stderr)
+                return None
+            # 매니저 밖에서 이미 구독한 종목이면 기존 구독에 콜백이 붙는다
+            dispatcher = lambda item, code=code: self.dispatch(code, item)
+            ok = self.creon.subscribe_stockcur(code, dispatcher, fields=self.fields)
+            if not ok:
+                return None
+            self.subs[code] = [sub]
+            self.dispatchers[code] = dispatcher
+            return sub
+
+    def release(self, code):
+        # 매니저의 콜백만 떼므로 매니저 밖의 구독자는 계속 틱을 받는다
+        dispatcher = self.dispatchers.pop(code, None)
+        if dispatcher is None:
+            # cb=None 이면 구독 전체가 해지되므로 매니저가 붙인 콜백이 없으면 아무것도 하지 않는다
+            return
+        self.creon.unsubscribe_stockcur(code, cb=dispatcher)
+
+    def make_room(self, priority):
+        """
+        priority 보다 낮은 우선순위 중 가장 낮은 종목을 해지
+        """
+        if self.policy != 'evict' or not self.subs:
+            return False
+        code = min(self.subs, key=self.priority)
+        if self.priority(code) >= priority:
+            return False
+        evicted = self.subs.pop(code)
+        self.release(code)
+        for sub in evicted:
+            sub.active = False
+            if sub.owner in self.watchlists:
+                self.watchlists[sub.owner].pop(code, None)
+            if self.on_evict is not None:
+                self.on_evict(sub)
+        return True
+
+    def unsubscribe(self, sub):
+        if sub is None or not sub.active:
+            return
+        with self.lock:
+            sub.active = False
+            subs = self.subs.get(sub.code, [])
+            if sub in subs:
+                subs.remove(sub)
+            if not subs and sub.code in self.subs:
+                del self.subs[sub.code]
+                self.release(sub.code)
+
+    def set_watchlist(self, owner, codes, cb, priority=0):
+        """
+        owner 의 구독 종목을 codes 로 맞춘다, 바뀐 종목만 구독/해지
+        return 구독하지 못한 종목 목록
+        """
+        codes = [code[1:] if code.startswith('A') else code for code in codes]
+        with self.lock:
+            current = self.watchlists.setdefault(owner, {})
+            keep = set(codes)
+            for code in [code for code in current if code not in keep]:
+                self.unsubscribe(current.pop(code))
+            rejected = []
+            for code in codes:
+                if code in current:
+                    continue
+                sub = self.subscribe(code, cb, priority=priority, owner=owner)
+                if sub is None:
+                    rejected.append(code)
+                else:
+                    current[code] = sub
+            return rejected
+
+    def clear(self, owner=None):
+        """
+        owner 의 구독을 모두 해지, None 이면 전체
+        """
+        with self.lock:
+            if owner is not None:
+                for sub in list(self.watchlists.pop(owner, {}).values()):
+                    self.unsubscribe(sub)
+                return
+            for code in list(self.subs.keys()):
+                for sub in self.subs[code]:
+                    sub.active = False
+                self.release(code)
+            self.subs = {}
+            self.watchlists = {}
@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+
+import numpy as np
+
+# from quantylab.systrader import util
+# from quantylab.systrader.creon import constants
+# from quantylab.systrader.creon.columnar import ColumnarResult
+
+import util as util
+import constants as constants
+from columnar import ColumnarResult
+
+
+# CpCodeMgr 항목 이름과 메서드
+CODEMGR_FIELDS = [
+    ('name', 'CodeToName'),
+    ('marginrate', 'GetStockMarginRate'),
+    ('unit', 'GetStockMemeMin'),
+    ('industry', 'GetStockIndustryCode'),
+    ('market', 'GetStockMarketKind'),
+    ('control', 'GetStockControlKind'),
+    ('supervision', 'GetStockSupervisionKind'),
+    ('status', 'GetStockStatusKind'),
+    ('capital', 'GetStockCapital'),
+    ('fiscalmonth', 'GetStockFiscalMonth'),
+    ('groupcode', 'GetStockGroupCode'),
+    ('kospi200kind', 'GetStockKospi200Kind'),
+    ('section', 'GetStockSectionKind'),
+    ('off', 'GetStockLacKind'),
+    ('listeddate', 'GetStockListedDate'),
+    ('maxprice', 'GetStockMaxPrice'),
+    ('minprice', 'GetStockMinPrice'),
+    ('ydopen', 'GetStockYdOpenPrice'),
+    ('ydhigh', 'GetStockYdHighPrice'),
+    ('ydlow', 'GetStockYdLowPrice'),
+    ('ydclose', 'GetStockYdClosePrice'),
+    ('creditenabled', 'IsStockCreditEnable'),
+    ('parpricechangetype', 'GetStockParPriceChageType'),
+    ('spac', 'IsSPAC'),
+    ('biglisting', 'IsBigListingStock'),
+    ('groupname', 'GetGroupName'),
+    ('industryname', 'GetIndustryName'),
+    ('membername', 'GetMemberName'),
+]
+CODEMGR_KEYS = [k for k, _ in CODEMGR_FIELDS]
+
+
+def get_codemgr_item(obj, code):
+    """
+    obj: CpUtil.CpCodeMgr
+    code: 'A' 로 시작하는 종목코드
+    """
+    return {k: getattr(obj, method)(code) for k, method in CODEMGR_FIELDS}
+
+
+class SymbolMaster:
+    """
+    전 종목 CpCodeMgr 항목을 하루 한 번 스냅샷으로 떠서 메모리에서 조회
+    path 가 있으면 npz 로 저장해 두고 같은 날 재시작 시 COM 호출 없이 불러온다
+    call(fn, *args): COM 호출을 실행할 함수 (예: ComWorker.call), 있으면 start() 가 백그라운드 스레드에서
+        check_interval 초마다 날짜를 확인해 새 스냅샷을 만들고, 만드는 동안에는 이전 스냅샷을 그대로 쓴다
+        COM 워커를 오래 잡지 않도록 chunk 종목씩 나눠서 보낸다
+    """
+    def __init__(self, creon, path=None,
+                 markets=(constants.MARKET_CODE_KOSPI, constants.MARKET_CODE_KOSDAQ),
+                 call=None, chunk=200, check_interval=60):
+        self.creon = creon
+        self.path = path
+        self.markets = markets
+        self.call = call
+        self.chunk = chunk
+        self.check_interval = check_interval
+        self.date = None
+        self.snapshot = None  # (table, {code: row index}), 한 번에 바꿔서 읽는 쪽이 섞인 상태를 보지 않게 한다
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def table(self):
+        return self.snapshot[0] if self.snapshot is not None else None
+
+    @property
+    def index(self):
+        return self.snapshot[1] if self.snapshot is not None else {}
+
+    def start(self):
+        """
+        저장된 스냅샷을 불러오고 오늘 것이 아니면 새로 만든다
+        call 이 있으면 백그라운드 스레드에서 만들고 이후 날짜가 바뀔 때마다 다시 만든다
+        """
+        if self.path is not None and os.path.exists(self.path):
+            self.load()
+        if self.call is None:
+            self.ensure()
+            return self
+        if self.thread is None:
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name='symbol-master', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stop_event.is_set():
+            if self.date != util.get_str_today():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print('symbol master refresh failed. {}'.format(e), file=sys.stderr)
+            self.stop_event.wait(self.check_interval)
+
+    def ensure(self):
+        """
+        스냅샷이 없으면 만든다, 백그라운드 갱신 중이면 날짜가 지난 스냅샷도 그대로 쓴다
+        """
+        today = util.get_str_today()
+        if self.date == today or (self.thread is not None and self.snapshot is not None):
+            return
+        with self.lock:
+            if self.date == today or (self.thread is not None and self.snapshot is not None):
+                return
+            if self.path is not None and os.path.exists(self.path):
+                self.load()
+            if self.date != today:
+                self.refresh()
+
+    def read_items(self, codes):
+        obj = self.creon.obj_CpUtil_CpCodeMgr
+        return [get_codemgr_item(obj, code) for code in codes]
+
+    def refresh(self):
+        call = self.call if self.call is not None else lambda fn, *args: fn(*args)
+        codes = []
+        for market in self.markets:
+            codes += list(call(self.creon.get_stockcodes, market))
+        rows = []
+        for i in range(0, len(codes), self.chunk):
+            rows += call(self.read_items, codes[i:i + self.chunk])
+        columns = {'code': np.array([code[1:] for code in codes], dtype=str)}
+        for k in CODEMGR_KEYS:
+            columns[k] = np.array([row[k] for row in rows])
+        self.set_table(ColumnarResult(columns, keys=['code'] + CODEMGR_KEYS), util.get_str_today())
+        if self.path is not None:
+            self.save()
+
+    def set_table(self, table, date):
+        index = {code: i for i, code in enumerate(table['code'].tolist())}
+        self.snapshot = (table, index)
+        self.date = date
+
+    def save(self):
+        table = self.table
+        tmp = self.path + '.tmp.npz'
+        np.savez(tmp, __date__=np.array(self.date), **table.columns)
+        os.replace(tmp, self.path)
+
+    def load(self):
+        with np.load(self.path, allow_pickle=False) as f:
+            date = str(f['__date__'])
+            columns = {k: f[k] for k in ['code'] + CODEMGR_KEYS}
+        self.set_table(ColumnarResult(columns, keys=['code'] + CODEMGR_KEYS), date)
+
+    def get(self, code):
+        """
+        return CpCodeMgr 항목 dict, 스냅샷에 없는 종목이면 None
+        """
+        if self.thread is None:
+            self.ensure()
+        snapshot = self.snapshot
+        if snapshot is None:
+            # 첫 스냅샷을 만드는 중이면 None, 부른 쪽은 CpCodeMgr 에서 바로 읽는다
+            return None
+        table, index = snapshot
+        if code.startswith('A'):
+            code = code[1:]
+        i = index.get(code)
+        if i is None:
+            return None
+        return {k: table[k][i].item() for k in CODEMGR_KEYS}
+
+    def filter(self, market=None, industry=None, control=None, supervision=None, status=None):
+        """
+        조건에 맞는 종목코드 목록, 조건은 값 하나 또는 값 목록
+        """
+        if self.snapshot is None:
+            self.ensure()
+        table = self.table
+        mask = np.ones(len(table), dtype=bool)
+        for k, v in [('market', market), ('industry', industry), ('control', control),
+                     ('supervision', supervision), ('status', status)]:
+            if v is None:
+                continue
+            if isinstance(v, (list, tuple, set)):
+                mask &= np.isin(table[k], list(v))
+            else:
+                mask &= table[k] == v
+        return table['code'][mask].tolist()
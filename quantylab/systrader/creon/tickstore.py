@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import threading
+
+import numpy as np
+
+# from quantylab.systrader.creon.columnar import ColumnarResult
+
+from columnar import ColumnarResult
+
+
+# StockCur 헤더 index, 이름, dtype (StockCurEventHandler 와 같은 이름)
+TICK_FIELDS = [
+    (2, 'diffratio', np.int32),
+    (3, 'timestamp', np.int32),
+    (4, 'price_open', np.int32),
+    (5, 'price_high', np.int32),
+    (6, 'price_low', np.int32),
+    (7, 'bid_sell', np.int32),
+    (8, 'bid_buy', np.int32),
+    (9, 'cum_volume', np.int64),
+    (10, 'cum_trans', np.int64),
+    (13, 'price', np.int32),
+    (14, 'contract_type', np.uint32),
+    (15, 'cum_sellamount', np.int64),
+    (16, 'buy_sellamount', np.int64),
+    (17, 'contract_amount', np.int64),
+    (18, 'second', np.int32),
+    (19, 'price_type', np.uint32),
+    (20, 'market_flag', np.uint32),
+    (21, 'premarket_volume', np.int64),
+    (22, 'diffsign', np.uint32),
+    (23, 'LP보유수량', np.int64),
+    (24, 'LP보유수량대비', np.int64),
+    (25, 'LP보유율', np.float64),
+    (26, '체결상태(호가방식)', np.uint32),
+    (27, '누적매도체결수량(호가방식)', np.int64),
+    (28, '누적매수체결수량(호가방식)', np.int64),
+]
+
+# 문자 코드로 저장하고 dict 로 볼 때 chr() 로 바꾸는 필드
+TICK_CHAR_FIELDS = ['price_type', 'market_flag', 'diffsign']
+
+# 링 버퍼가 아니라 TickRing.header_code, name 으로 갖는 필드
+TICK_HEADER_FIELDS = ['code', 'name']
+
+
+def select_fields(names, fields=None):
+    """
+    names: TICK_FIELDS 이름 목록 (subscribe_stockcur(fields=...) 와 같은 형식)
+    fields: 고를 대상 (index, name, dtype) 목록, None 이면 TICK_FIELDS
+    return names 에 해당하는 (index, name, dtype) 목록, fields 에 없는 이름이 있으면 ValueError
+    """
+    fields = TICK_FIELDS if fields is None else fields
+    available = [name for _, name, _ in fields]
+    missing = [name for name in names if name not in available and name not in TICK_HEADER_FIELDS]
+    if missing:
+        raise ValueError('tick fields not stored. {}'.format(missing))
+    return [f for f in fields if f[1] in names]
+
+
+class TickRing:
+    """
+    종목 하나의 틱을 담는 고정 크기 링 버퍼, 필드별 numpy 배열
+    각 틱을 [pos] 와 [pos + capacity] 두 곳에 써서 최근 capacity 개는 항상 연속된 구간이 되므로
+    last(), since() 는 복사 없이 view 를 반환한다
+    view 는 capacity 개 이상의 틱이 더 들어오면 덮어써지므로 오래 들고 있으려면 복사해야 한다
+    """
+    def __init__(self, code, capacity=20000, fields=None):
+        self.code = code
+        self.header_code = None  # StockCur 가 주는 종목코드 ('A' 포함)
+        self.name = None
+        self.capacity = capacity
+        self.fields = fields if fields is not None else TICK_FIELDS
+        self.keys = [k for _, k, _ in self.fields]
+        self.indexes = [i for i, _, _ in self.fields]
+        self.arrays = [np.zeros(capacity * 2, dtype=dtype) for _, _, dtype in self.fields]
+        self.columns = dict(zip(self.keys, self.arrays))
+        self.n = 0  # 지금까지 받은 틱 수 (다음 틱의 순번)
+
+    def __len__(self):
+        return min(self.n, self.capacity)
+
+    @property
+    def nbytes(self):
+        return sum(arr.nbytes for arr in self.arrays)
+
+    def append_from(self, obj):
+        """
+        obj: StockCur, 헤더 값을 바로 버퍼에 쓴다
+        """
+        if self.name is None:
+            self.header_code = obj.GetHeaderValue(0)
+            self.name = obj.GetHeaderValue(1)
+        pos = self.n % self.capacity
+        upper = pos + self.capacity
+        get = obj.GetHeaderValue
+        for i, arr in zip(self.indexes, self.arrays):
+            arr[pos] = arr[upper] = get(i)
+        # 모든 필드를 쓴 뒤에 n 을 늘려 읽는 쪽에서 쓰는 중인 틱을 보지 않게 한다
+        self.n += 1
+
+    def append(self, values):
+        """
+        values: self.keys 순서의 값 목록
+        """
+        pos = self.n % self.capacity
+        upper = pos + self.capacity
+        for v, arr in zip(values, self.arrays):
+            arr[pos] = arr[upper] = v
+        self.n += 1
+
+    def last(self, n=None):
+        """
+        최근 n 개 틱 (과거->최신), None 이면 버퍼에 남아 있는 전부
+        return <ColumnarResult> 복사 없는 view
+        """
+        total = self.n
+        n = min(total, self.capacity) if n is None else min(n, total, self.capacity)
+        end = total % self.capacity + self.capacity
+        return ColumnarResult(
+            {k: arr[end - n:end] for k, arr in zip(self.keys, self.arrays)}, keys=self.keys)
+
+    def since(self, seq):
+        """
+        순번이 seq 이상인 틱, 버퍼에서 밀려난 틱은 빠진다
+        return (<ColumnarResult>, 첫 틱의 순번)
+        """
+        total = self.n
+        n = max(0, min(total - seq, self.capacity))
+        return self.last(n), total - n
+
+    def require(self, names):
+        """
+        names 중 이 링에 저장하지 않는 필드가 있으면 ValueError
+        """
+        missing = [name for name in names if name not in self.columns and name not in TICK_HEADER_FIELDS]
+        if missing:
+            raise ValueError('tick fields not stored in ring {}. {}'.format(self.code, missing))
+
+    def row(self, i=-1):
+        """
+        i 번째(음수면 최신부터) 틱을 StockCurEventHandler 와 같은 dict 로 반환
+        """
+        view = self.last()
+        item = {'code': self.header_code or self.code, 'name': self.name}
+        for k in self.keys:
+            item[k] = view[k][i].item()
+        for k in TICK_CHAR_FIELDS:
+            if k in item:
+                item[k] = chr(item[k])
+        return item
+
+    def to_dicts(self, n=None):
+        """
+        기존 콜백 형식의 dict 리스트 (호환용)
+        """
+        view = self.last(n)
+        items = view.to_dicts()
+        for item in items:
+            item['code'] = self.header_code or self.code
+            item['name'] = self.name
+            for k in TICK_CHAR_FIELDS:
+                if k in item:
+                    item[k] = chr(item[k])
+        return items
+
+
+class TickStore:
+    """
+    구독 종목별 TickRing 모음
+    capacity: 종목당 보관할 틱 수, 메모리는 종목당 약 capacity * 2 * 필드 크기 합
+    fields: 저장할 TICK_FIELDS 이름 목록, None 이면 전부
+    """
+    def __init__(self, capacity=20000, fields=None):
+        self.capacity = capacity
+        self.fields = select_fields(fields) if fields is not None else None
+        self.rings = {}
+        self.lock = threading.Lock()
+
+    def __contains__(self, code):
+        return code in self.rings
+
+    def ring(self, code, fields=None):
+        """
+        종목의 TickRing, 없으면 만든다
+        fields: 저장할 TICK_FIELDS 이름 목록, None 이면 TickStore 의 fields
+            새로 만들 때는 이 필드만 저장하고, 이미 있는 링이나 TickStore 가 저장하지 않는 필드가 있으면 ValueError
+        """
+        if code.startswith('A'):
+            code = code[1:]
+        ring = self.rings.get(code)
+        if ring is None:
+            with self.lock:
+                ring = self.rings.get(code)
+                if ring is None:
+                    ring_fields = self.fields
+                    if fields is not None:
+                        ring_fields = select_fields(fields, self.fields)
+                    ring = TickRing(code, capacity=self.capacity, fields=ring_fields)
+                    self.rings[code] = ring
+                    return ring
+        if fields is not None:
+            ring.require(fields)
+        return ring
+
+    def last(self, code, n=None):
+        return self.ring(code).last(n)
+
+    def since(self, code, seq):
+        return self.ring(code).since(seq)
+
+    def drop(self, code):
+        if code.startswith('A'):
+            code = code[1:]
+        with self.lock:
+            self.rings.pop(code, None)
+
+    @property
+    def nbytes(self):
+        return sum(ring.nbytes for ring in list(self.rings.values()))
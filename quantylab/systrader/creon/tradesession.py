@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import sys
+import threading
+
+
+class TradeSession:
+    """
+    TradeInit, 계좌번호, 상품구분을 한 번만 조회해 두고
+    주문 객체(CpTd0311)는 매매구분/계좌/상품구분/호가구분을 미리 넣어 두어 주문마다 종목과 수량만 넣는다
+    재접속하거나 주문이 실패하면 invalidate() 로 다시 초기화
+    """
+    def __init__(self, com, td_util=None):
+        self.com = com
+        self.td_util = td_util if td_util is not None else com.Dispatch('CpTrade.CpTdUtil')
+        self.account_no = None
+        self.account_gflags = None
+        self.order_objs = {}  # (매매구분, 호가구분) -> CpTd0311
+        self.generation = 0  # invalidate() 할 때마다 증가, 이전 세션의 주문 객체를 구분
+        self.lock = threading.RLock()
+
+    @property
+    def ready(self):
+        return self.account_no is not None
+
+    def init(self):
+        """
+        return (계좌번호, 상품구분 목록), 실패하면 None
+        """
+        if self.account_no is not None:
+            return self.account_no, self.account_gflags
+        with self.lock:
+            if self.account_no is not None:
+                return self.account_no, self.account_gflags
+            if self.td_util.TradeInit(0) != 0:
+                print("TradeInit failed.", file=sys.stderr)
+                return None
+            account_no = self.td_util.AccountNumber[0]  # 계좌번호
+            self.account_gflags = self.td_util.GoodsList(account_no, 1)  # 주식상품 구분
+            self.order_objs = {}
+            self.account_no = account_no
+            return self.account_no, self.account_gflags
+
+    def invalidate(self):
+        with self.lock:
+            self.account_no = None
+            self.account_gflags = None
+            self.order_objs = {}
+            self.generation += 1
+
+    def order_obj(self, action, hoga='03'):
+        """
+        action: 1: 매도, 2: 매수
+        hoga: 주문호가구분코드, 03: 시장가
+        return 고정 입력값을 넣어 둔 CpTd0311 (키마다 하나를 재사용), TradeInit 에 실패하면 None
+        """
+        key = (action, hoga)
+        obj = self.order_objs.get(key)
+        if obj is not None:
+            return obj
+        with self.lock:
+            obj = self.new_order_obj(action, hoga)
+            if obj is not None:
+                self.order_objs[key] = obj
+            return obj
+
+    def new_order_obj(self, action, hoga='03'):
+        """
+        고정 입력값을 넣은 새 CpTd0311, TradeInit 에 실패하면 None
+        """
+        init = self.init()
+        if init is None:
+            return None
+        account_no, account_gflags = init
+        obj = self.com.Dispatch('CpTrade.CpTd0311')
+        obj.SetInputValue(0, action)  # 1: 매도, 2: 매수
+        obj.SetInputValue(1, account_no)  # 계좌번호
+        obj.SetInputValue(2, account_gflags[0])  # 상품구분
+        obj.SetInputValue(8, hoga)  # 주문호가구분
+        return obj
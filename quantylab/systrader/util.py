@@ -52,7 +52,7 @@ def get_str_date_nago(n=20, base_date=None):
     if base_date is None:
         base_date = get_today()
     if type(base_date) is str:
-        base_date = datetime.strptime()
+        base_date = datetime.strptime(base_date, FORMAT_DATE).date()
     d = base_date - timedelta(days=n)
     return d.strftime(FORMAT_DATE)
 
@@ -60,8 +60,7 @@ def get_dayofweek():
     """
     :return: 0-4 평일, 5-6 주말
     """
-    date_today = datetime.date.today()
-    int_week = date_today.weekday()
+    int_week = get_today().weekday()
     return int_week
 
 def get_hour_min():
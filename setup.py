@@ -11,6 +11,6 @@ setup(
     url='https://github.com/quantylab/quantylab-systrader',
     packages=find_packages(),
     install_requires=[
-        'django', 'pywinauto'
+        'django', 'pywinauto', 'numpy'
     ]
 )
\ No newline at end of file
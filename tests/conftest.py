@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# creon 모듈은 같은 디렉터리의 모듈을 바로 import 한다 (import constants, from _creon import ...)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'quantylab', 'systrader', 'creon'))
+
+import constants  # noqa: E402
+import fakecom  # noqa: E402
+import ratelimit  # noqa: E402
+from _creon import Creon  # noqa: E402
+
+
+@pytest.fixture
+def com():
+    """
+    요청 제한이 없는 FakeCOM, 테스트에서 com.limits 를 바꿔 요청 제한 초과를 흉내낸다
+    """
+    return fakecom.FakeCOM(n_codes=10, limits={})
+
+
+@pytest.fixture
+def creon(com):
+    c = Creon(com=com)
+    # 클라이언트 쪽 요청 제한은 기다리지 않게
+    c.limiter = ratelimit.RateLimiter(limits={
+        lt: (10 ** 9, 1) for lt in (constants.LT_TRADE_REQUEST, constants.LT_NONTRADE_REQUEST,
+                                    constants.LT_SUBSCRIBE)})
+    return c
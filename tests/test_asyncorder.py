@@ -0,0 +1,48 @@
+import time
+
+import constants
+import ratelimit
+from asyncorder import STATUS_PENDING
+
+
+def test_wait_timeout_is_pending(com, creon):
+    ticket = creon.buy_async('000010', 10)
+    # 응답 이벤트를 pump() 하기 전이면 실패가 아니라 대기
+    result = ticket.wait(0.01)
+    assert result['status'] == STATUS_PENDING
+    assert result['ticket'] == ticket.id
+    assert len(com.orders) == 1
+
+    com.pump()
+    found = creon.get_order_ticket(result['ticket'])
+    assert found is ticket
+    result = found.wait(0)
+    assert result['status'] == 0
+    assert result['order_no'] == 1
+    assert len(com.orders) == 1
+
+
+def test_unknown_ticket(creon):
+    assert creon.get_order_ticket(1) is None
+    creon.buy_async('000010', 1)
+    assert creon.get_order_ticket(999) is None
+    assert creon.get_order_ticket('x') is None
+    assert creon.get_order_ticket(None) is None
+
+
+def test_rate_limited_orders_are_requeued(com, creon):
+    creon.limiter = ratelimit.RateLimiter(limits={constants.LT_TRADE_REQUEST: (1, 0.2)})
+    start = time.time()
+    tickets = [creon.buy_async('000010', i + 1) for i in range(3)]
+    # 요청 제한에 걸린 주문은 기다리지 않고 대기열에 남는다
+    assert time.time() - start < 0.1
+    assert len(com.orders) == 1
+    assert [t.wait(0)['status'] for t in tickets[1:]] == [STATUS_PENDING] * 2
+
+    deadline = time.time() + 3
+    while len(com.orders) < 3 and time.time() < deadline:
+        com.pump()
+        time.sleep(0.01)
+    com.pump()
+    assert [o['amount'] for o in com.orders] == [1, 2, 3]
+    assert [t.wait(1)['order_no'] for t in tickets] == [1, 2, 3]
@@ -0,0 +1,110 @@
+import numpy as np
+
+import util
+from backfill import MinuteBackfill
+from chartcache import shift_date
+from krxcalendar import get_calendar
+
+TODAY = int(util.get_str_today())
+DATE_FROM = shift_date(TODAY, -20)
+YESTERDAY = shift_date(TODAY, -1)
+
+
+def expected(creon, date_from=DATE_FROM, date_to=YESTERDAY):
+    # 합성 데이터는 휴장일에도 봉이 있으므로 거래일만 남긴다
+    result = creon.get_chart_columns('000010', unit='m', date_from=str(date_from), date_to=str(date_to))
+    return result.take(np.isin(result['date'], get_calendar().sessions(date_from, date_to)))
+
+
+def patch_fetch(monkeypatch, creon, empty=()):
+    """
+    empty 에 있는 구간 번호는 봉이 없는 것으로 돌려준다
+    return 조회한 구간 목록
+    """
+    calls = []
+    get_chart_columns = creon.get_chart_columns
+
+    def fetch(code, **kwargs):
+        calls.append((int(kwargs['date_from']), int(kwargs['date_to'])))
+        result = get_chart_columns(code, **kwargs)
+        if len(calls) - 1 in empty:
+            return result.take(slice(0, 0))
+        return result
+    monkeypatch.setattr(creon, 'get_chart_columns', fetch)
+    return calls
+
+
+def test_backfill_and_resume(tmp_path, creon, monkeypatch):
+    full = expected(creon)
+    backfill = MinuteBackfill(creon, root=str(tmp_path), span_days=5)
+    spans = backfill.spans(DATE_FROM, TODAY)
+    assert len(spans) > 2
+    assert backfill.run(['000010'], DATE_FROM, verbose=False) == {'000010': len(spans)}
+    stored = backfill.store.read('000010', date_to=YESTERDAY)
+    np.testing.assert_array_equal(stored['date'], full['date'])
+    np.testing.assert_array_equal(stored['time'], full['time'])
+    assert backfill.store.load_meta('000010')['covered'] == min(spans[-1][1], YESTERDAY)
+
+    # 다시 실행하면 받은 날짜 이후만 받는다
+    calls = patch_fetch(monkeypatch, creon)
+    backfill.run(['000010'], DATE_FROM, verbose=False)
+    assert all(a > YESTERDAY for a, _ in calls)
+
+
+def test_write_failure_does_not_cover_later_spans(tmp_path, creon, monkeypatch):
+    backfill = MinuteBackfill(creon, root=str(tmp_path), span_days=5, writers=1)
+    spans = backfill.spans(DATE_FROM, TODAY)
+    append = backfill.store.append
+    writes = []
+
+    def failing(code, result, covered=None):
+        writes.append(covered)
+        if len(writes) == 2:
+            raise IOError('disk full')
+        return append(code, result, covered=covered)
+
+    monkeypatch.setattr(backfill.store, 'append', failing)
+    backfill.run(['000010'], DATE_FROM, verbose=False)
+    # 실패한 구간 뒤는 덧붙이지 않아 covered 가 빈틈을 넘어가지 않는다
+    assert len(writes) == 2
+    assert backfill.store.load_meta('000010')['covered'] == spans[0][1]
+    assert backfill.errors == [('000010', 'disk full')]
+
+    # 다음 실행에서 빈틈부터 다시 받는다
+    monkeypatch.setattr(backfill.store, 'append', append)
+    backfill.run(['000010'], DATE_FROM, verbose=False)
+    full = expected(creon)
+    np.testing.assert_array_equal(backfill.store.read('000010', date_to=YESTERDAY)['time'], full['time'])
+
+
+def test_empty_span_stops(tmp_path, creon, monkeypatch):
+    backfill = MinuteBackfill(creon, root=str(tmp_path), span_days=5)
+    spans = backfill.spans(DATE_FROM, TODAY)
+    calls = patch_fetch(monkeypatch, creon, empty=[1])
+    assert backfill.run(['000010'], DATE_FROM, verbose=False) == {'000010': 1}
+    assert len(calls) == 2
+    assert backfill.store.load_meta('000010')['covered'] == spans[0][1]
+    assert 'no data' in backfill.errors[0][1]
+
+
+def test_empty_span_of_halted_stock_is_covered(tmp_path, creon, monkeypatch):
+    backfill = MinuteBackfill(creon, root=str(tmp_path), span_days=5)
+    spans = backfill.spans(DATE_FROM, TODAY)
+    calls = patch_fetch(monkeypatch, creon, empty=[1])
+    monkeypatch.setattr(creon, 'get_stockstatus', lambda code: {'control': 0, 'supervision': 0, 'status': 1})
+    backfill.run(['000010'], DATE_FROM, verbose=False)
+    assert len(calls) == len(spans)
+    assert backfill.store.load_meta('000010')['covered'] == min(spans[-1][1], YESTERDAY)
+    dates = backfill.store.read('000010')['date']
+    assert not np.any((dates >= spans[1][0]) & (dates <= spans[1][1]))
+    assert np.any(dates > spans[1][1])
+    assert not backfill.errors
+
+
+def test_cover_empty_spans(tmp_path, creon, monkeypatch):
+    backfill = MinuteBackfill(creon, root=str(tmp_path), span_days=5, stop_on_empty=False)
+    spans = backfill.spans(DATE_FROM, TODAY)
+    calls = patch_fetch(monkeypatch, creon, empty=[1])
+    backfill.run(['000010'], DATE_FROM, verbose=False)
+    assert len(calls) == len(spans)
+    assert backfill.store.load_meta('000010')['covered'] == min(spans[-1][1], YESTERDAY)
@@ -0,0 +1,88 @@
+import bars
+from bars import BarAggregator, BAR_TICK_FIELDS
+
+DATE = 20261016  # 금요일
+
+
+def collect():
+    closed = []
+    return closed, lambda code, interval, bar: closed.append(bar)
+
+
+def test_minute_and_daily_bars():
+    closed, on_close = collect()
+    agg = BarAggregator(intervals=(1, 3, 'D'), on_close=on_close, date=DATE)
+    for hhmmss, price, volume in [(90000, 100, 1), (90030, 105, 2), (90059, 98, 3), (90100, 101, 4),
+                                  (90230, 102, 5), (90300, 99, 6)]:
+        agg.update('000010', hhmmss, price, volume)
+    ones = agg.bars('000010', 1, include_current=False)
+    # 봉 시각은 봉이 끝나는 시각
+    assert ones['time'].tolist() == [901, 902, 903]
+    assert ones.to_dicts()[0] == {'date': DATE, 'time': 901, 'open': 100, 'high': 105, 'low': 98,
+                                  'close': 98, 'volume': 6}
+    assert agg.last('000010', 3) == {'date': DATE, 'time': 906, 'open': 99, 'high': 99, 'low': 99,
+                                     'close': 99, 'volume': 6}
+    assert agg.bars('000010', 3)['volume'].tolist() == [15, 6]
+    assert agg.last('A000010', 'D')['volume'] == 21
+    # 장 마감 동시호가 체결은 폐장 시각 봉
+    assert agg.label(153010, 1) == 1530 and agg.label(153010, 60) == 1530
+
+    agg.flush(90500)
+    assert agg.last('000010', 1) is None and agg.last('000010', 'D') is not None
+    agg.flush()
+    assert agg.last('000010', 'D') is None
+    assert [(bar['interval'], bar['time']) for bar in closed][-2:] == [(3, 906), ('D', 0)]
+
+
+def test_new_day_from_tick_time_wrap():
+    closed, on_close = collect()
+    agg = BarAggregator(intervals=(1, 'D'), on_close=on_close, date=DATE)
+    agg.update('000010', 152000, 100, 1)
+    agg.update('000020', 152959, 200, 2)
+    # 종목 간 순서가 조금 섞인 것은 같은 날
+    agg.update('000010', 151900, 101, 1)
+    assert agg.date == DATE
+
+    agg.update('000010', 90005, 110, 3)
+    # 지난 거래일의 봉을 모두 완성하고 다음 거래일로
+    assert agg.date == 20261019
+    daily = [bar for bar in closed if bar['interval'] == 'D']
+    assert sorted((bar['code'], bar['date'], bar['volume']) for bar in daily) == [
+        ('000010', DATE, 2), ('000020', DATE, 2)]
+    assert agg.last('000020', 1) is None
+    assert agg.last('000010', 'D') == {'date': 20261019, 'time': 0, 'open': 110, 'high': 110, 'low': 110,
+                                       'close': 110, 'volume': 3}
+    assert agg.bars('000010', 1)['date'].tolist() == [DATE, DATE, 20261019]
+
+
+def test_new_day_from_today(monkeypatch):
+    monkeypatch.setattr(bars.util, 'get_str_today', lambda: str(DATE))
+    closed, on_close = collect()
+    agg = BarAggregator(intervals=(1, 'D'), on_close=on_close)
+    agg.update('000010', 100000, 100, 1)
+
+    # 타이머의 flush 에서 날짜가 바뀐 것을 알면 지난 봉을 모두 완성한다
+    monkeypatch.setattr(bars.util, 'get_str_today', lambda: '20261019')
+    agg.flush(90000)
+    assert agg.date == 20261019
+    assert [(bar['interval'], bar['date']) for bar in closed] == [(1, DATE), ('D', DATE)]
+
+    # 장이 끝난 뒤 만들어 두었다가 다음 날 첫 체결이 와도 그날 날짜로
+    monkeypatch.setattr(bars.util, 'get_str_today', lambda: str(DATE))
+    agg = BarAggregator(intervals=(1,))
+    monkeypatch.setattr(bars.util, 'get_str_today', lambda: '20261019')
+    agg.update('000010', 90000, 100, 1)
+    assert agg.last('000010')['date'] == 20261019
+
+
+def test_subscribed_ticks(com, creon):
+    agg = BarAggregator(intervals=(1,), date=DATE)
+    assert creon.subscribe_stockcur('000010', agg.on_tick, fields=BAR_TICK_FIELDS)
+    creon.enable_tick_store()
+    ring_agg = BarAggregator(intervals=(1,), date=DATE)
+    assert creon.subscribe_stockcur('000020', ring_agg.on_ring, raw=True, fields=BAR_TICK_FIELDS)
+    com.emit_ticks(150)
+    result = agg.bars('000010')
+    assert result['time'].tolist() == [901, 902, 903]
+    assert agg.last('000010')['close'] == com.subscriptions['A000010'][0].header[13]
+    assert ring_agg.bars('000020')['volume'].sum() == creon.tick_store.ring('000020').last()['contract_amount'].sum()
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from batch import BatchJob
+from respcache import ResponseCache
+
+QUERIES = [
+    {'id': 'a', 'type': 'stockcandles', 'code': '000010', 'n': 20},
+    {'id': 'b', 'type': 'stockcandles', 'code': '000010', 'n': 5},
+    {'id': 'c', 'type': 'stockfeatures', 'code': '000010'},
+    {'id': 'd', 'type': 'stockfeatures', 'code': 'A000020'},
+    {'id': 'e', 'type': 'short', 'code': '000010', 'n': 10},
+    {'id': 'f', 'type': 'stockstatus', 'code': '000010'},
+    {'id': 'g', 'type': 'unknown', 'code': '000010'},
+    {'id': 'h', 'type': 'stockcandles'},
+    'not an object',
+]
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache()
+    cache.market_active = lambda now: (True, now.timestamp() + 3600)
+    return cache
+
+
+def ids(queries):
+    return sorted(str(query.index if query.id is None else query.id) for query in queries)
+
+
+def test_prepare_groups(creon, cache):
+    groups = BatchJob(creon, cache, QUERIES).prepare()
+    assert ids(groups['errors']) == ['8', 'g', 'h']
+    assert ids(groups['ready']) == ['f']
+    assert ids(groups['features']) == ['c', 'd']
+    # 같은 종목 차트는 큰 조회 하나만 받고 잘라서 준다
+    assert [(leader.id, ids(members)) for leader, members in groups['candles'].items()] == [('a', ['b'])]
+    assert ids(groups['single']) == ['e']
+
+    plan = BatchJob(creon, cache, QUERIES).plan()
+    assert plan['queries'] == 9 and plan['invalid'] == 3 and plan['ready'] == 1
+    assert plan['requests'] == 3
+
+    # 캐시에 있는 조회는 요청 없이 준다
+    cache.store('short', {'code': '000010', 'n': 10}, [])
+    assert 'e' in ids(BatchJob(creon, cache, QUERIES).prepare()['ready'])
+
+
+def test_collect(com, creon, cache):
+    result = json.loads(BatchJob(creon, cache, QUERIES).collect())
+    assert [item['index'] for item in result] == list(range(len(QUERIES)))
+    by_id = {item['id']: item for item in result if item['id'] is not None}
+    assert [by_id[k]['status'] for k in 'abcdef'] == [200] * 6
+    assert [by_id[k]['status'] for k in 'gh'] == [400, 400]
+    assert result[8]['status'] == 400 and 'error' in result[8]
+    assert by_id['b']['result'] == by_id['a']['result'][-5:]
+    assert by_id['c']['result']['name'] == '종목000010'
+    assert by_id['d']['result']['name'] == '종목000020'
+    # 차트 1 + MarketEye 1 + 공매도 1
+    assert com.n_requests == 3
+
+    # 같은 작업을 다시 하면 모두 캐시에서 준다
+    com.n_requests = 0
+    again = json.loads(BatchJob(creon, cache, QUERIES).collect())
+    assert com.n_requests == 0
+    assert again[1]['result'] == by_id['b']['result']
+
+
+def test_iter_lines(creon, cache):
+    lines = list(BatchJob(creon, cache, QUERIES[:3]).iter_lines())
+    assert len(lines) == 3 and all(line.endswith(b'\n') for line in lines)
+    items = [json.loads(line) for line in lines]
+    assert sorted(item['id'] for item in items) == ['a', 'b', 'c']
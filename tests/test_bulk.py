@@ -0,0 +1,52 @@
+import numpy as np
+
+import util
+from bulk import BulkChartDownloader
+from chartcache import shift_date
+
+TODAY = int(util.get_str_today())
+YESTERDAY = shift_date(TODAY, -1)
+
+
+def downloader(creon, tmp_path, date_from, date_to=YESTERDAY):
+    return BulkChartDownloader(creon, date_from=str(date_from), date_to=str(date_to),
+                               cache_dir=str(tmp_path / 'cache'),
+                               checkpoint=str(tmp_path / 'bulk_{}_{}.jsonl'.format(date_from, date_to)))
+
+
+def test_run_writes_columns_to_cache(tmp_path, creon, monkeypatch):
+    date_from = shift_date(TODAY, -30)
+    bulk = downloader(creon, tmp_path, date_from)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('get_chart')
+
+    # dict 로 바꾸는 get_chart() 를 거치지 않는다
+    monkeypatch.setattr(creon, 'get_chart', fail)
+    plan = bulk.run(verbose=False)
+    assert plan['n_done'] == len(plan['codes']) == 20 and plan['n_failed'] == 0
+    cached, meta = creon.chart_cache.backend.load(('000010', 'A', 'D'))
+    expected = creon.get_chart_columns('000010', date_from=str(date_from), date_to=str(YESTERDAY))
+    np.testing.assert_array_equal(cached['date'], expected['date'])
+    np.testing.assert_array_equal(cached['close'], expected['close'])
+    assert meta['spans'] == [[date_from, YESTERDAY]]
+
+
+def test_plan_skips_cached_spans(tmp_path, creon, monkeypatch):
+    date_from = shift_date(TODAY, -30)
+    downloader(creon, tmp_path, date_from).run(verbose=False)
+
+    # 캐시에 있는 구간은 다시 받지 않는다
+    plan = downloader(creon, tmp_path, shift_date(TODAY, -20)).plan()
+    assert plan['codes'] == [] and plan['cached'] == 20 and plan['requests'] == 0
+
+    # 앞쪽으로 늘린 구간만 센다
+    earlier = shift_date(TODAY, -400)
+    bulk = downloader(creon, tmp_path, earlier)
+    counted = []
+    count_requests = bulk.count_requests
+    monkeypatch.setattr(bulk, 'count_requests', lambda spans: counted.append(spans) or count_requests(spans))
+    plan = bulk.plan()
+    assert len(plan['codes']) == 20
+    assert counted == [[[earlier, shift_date(date_from, -1)]]] * 20
+    assert plan['requests'] == 20 * count_requests(counted[0])
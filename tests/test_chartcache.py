@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+import constants
+import util
+from _creon import CreonRequestError
+from chartcache import ChartCache, MemoryChartCacheBackend, shift_date
+
+
+def throttle(com):
+    # 조회 요청을 모두 요청 제한 초과로 실패시킨다
+    com.limits = {constants.LT_NONTRADE_REQUEST: (0, 3600)}
+
+
+def test_failed_fetch_is_not_covered(com, creon):
+    today = int(util.get_str_today())
+    date_from = shift_date(today, -30)
+    backend = MemoryChartCacheBackend()
+    cache = ChartCache(backend)
+
+    throttle(com)
+    with pytest.raises(CreonRequestError):
+        cache.fetch(creon, '000010', unit='D', date_from=date_from)
+    assert backend.load(('000010', 'A', 'D')) == (None, {})
+
+    com.limits = {}
+    cached = cache.fetch(creon, '000010', unit='D', date_from=date_from)
+    expected = creon.get_chart_columns('000010', unit='D', date_from=str(date_from), date_to=str(today))
+    assert len(cached) > 0
+    np.testing.assert_array_equal(cached['date'], expected['date'])
+    np.testing.assert_array_equal(cached['close'], expected['close'])
+
+
+def test_failed_gap_fetch_keeps_previous_spans(com, creon):
+    today = int(util.get_str_today())
+    backend = MemoryChartCacheBackend()
+    cache = ChartCache(backend)
+    cache.fetch(creon, '000010', unit='D', date_from=shift_date(today, -10))
+    _, meta = backend.load(('000010', 'A', 'D'))
+    spans = meta['spans']
+
+    # 앞쪽 빈 구간을 받다가 실패하면 구간을 늘리지 않는다
+    throttle(com)
+    with pytest.raises(CreonRequestError):
+        cache.fetch(creon, '000010', unit='D', date_from=shift_date(today, -40))
+    assert backend.load(('000010', 'A', 'D'))[1]['spans'] == spans
+
+
+def test_minute_n_fetch_does_not_cover_partial_first_day(com, creon):
+    backend = MemoryChartCacheBackend()
+    cache = ChartCache(backend)
+    result = cache.fetch(creon, '000010', unit='m', n=500)
+    assert len(result) == 500
+    first = int(result['date'][0])
+    spans = backend.load(('000010', 'A', 'm'))[1]['spans']
+    assert all(a > first for a, _ in spans)
+
+    # 잘린 첫날을 포함하는 기간 조회는 첫날을 다시 받아 전체를 준다
+    today = int(util.get_str_today())
+    cached = cache.fetch(creon, '000010', unit='m', date_from=first)
+    expected = creon.get_chart_columns('000010', unit='m', date_from=str(first), date_to=str(today))
+    assert len(cached) == len(expected)
+    np.testing.assert_array_equal(cached['time'], expected['time'])
+
+
+def test_minute_n_fetch_keeps_cached_bars_of_first_day(com, creon, monkeypatch):
+    today = int(util.get_str_today())
+    backend = MemoryChartCacheBackend()
+    cache = ChartCache(backend)
+    date_from, date_to = shift_date(today, -20), shift_date(today, -14)
+    # 떨어진 두 구간을 캐시해 두면 마지막 구간 앞쪽으로 넘어가는 n 조회는 개수로 받는다
+    cache.fetch(creon, '000010', unit='m', date_from=shift_date(today, -8), date_to=shift_date(today, -5))
+    cache.fetch(creon, '000010', unit='m', date_from=date_from, date_to=date_to)
+    assert len(backend.load(('000010', 'A', 'm'))[1]['spans']) == 2
+    full = creon.get_chart_columns('000010', unit='m', date_from=str(date_from), date_to=str(today))
+
+    # n 개로 받는 첫날이 이미 캐시된 날의 중간부터 시작하게 한다
+    dates = full['date']
+    day = int(np.unique(dates[dates <= date_to])[-1])
+    n = int((dates > day).sum() + (dates == day).sum() // 2)
+    calls = []
+    get_chart_columns = creon.get_chart_columns
+    monkeypatch.setattr(creon, 'get_chart_columns', lambda *args, **kwargs: calls.append(kwargs) or
+                        get_chart_columns(*args, **kwargs))
+    result = cache.fetch(creon, '000010', unit='m', n=n)
+    assert calls and calls[-1].get('n') == n
+    assert len(result) == n
+    cached, _ = backend.load(('000010', 'A', 'm'))
+    np.testing.assert_array_equal(cached['date'], full['date'])
+    np.testing.assert_array_equal(cached['time'], full['time'])
+
+
+def test_adjusted_refetch_stops_filling_old_gaps(com, creon, monkeypatch):
+    today = int(util.get_str_today())
+    backend = MemoryChartCacheBackend()
+    cache = ChartCache(backend)
+    # 앞뒤로 빈 구간이 두 개 생기게 한다
+    cache.fetch(creon, '000010', unit='D', date_from=shift_date(today, -10), date_to=shift_date(today, -5))
+
+    calls = []
+    get_chart_columns = creon.get_chart_columns
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs)
+        return get_chart_columns(*args, **kwargs)
+
+    monkeypatch.setattr(creon, 'get_chart_columns', counting)
+    monkeypatch.setattr(cache, 'adjusted', lambda *args: True)
+    # 앞쪽 빈 구간을 받다가 수정주가가 바뀐 것을 알면 전체를 한 번만 다시 받는다
+    date_from = shift_date(today, -60)
+    result = cache.fetch(creon, '000010', unit='D', date_from=date_from)
+    assert len(calls) == 2
+    expected = get_chart_columns('000010', unit='D', date_from=str(date_from), date_to=str(today))
+    np.testing.assert_array_equal(result['date'], expected['date'])
+    assert backend.load(('000010', 'A', 'D'))[1]['spans'] == [[date_from, shift_date(today, -1)]]
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import constants
+from _creon import CreonRequestError
+from columnar import ColumnarResult
+
+
+def test_concat_and_take():
+    a = ColumnarResult({'date': np.array([1, 2]), 'close': np.array([10.0, 20.0])})
+    b = ColumnarResult({'date': np.array([3]), 'close': np.array([30.0])})
+    merged = ColumnarResult.concat([a, None, b])
+    assert len(merged) == 3
+    assert merged.to_dicts() == [{'date': 1, 'close': 10.0}, {'date': 2, 'close': 20.0},
+                                 {'date': 3, 'close': 30.0}]
+    assert merged.take(merged['date'] > 1)['close'].tolist() == [20.0, 30.0]
+    assert ColumnarResult.concat([a]) is a
+
+    empty = ColumnarResult.concat([], keys=['date'], dtypes={'date': np.int64})
+    assert len(empty) == 0 and empty['date'].dtype == np.int64
+
+
+def test_columnar_request_matches_dicts(creon):
+    n = constants.CHART_ROWS_PER_REQUEST * 2 + 100
+    dicts = creon.get_chart('000010', n=n)
+    columns = creon.get_chart_columns('000010', n=n)
+    assert len(dicts) == len(columns) == n
+    # 여러 페이지를 이어 붙여도 과거->최신 순
+    assert np.all(np.diff(columns['date']) > 0)
+    for k in ['date', 'open', 'close', 'volume', 'price', 'diffsign']:
+        assert [item[k] for item in dicts] == columns[k].tolist()
+    np.testing.assert_allclose([item['diffratio'] for item in dicts], columns['diffratio'])
+
+
+def test_request_failure_raises(com, creon):
+    com.limits = {constants.LT_NONTRADE_REQUEST: (0, 3600)}
+    with pytest.raises(CreonRequestError) as e:
+        creon.get_chart_columns('000010', n=10)
+    assert e.value.status == -1
+
+
+def test_failure_on_later_page_raises(com, creon):
+    # 첫 페이지만 받고 다음 페이지에서 요청 제한에 걸려도 잘린 결과를 주지 않는다
+    com.limits = {constants.LT_NONTRADE_REQUEST: (1, 3600)}
+    with pytest.raises(CreonRequestError):
+        creon.get_chart_columns('000010', n=constants.CHART_ROWS_PER_REQUEST + 10)
+
+
+def test_chart_frame(creon):
+    frame = creon.get_chart('000010', n=30, as_frame=True)
+    columns = creon.get_chart_columns('000010', n=30)
+    assert len(frame) == 30
+    assert frame['close'].tolist() == columns['close'].tolist()
+
+
+def test_frames_match_dicts(creon):
+    for method in [creon.get_shortstockselling, creon.get_investorbuysell]:
+        dicts = method('000010', n=20)
+        frame = method('000010', n=20, as_frame=True)
+        assert len(frame) == len(dicts)
+        assert list(frame.columns) == list(dicts[0].keys())
+        assert frame.to_dict('records') == dicts
@@ -0,0 +1,65 @@
+import threading
+
+import constants
+from comworker import CreonProxy
+from ratelimit import RateLimiter
+from reconnect import Reconnector
+
+
+def make_proxy(com):
+    proxy = CreonProxy(com=com)
+    creon = proxy.creon
+    # 다음 창까지 기다리게
+    creon.limiter = RateLimiter(limits={constants.LT_NONTRADE_REQUEST: (1, 0.2)}, sleep=creon.sleep)
+    return proxy, creon
+
+
+def test_pumps_while_waiting_on_limiter(com):
+    proxy, creon = make_proxy(com)
+    delivered = []
+
+    def waiting():
+        creon.limiter.acquire()
+        com.post(lambda: delivered.append(threading.current_thread()))
+        # 요청 제한을 기다리는 동안 이벤트가 워커 스레드에서 처리된다
+        creon.limiter.acquire()
+        return list(delivered)
+
+    try:
+        assert proxy.worker.call(waiting) == [proxy.worker.thread]
+    finally:
+        proxy.close()
+
+
+def test_pumps_between_pages(com):
+    proxy, creon = make_proxy(com)
+    creon.limiter = RateLimiter(limits={constants.LT_NONTRADE_REQUEST: (10 ** 9, 1)})
+    delivered = []
+
+    def paging():
+        pages = creon.iter_chart('000010', n=constants.CHART_ROWS_PER_REQUEST * 2)
+        next(pages)
+        com.post(lambda: delivered.append(1))
+        next(pages)
+        return list(delivered)
+
+    try:
+        assert proxy.worker.call(paging) == [1]
+    finally:
+        proxy.close()
+
+
+def test_reconnect_wait_pumps(com):
+    proxy, creon = make_proxy(com)
+    reconnector = Reconnector(creon, 'id', 'pwd', 'pwdcert', timeout=2, poll_interval=0.01)
+    com.connected = False
+
+    def waiting():
+        # 연결 이벤트가 펌프되어야 연결된다
+        com.post(lambda: setattr(com, 'connected', True))
+        return reconnector.wait()
+
+    try:
+        assert proxy.worker.call(waiting)
+    finally:
+        proxy.close()
@@ -0,0 +1,43 @@
+import time
+
+from connmonitor import ConnectionMonitor
+
+
+def test_monitor_caches_state_and_reports_changes(com, creon):
+    changes = []
+    monitor = creon.enable_connection_monitor(interval=10, on_change=changes.append)
+    try:
+        # start() 는 첫 확인이 끝난 뒤에 반환한다
+        assert monitor.checked is not None and creon.connected()
+        com.connected = False
+        # 다음 주기 전에는 캐시된 값
+        assert creon.connected()
+        monitor.refresh()
+        assert monitor.wait_for(False, timeout=5)
+        assert not creon.connected()
+        assert changes == [False]
+
+        after = time.time()
+        com.connected = True
+        monitor.refresh()
+        assert monitor.wait_for(True, timeout=5, after=after)
+        assert changes == [False, True]
+    finally:
+        monitor.stop()
+    # 감시를 멈추면 IsConnect 를 바로 확인
+    com.connected = False
+    assert not creon.connected()
+
+
+def test_monitor_listener_errors_are_isolated(com):
+    seen = []
+
+    def broken(state):
+        raise RuntimeError('broken')
+
+    monitor = ConnectionMonitor(com, interval=10, on_change=broken)
+    monitor.add_listener(seen.append)
+    monitor.update(True)
+    monitor.update(False)
+    assert seen == [False]
+
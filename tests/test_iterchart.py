@@ -0,0 +1,35 @@
+import numpy as np
+
+import constants
+from columnar import ColumnarResult
+
+
+def test_pages_newest_first(com, creon):
+    n = constants.CHART_ROWS_PER_REQUEST * 2 + 100
+    pages = list(creon.iter_chart('000010', n=n))
+    assert len(pages) == 3
+    # 페이지는 최신->과거 순, 페이지 안은 과거->최신 순
+    for newer, older in zip(pages, pages[1:]):
+        assert older['date'][-1] <= newer['date'][0]
+    merged = ColumnarResult.concat(pages[::-1])
+    expected = creon.get_chart_columns('000010', n=n)
+    np.testing.assert_array_equal(merged['date'], expected['date'])
+    np.testing.assert_array_equal(merged['close'], expected['close'])
+
+
+def test_stop_skips_remaining_pages(com, creon):
+    n = constants.CHART_ROWS_PER_REQUEST * 3
+    pages = list(creon.iter_chart('000010', n=n, stop=lambda page: True))
+    assert len(pages) == 1
+    assert com.n_requests == 1
+
+    # 소비하던 쪽에서 멈춰도 다음 페이지를 요청하지 않는다
+    for _ in creon.iter_chart('000010', n=n):
+        break
+    assert com.n_requests == 2
+
+
+def test_frame_pages(creon):
+    frames = list(creon.iter_chart('000010', n=constants.CHART_ROWS_PER_REQUEST + 10, as_frame=True))
+    assert len(frames) == 2
+    assert sum(len(frame) for frame in frames) >= constants.CHART_ROWS_PER_REQUEST + 10
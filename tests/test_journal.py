@@ -0,0 +1,77 @@
+import numpy as np
+
+from journal import TickJournal, TickJournalReader, JOURNAL_TICK_FIELDS
+
+DATE = 20260916
+
+
+def make_ticks(n, start=0):
+    ticks = []
+    for i in range(start, start + n):
+        second = 90000 + (i // 30) * 100 + i % 30 * 2
+        price = 50000 + (i % 7) * 10 - (i % 3) * 20
+        ticks.append({
+            'code': 'A000010', 'second': second, 'price': price, 'bid_sell': price + 10,
+            'bid_buy': price - 10, 'contract_amount': 1 + i % 50, 'contract_type': '1' if i % 2 else '2',
+            'market_flag': '2', 'price_type': '2', 'diffsign': '2' if i % 4 else '5',
+        })
+    return ticks
+
+
+def write(root, ticks):
+    journal = TickJournal(root=str(root), date=DATE, flush_interval=0.01)
+    for tick in ticks:
+        journal.on_tick(tick)
+    journal.close()
+
+
+def assert_ticks(result, ticks):
+    assert len(result) == len(ticks)
+    np.testing.assert_array_equal(result['second'], [t['second'] for t in ticks])
+    np.testing.assert_array_equal(result['price'], [t['price'] for t in ticks])
+    np.testing.assert_array_equal(result['ask'], [t['bid_sell'] for t in ticks])
+    np.testing.assert_array_equal(result['bid'], [t['bid_buy'] for t in ticks])
+    np.testing.assert_array_equal(result['volume'], [t['contract_amount'] for t in ticks])
+    np.testing.assert_array_equal(result['contract_type'], [ord(t['contract_type']) for t in ticks])
+    np.testing.assert_array_equal(result['diffsign'], [ord(t['diffsign']) for t in ticks])
+    assert np.all(np.diff(result['ts']) >= 0)
+
+
+def test_journal_round_trip(tmp_path):
+    ticks = make_ticks(500)
+    write(tmp_path, ticks)
+    reader = TickJournalReader(str(tmp_path), DATE, 'A000010')
+    assert len(reader) == 500
+    assert_ticks(reader.scan(), ticks)
+
+    # 분 인덱스로 중간부터 복원해도 같은 값
+    assert_ticks(reader.decode(123, 321), ticks[123:321])
+    selected = [t for t in ticks if 90500 <= t['second'] <= 91030]
+    assert_ticks(reader.read(90500, 91030), selected)
+
+    replayed = []
+    reader.replay(replayed.append, time_from=90500, time_to=91030, chunk=37)
+    assert [item['price'] for item in replayed] == [t['price'] for t in selected]
+    assert all(item['code'] == '000010' for item in replayed)
+
+
+def test_journal_resumes_after_restart(tmp_path):
+    ticks = make_ticks(300)
+    write(tmp_path, ticks[:120])
+    write(tmp_path, ticks[120:])
+    reader = TickJournalReader(str(tmp_path), DATE, '000010')
+    assert_ticks(reader.scan(), ticks)
+    assert_ticks(reader.read(90300, 90700), [t for t in ticks if 90300 <= t['second'] <= 90700])
+
+
+def test_journal_from_restricted_tick_store(tmp_path, com, creon):
+    creon.enable_tick_store(fields=JOURNAL_TICK_FIELDS)
+    journal = TickJournal(root=str(tmp_path), date=DATE, flush_interval=0.01)
+    assert creon.subscribe_stockcur('000010', journal.on_ring, raw=True, fields=JOURNAL_TICK_FIELDS)
+    com.emit_ticks(50)
+    journal.close()
+    reader = TickJournalReader(str(tmp_path), DATE, '000010')
+    ring = creon.tick_store.ring('000010')
+    result = reader.scan()
+    np.testing.assert_array_equal(result['price'], ring.last()['price'])
+    np.testing.assert_array_equal(result['second'], ring.last()['second'])
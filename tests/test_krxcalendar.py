@@ -0,0 +1,50 @@
+import numpy as np
+
+from krxcalendar import KRXCalendar, to_datetime64, to_int
+
+
+def test_date_conversion():
+    dates = np.array([20240229, 20261018, 20001231])
+    np.testing.assert_array_equal(to_int(to_datetime64(dates)), dates)
+    assert to_int(to_datetime64(20261018)) == 20261018
+
+
+def test_sessions_skip_weekends_and_holidays():
+    cal = KRXCalendar()
+    # 2026-10-03 토, 10-05 추석 대체휴일, 10-09 한글날
+    assert cal.sessions(20261001, 20261009).tolist() == [20261001, 20261002, 20261006, 20261007, 20261008]
+    assert cal.count_sessions(20261001, 20261009) == 5
+    assert cal.is_session(20261006) and not cal.is_session(20261005)
+    assert cal.next_session(20261002) == 20261006
+    assert cal.next_session(20261005) == 20261006
+    assert cal.prev_session(20261006) == 20261002
+    assert cal.rollforward(20261003) == 20261006
+    assert cal.rollback(20261003) == 20261002
+    np.testing.assert_array_equal(cal.is_session([20261018, 20261019]), [False, True])
+    # 달력 범위 밖도 같은 규칙
+    assert cal.sessions(19991230, 20000104).tolist() == [19991230, 19991231, 20000103, 20000104]
+
+
+def test_session_hours_and_expected_bars():
+    cal = KRXCalendar()
+    # 표에 없는 2015 년은 주말만 휴장이라 1월 1일이 첫 거래일
+    opens, closes = cal.session_hours([20260102, 20261119, 20261020, 20150101])
+    assert opens.tolist() == [1000, 1000, 900, 1000]
+    assert closes.tolist() == [1530, 1630, 1530, 1500]
+    # 접속매매 구간 1분봉 + 동시호가 봉 하나
+    assert cal.bars_per_session(20261020).tolist() == [381]
+    assert cal.bars_per_session(20260102).tolist() == [321]
+    assert cal.expected_bars(20261019, 20261023, unit='m') == 381 * 5
+    assert cal.expected_bars(20261001, 20261031, unit='D') == 20
+    assert cal.expected_bars(20261001, 20261031, unit='W') == 5
+    assert cal.expected_bars(20260901, 20261031, unit='M') == 2
+
+
+def test_save_and_load(tmp_path):
+    cal = KRXCalendar(holidays=[20261019], special={20261020: (1000, 1530)}, start=20260101, end=20261231)
+    path = str(tmp_path / 'calendar.npz')
+    cal.save(path)
+    loaded = KRXCalendar.load(path)
+    assert not loaded.is_session(20261019)
+    assert loaded.session_hours(20261020)[0].tolist() == [1000]
+    np.testing.assert_array_equal(loaded.dates, cal.dates)
@@ -0,0 +1,74 @@
+import time
+import threading
+
+from orderbook import OrderBook, STATUS_FILLED, STATUS_PARTIAL, STATUS_CANCELLED
+
+
+def test_reconcile_adds_missed_orders(com, creon):
+    book = OrderBook(creon=creon)
+    assert creon.buy('000010', 10)['status'] == 0
+    # 접수/체결 이벤트를 pump() 하지 않아 놓친 것으로 둔다
+    assert len(book) == 0
+    assert book.reconcile() > 0
+    order = book.get(1)
+    assert order.code == '000010'
+    assert order.amount == 10 and order.filled == 10
+    assert order.status == STATUS_FILLED
+    assert not book.open_orders()
+    assert book.reconcile() == 0
+
+
+def test_reconcile_closes_missed_cancel(com, creon):
+    book = OrderBook(creon=creon)
+    creon.buy('000010', 10)
+    # 3 주 체결, 7 주 미체결
+    com.orders[0].update(filled=3, cancelable=7)
+    book.reconcile()
+    order = book.get(1)
+    assert order.status == STATUS_PARTIAL
+    assert order.remaining == 7
+    assert book.open_orders('A000010') == [order]
+
+    # 취소 확인 이벤트를 놓쳐도 정정취소가능수량이 0 이면 취소된 것으로 닫는다
+    com.orders[0].update(cancelable=0)
+    assert book.reconcile() == 1
+    assert order.status == STATUS_CANCELLED
+    assert order.amount == 3 and order.filled == 3
+    assert not book.open_orders()
+
+
+def test_reconcile_applies_events_then_history(com, creon):
+    book = OrderBook(creon=creon)
+    creon.subscribe_orderevent(book.on_event)
+    creon.buy('000010', 10)
+    com.pump()
+    assert book.get(1).status == STATUS_FILLED
+    assert book.reconcile() == 0
+
+
+def test_reconcile_uses_call(com, creon):
+    threads = []
+
+    def call(fn, *args):
+        threads.append(threading.current_thread().name)
+        return fn(*args)
+
+    book = OrderBook(creon=creon, call=call)
+    creon.buy('000010', 10)
+    book.reconcile()
+    assert threads == [threading.current_thread().name]
+    assert len(book) == 1
+
+
+def test_timer_reconciles_without_open_orders(com, creon):
+    book = OrderBook(creon=creon, call=lambda fn, *args: fn(*args))
+    creon.buy('000010', 10)
+    # 장부가 비어 있어도 (접수 이벤트를 놓쳐도) 주기적으로 대조한다
+    book.start_reconcile(interval=0.01)
+    try:
+        deadline = time.time() + 5
+        while len(book) == 0 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        book.stop_reconcile()
+    assert book.get(1).status == STATUS_FILLED
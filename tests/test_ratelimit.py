@@ -0,0 +1,80 @@
+import time
+
+import constants
+import fakecom
+from ratelimit import RateLimiter, TokenBucket
+
+
+def test_bucket_reserves_into_next_windows():
+    bucket = TokenBucket(2, 1.0)
+    now = 100.0
+    assert bucket.reserve(now) == 0
+    assert bucket.reserve(now) == 0
+    # 창의 토큰을 다 쓰면 다음 창, 그다음 창으로 예약된다
+    assert bucket.reserve(now) == 1.0
+    assert bucket.reserve(now) == 1.0
+    assert bucket.reserve(now) == 2.0
+    assert bucket.tokens == -3
+
+    bucket.refill(now + 1.0)
+    assert bucket.tokens == -1
+    assert bucket.delay(now + 1.5) == 0.5
+    bucket.refill(now + 2.0)
+    assert bucket.tokens == 1
+
+
+def test_release_bucket_has_no_window():
+    bucket = TokenBucket(2)
+    bucket.reserve(0)
+    bucket.reserve(0)
+    assert bucket.tokens == 0
+    assert bucket.delay(0) == 0
+    bucket.release()
+    bucket.release()
+    bucket.release()
+    assert bucket.tokens == 2
+
+
+def test_acquire_waits_for_next_window():
+    limiter = RateLimiter(limits={constants.LT_NONTRADE_REQUEST: (3, 0.2)})
+    start = time.monotonic()
+    delays = [limiter.acquire(constants.LT_NONTRADE_REQUEST) for _ in range(5)]
+    elapsed = time.monotonic() - start
+    assert delays[:3] == [0, 0, 0]
+    # 네 번째는 다음 창까지 기다리고, 기다리는 동안 창이 열려 다섯 번째는 바로 보낸다
+    assert 0.1 < delays[3] <= 0.2
+    assert delays[4] == 0
+    assert 0.15 < elapsed < 0.5
+    assert limiter.remain(constants.LT_NONTRADE_REQUEST) == 1
+
+
+def test_try_acquire_does_not_wait():
+    limiter = RateLimiter(limits={constants.LT_SUBSCRIBE: (2, None),
+                                  constants.LT_TRADE_REQUEST: (1, 10)})
+    assert limiter.try_acquire(constants.LT_SUBSCRIBE)
+    assert limiter.try_acquire(constants.LT_SUBSCRIBE)
+    assert not limiter.try_acquire(constants.LT_SUBSCRIBE)
+    limiter.release(constants.LT_SUBSCRIBE)
+    assert limiter.try_acquire(constants.LT_SUBSCRIBE)
+
+    start = time.monotonic()
+    assert limiter.try_acquire(constants.LT_TRADE_REQUEST)
+    assert not limiter.try_acquire(constants.LT_TRADE_REQUEST)
+    assert time.monotonic() - start < 0.1
+    assert 9 < limiter.delay(constants.LT_TRADE_REQUEST) <= 10
+
+
+def test_sync_with_com_counter():
+    # 다른 프로세스가 요청을 써서 COM 카운터가 더 적게 남았으면 그 값을 따른다
+    com = fakecom.FakeCOM(limits={constants.LT_NONTRADE_REQUEST: (10, 60)})
+    for _ in range(8):
+        com.consume(constants.LT_NONTRADE_REQUEST)
+    limiter = RateLimiter(counter=com.remain, limits={constants.LT_NONTRADE_REQUEST: (10, 60)})
+    assert limiter.acquire(constants.LT_NONTRADE_REQUEST) == 0
+    assert limiter.remain(constants.LT_NONTRADE_REQUEST) == 1
+    com.consume(constants.LT_NONTRADE_REQUEST)
+    assert limiter.acquire(constants.LT_NONTRADE_REQUEST) == 0
+    com.consume(constants.LT_NONTRADE_REQUEST)
+    assert limiter.saturated(constants.LT_NONTRADE_REQUEST)
+    # 토큰이 바닥나면 COM 카운터로 다시 확인하고, 남은 시간 뒤의 창으로 예약한다
+    assert 50 < limiter.delay(constants.LT_NONTRADE_REQUEST) <= 60
@@ -0,0 +1,47 @@
+import time
+
+from reconnect import Reconnector
+
+
+def fake_restart(monkeypatch, reconnector, com):
+    def teardown():
+        reconnector.creon.trade_session.invalidate()
+        com.connected = False
+        com.subscriptions.clear()
+        return True
+
+    def start():
+        reconnector.started = time.time()
+        com.connected = True
+        return True
+
+    monkeypatch.setattr(reconnector, 'teardown', teardown)
+    monkeypatch.setattr(reconnector, 'start', start)
+
+
+def test_reconnect_restores_session(monkeypatch, com, creon):
+    ticks = []
+    assert creon.subscribe_stockcur('000010', ticks.append)
+    assert creon.init_trade() is not None
+
+    reconnector = Reconnector(creon, 'id', 'pwd', 'pwdcert', timeout=5, poll_interval=0.01)
+    fake_restart(monkeypatch, reconnector, com)
+    assert reconnector.run(force=True)
+    assert list(reconnector.timings) == ['snapshot', 'teardown', 'start', 'wait', 'restore']
+    assert creon.trade_session.ready
+    # 재접속 전 콜백으로 다시 구독한다
+    com.emit_ticks(2)
+    assert len(ticks) == 2
+
+    # 이미 연결되어 있으면 재시작하지 않는다
+    assert reconnector.run(force=False)
+    assert list(reconnector.timings) == ['snapshot']
+
+
+def test_reconnect_reports_failed_phase(monkeypatch, com, creon):
+    reconnector = Reconnector(creon, 'id', 'pwd', 'pwdcert', timeout=0.05, poll_interval=0.01)
+    fake_restart(monkeypatch, reconnector, com)
+    monkeypatch.setattr(reconnector, 'start', lambda: True)
+    assert not reconnector.run(force=True)
+    assert reconnector.failed == 'wait'
+    assert 'restore' not in reconnector.timings
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from respcache import ResponseCache, Policy, EMPTY_TTL
+
+
+@pytest.fixture
+def cache():
+    cache = ResponseCache(policies={'short': Policy(60), 'stockfeatures': Policy(0.05)})
+    # 장중으로 두어 ttl 이 정책대로 적용되게 한다
+    cache.market_active = lambda now: (True, now.timestamp() + 3600)
+    return cache
+
+
+def counter(result):
+    calls = []
+
+    def fn(*args, **kwargs):
+        calls.append((args, kwargs))
+        return result
+    return fn, calls
+
+
+def test_cache_key_ignores_param_order(cache):
+    fn, calls = counter([{'date': 20260101}])
+    first = cache.get('short', {'code': '000010', 'n': 5}, None, fn)
+    second = cache.get('short', {'n': '5', 'code': '000010', 'date_to': ''}, None, fn)
+    assert len(calls) == 1
+    assert first.body == second.body
+    assert cache.stats['hit'] == 1 and cache.stats['miss'] == 1
+
+
+def test_cache_ttl(cache):
+    fn, calls = counter({'price': 1})
+    res = cache.get('short', {'code': '000010'}, None, fn)
+    assert 0 < res.max_age <= 60
+    cache.get('stockfeatures', {'code': '000010'}, None, fn)
+    time.sleep(0.1)
+    cache.get('stockfeatures', {'code': '000010'}, None, fn)
+    cache.get('short', {'code': '000010'}, None, fn)
+    assert len(calls) == 3
+
+
+def test_cache_not_modified(cache):
+    fn, calls = counter({'price': 1})
+    res = cache.get('short', {'code': '000010'}, None, fn)
+    assert res.status == 200 and res.body
+    res304 = cache.get('short', {'code': '000010'}, 'W/"other", ' + res.etag, fn)
+    assert res304.status == 304 and res304.body == b'' and res304.etag == res.etag
+    assert cache.get('short', {'code': '000010'}, '"other"', fn).status == 200
+    assert cache.stats['not_modified'] == 1
+    assert len(calls) == 1
+
+
+def test_cache_empty_result_expires_soon(cache):
+    # 장이 끝난 뒤에도 빈 응답은 다음 장까지 남지 않는다
+    cache.market_active = lambda now: (False, now.timestamp() + 36000)
+    fn, calls = counter([])
+    res = cache.get('short', {'code': '000010'}, None, fn)
+    assert res.max_age <= EMPTY_TTL
+    fn, calls = counter([{'date': 20260101}])
+    assert cache.get('short', {'code': '000020'}, None, fn).max_age > EMPTY_TTL
+
+
+def test_cache_does_not_store_failures(cache):
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise RuntimeError('failed')
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.get('short', {'code': '000010'}, None, fail)
+    assert len(calls) == 2
+    assert cache.peek('short', {'code': '000010'}) is None
@@ -0,0 +1,92 @@
+import time
+import threading
+
+from singleflight import SingleFlight, normalize
+
+
+def wait_until(cond, timeout=5):
+    deadline = time.time() + timeout
+    while not cond():
+        if time.time() > deadline:
+            raise TimeoutError()
+        time.sleep(0.001)
+
+
+def run_followers(sf, params_list, endpoint='stockcandles'):
+    """
+    진행 중인 조회(leader)가 막혀 있는 동안 params_list 로 조회해서 결과를 모은다
+    """
+    release = threading.Event()
+    calls = []
+
+    def fetch(n):
+        calls.append(n)
+        release.wait(5)
+        return [{'date': 20260101 + i} for i in range(n)]
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault(
+        'leader', sf.do(endpoint, {'code': '000010', 'n': 5}, fetch, 5)))
+    leader.start()
+    wait_until(lambda: sf.calls)
+    followers = [threading.Thread(target=lambda i=i, params=params: results.setdefault(
+        i, sf.do(endpoint, params, fetch, int(params.get('n') or 0)))) for i, params in enumerate(params_list)]
+    for t in followers:
+        t.start()
+    wait_until(lambda: sf.stats['shared'] + sf.stats['sliced'] + sf.stats['leader'] - 1 >= len(params_list))
+    release.set()
+    for t in [leader] + followers:
+        t.join()
+    return results, calls
+
+
+def test_normalize_ignores_order_and_empty_values():
+    assert normalize('short', {'code': '000010', 'n': 5, 'date_to': None}) == \
+        normalize('short', {'n': '5', 'date_from': '', 'code': '000010'})
+    assert normalize('short', {'code': '000010'}) != normalize('investorbuysell', {'code': '000010'})
+
+
+def test_singleflight_shares_and_slices():
+    sf = SingleFlight()
+    results, calls = run_followers(sf, [{'code': '000010', 'n': 5}, {'code': '000010', 'n': '3'}])
+    assert calls == [5]
+    assert results[0] == results['leader']
+    assert results[1] == results['leader'][-3:]
+    assert sf.stats == {'leader': 1, 'shared': 1, 'sliced': 1}
+    assert not sf.calls
+
+
+def test_singleflight_does_not_slice_larger_or_other_requests():
+    sf = SingleFlight()
+    results, calls = run_followers(sf, [{'code': '000010', 'n': 10}, {'code': '000020', 'n': 3}])
+    assert sorted(calls) == [3, 5, 10]
+    assert len(results[0]) == 10
+    assert sf.stats['leader'] == 3
+
+
+def test_singleflight_shares_errors():
+    sf = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError('failed')
+
+    def call():
+        try:
+            sf.do('short', {'code': '000010'}, fail)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    threads[0].start()
+    wait_until(lambda: sf.calls)
+    for t in threads[1:]:
+        t.start()
+    wait_until(lambda: sf.stats['shared'] == 2)
+    release.set()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3
+    assert not sf.calls
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import _creon
+import constants
+from _creon import CreonRequestError
+from batch import BatchJob
+from respcache import ResponseCache
+
+
+def codes(com):
+    return [code[1:] for code in com.codes[constants.MARKET_CODE_KOSPI]]
+
+
+def test_bulk_in_batches(com, creon, monkeypatch):
+    monkeypatch.setattr(_creon, 'MARKETEYE_MAX_CODES', 3)
+    result = creon.get_stockfeatures_bulk(codes(com), fields=['PER', 'EPS'])
+    assert result['code'].tolist() == codes(com)
+    assert result.keys == ['code', 'PER', 'EPS']
+    assert com.n_requests == 4
+
+    many = creon.get_stockfeatures_many(codes(com)[:2])
+    assert sorted(many) == codes(com)[:2]
+    assert many['000010']['name'] == '종목000010'
+    assert many['000010']['PER'] == creon.get_stockfeatures('000010')['PER']
+
+
+def test_failed_batch_raises(com, creon, monkeypatch):
+    monkeypatch.setattr(_creon, 'MARKETEYE_MAX_CODES', 3)
+    # 두 묶음만 받고 세 번째 묶음에서 요청 제한에 걸린다
+    com.limits = {constants.LT_NONTRADE_REQUEST: (2, 3600)}
+    with pytest.raises(CreonRequestError):
+        creon.get_stockfeatures_bulk(codes(com))
+    with pytest.raises(CreonRequestError):
+        creon.get_stockfeatures_many(codes(com))
+    with pytest.raises(CreonRequestError):
+        creon.get_stockfeatures('000010')
+
+
+def test_batch_reports_failed_features(com, creon):
+    cache = ResponseCache()
+    cache.market_active = lambda now: (True, now.timestamp() + 3600)
+    com.limits = {constants.LT_NONTRADE_REQUEST: (0, 3600)}
+    queries = [{'type': 'stockfeatures', 'code': '000010'}, {'type': 'stockfeatures', 'code': '000020'}]
+    result = json.loads(BatchJob(creon, cache, queries).collect())
+    # 실패를 빈 결과로 주지 않는다
+    assert [item['status'] for item in result] == [500, 500]
+    assert cache.peek('stockfeatures', {'code': '000010'}) is None
@@ -0,0 +1,69 @@
+import constants
+from subscriptions import SubscriptionManager
+
+
+def test_one_stockcur_per_code(com, creon):
+    manager = SubscriptionManager(creon)
+    a, b = [], []
+    sub_a = manager.subscribe('000010', a.append)
+    sub_b = manager.subscribe('A000010', b.append)
+    assert len(com.subscriptions['A000010']) == 1 and len(manager) == 1
+    com.emit_ticks(2)
+    assert len(a) == len(b) == 2
+
+    remain = creon.limiter.remain(constants.LT_SUBSCRIBE)
+    manager.unsubscribe(sub_a)
+    com.emit_ticks(1)
+    assert len(a) == 2 and len(b) == 3
+    # 마지막 구독자가 해지할 때만 해지한다
+    manager.unsubscribe(sub_b)
+    assert 'A000010' not in com.subscriptions
+    assert creon.limiter.remain(constants.LT_SUBSCRIBE) == remain + 1
+    manager.unsubscribe(sub_b)
+
+
+def test_outside_subscriber_keeps_ticks(com, creon):
+    outside, inside = [], []
+    assert creon.subscribe_stockcur('000010', outside.append)
+    manager = SubscriptionManager(creon)
+    sub = manager.subscribe('000010', inside.append)
+    com.emit_ticks(1)
+    assert len(outside) == len(inside) == 1
+
+    manager.unsubscribe(sub)
+    # 매니저가 붙인 콜백이 없는 종목을 해지해도 밖의 구독은 그대로
+    manager.release('000010')
+    manager.clear()
+    com.emit_ticks(1)
+    assert len(outside) == 2 and len(inside) == 1
+
+
+def test_evict_lower_priority(com, creon):
+    evicted = []
+    manager = SubscriptionManager(creon, capacity=2, on_evict=evicted.append)
+    low = manager.subscribe('000010', lambda item: None, priority=0, owner='scanner')
+    manager.subscribe('000020', lambda item: None, priority=5)
+    manager.watchlists['scanner'] = {'000010': low}
+    high = manager.subscribe('000030', lambda item: None, priority=3)
+    assert high is not None and evicted == [low] and not low.active
+    assert sorted(manager.codes()) == ['000020', '000030']
+    assert 'A000010' not in com.subscriptions
+    assert manager.watchlists['scanner'] == {}
+    # 더 낮은 우선순위로는 밀어내지 못한다
+    assert manager.subscribe('000040', lambda item: None, priority=3) is None
+
+    rejecting = SubscriptionManager(creon, capacity=0, policy='reject')
+    assert rejecting.subscribe('000050', lambda item: None, priority=10) is None
+
+
+def test_watchlist_changes_only_diff(com, creon):
+    manager = SubscriptionManager(creon)
+    ticks = []
+    assert manager.set_watchlist('ui', ['000010', '000020'], ticks.append) == []
+    first = dict(manager.watchlists['ui'])
+    assert manager.set_watchlist('ui', ['A000020', '000030'], ticks.append) == []
+    assert manager.watchlists['ui']['000020'] is first['000020']
+    assert sorted(manager.codes()) == ['000020', '000030']
+    assert sorted(com.subscriptions) == ['A000020', 'A000030']
+    manager.clear('ui')
+    assert not manager.codes() and not com.subscriptions
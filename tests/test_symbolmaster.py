@@ -0,0 +1,52 @@
+import time
+
+import constants
+from symbolmaster import SymbolMaster, get_codemgr_item
+
+
+def test_snapshot_matches_codemgr(creon):
+    master = SymbolMaster(creon).start()
+    assert len(master.table) == 20
+    item = get_codemgr_item(creon.obj_CpUtil_CpCodeMgr, 'A000010')
+    assert master.get('000010') == item
+    assert master.get('A000010') == item
+    assert master.get('999999') is None
+    assert master.filter(market=constants.MARKET_CODE_KOSDAQ) == ['{:06d}'.format(100000 + i * 10)
+                                                                   for i in range(1, 11)]
+
+
+def test_restart_loads_saved_snapshot(tmp_path, creon, monkeypatch):
+    path = str(tmp_path / 'symbols.npz')
+    master = SymbolMaster(creon, path=path).start()
+    expected = master.get('000020')
+
+    # 같은 날 재시작하면 COM 을 부르지 않고 저장된 스냅샷을 쓴다
+    def fail(codes):
+        raise AssertionError('COM call')
+
+    restarted = SymbolMaster(creon, path=path)
+    monkeypatch.setattr(restarted, 'read_items', fail)
+    restarted.start()
+    assert restarted.get('000020') == expected
+
+
+def test_background_refresh(creon):
+    calls = []
+
+    def call(fn, *args):
+        calls.append(fn)
+        return fn(*args)
+
+    master = SymbolMaster(creon, call=call, chunk=3).start()
+    # 백그라운드에서 만드는 동안에는 기다리지 않고 None, 부른 쪽은 CpCodeMgr 에서 바로 읽는다
+    assert master.get('000010') is None or master.snapshot is not None
+    deadline = time.time() + 5
+    while master.snapshot is None and time.time() < deadline:
+        time.sleep(0.01)
+    master.stop()
+    assert master.get('000010')['name'] == '종목000010'
+    # 종목 목록 2 번 + 20 종목을 3 종목씩
+    assert len(calls) == 2 + 7
+
+    creon.symbol_master = master
+    assert creon.get_stock_item('000010') == master.get('000010')
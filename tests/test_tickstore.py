@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+import constants
+import fakecom
+from _creon import Creon
+from tickstore import TickRing, select_fields
+
+
+def test_ring_wraps_without_copy():
+    ring = TickRing('000010', capacity=5, fields=select_fields(['price', 'second']))
+    for i in range(8):
+        ring.append([100 + i, 90000 + i])
+    assert len(ring) == 5
+    view = ring.last()
+    assert view['price'].tolist() == [103, 104, 105, 106, 107]
+    # 최근 capacity 개는 연속된 구간이라 view 로 준다
+    assert np.shares_memory(view['price'], ring.columns['price'])
+    assert ring.last(2)['second'].tolist() == [90006, 90007]
+
+    result, seq = ring.since(6)
+    assert seq == 6 and result['price'].tolist() == [106, 107]
+    # 밀려난 틱은 빠지고 남아 있는 첫 틱의 순번을 준다
+    result, seq = ring.since(0)
+    assert seq == 3 and len(result) == 5
+    assert ring.to_dicts(1) == [{'price': 107, 'second': 90007, 'code': '000010', 'name': None}]
+
+
+def test_select_fields_rejects_unknown():
+    assert [name for _, name, _ in select_fields(['second', 'price', 'code'])] == ['price', 'second']
+    with pytest.raises(ValueError):
+        select_fields(['price'], select_fields(['second']))
+
+
+def test_ring_rows_match_dict_ticks(com, creon):
+    plain = Creon(com=fakecom.FakeCOM(n_codes=10, limits={}))
+    expected = []
+    assert plain.subscribe_stockcur('000010', expected.append)
+    plain.com.emit_ticks(30)
+
+    creon.enable_tick_store(capacity=100)
+    rows = []
+    assert creon.subscribe_stockcur('000010', rows.append)
+    com.emit_ticks(30)
+    assert rows == expected
+    ring = creon.tick_store.ring('000010')
+    assert ring.to_dicts() == expected
+    assert ring.last()['price'].tolist() == [item['price'] for item in expected]
+
+
+def test_restricted_store_rejects_unstored_fields(com, creon):
+    creon.enable_tick_store(fields=['price', 'second'])
+    remain = creon.limiter.remain(constants.LT_SUBSCRIBE)
+    with pytest.raises(ValueError):
+        creon.subscribe_stockcur('000010', fields=['price', 'cum_volume'])
+    # 실패한 구독은 구독 슬롯을 돌려준다
+    assert creon.limiter.remain(constants.LT_SUBSCRIBE) == remain
+
+    rings = []
+    assert creon.subscribe_stockcur('000010', rings.append, raw=True, fields=['price'])
+    com.emit_ticks(3)
+    # 링은 구독에서 요청한 필드만 저장한다
+    assert len(rings) == 3 and rings[0].keys == ['price']
+    with pytest.raises(ValueError):
+        creon.subscribe_stockcur('000010', fields=['second'])
+
+
+def test_lazy_tick_reads_requested_fields(com, creon):
+    seen = []
+
+    def on_tick(tick):
+        # 요청하지 않은 필드도 콜백 안에서는 읽을 수 있다
+        seen.append((tick, tick['second']))
+
+    assert creon.subscribe_stockcur('000010', on_tick, fields=['price'])
+    com.emit_ticks(3)
+    assert len(seen) == 3
+    tick, second = seen[-1]
+    assert tick['second'] == second == 90002
+    assert set(tick.to_dict()) == {'price', 'second'}
+    # 콜백이 끝나면 읽지 않은 필드는 볼 수 없다
+    with pytest.raises(KeyError):
+        tick['cum_volume']
+    assert tick.get('cum_volume') is None
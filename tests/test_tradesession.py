@@ -0,0 +1,68 @@
+import pytest
+
+import constants
+from _creon import CreonRequestError
+
+
+def count_trade_init(monkeypatch, td_util, ret=0):
+    calls = []
+    monkeypatch.setattr(td_util, 'TradeInit', lambda flag=0: calls.append(flag) or ret)
+    return calls
+
+
+def test_init_is_cached(monkeypatch, creon):
+    session = creon.trade_session
+    calls = count_trade_init(monkeypatch, session.td_util)
+    assert session.init() == ('333033333', ('01',))
+    assert session.init() == ('333033333', ('01',))
+    assert len(calls) == 1 and session.ready
+
+    generation = session.generation
+    session.invalidate()
+    assert not session.ready and session.generation == generation + 1
+    session.init()
+    assert len(calls) == 2
+
+
+def test_order_obj_is_reused(creon):
+    session = creon.trade_session
+    buy = session.order_obj('2')
+    assert session.order_obj('2') is buy
+    assert session.order_obj('1') is not buy
+    assert buy.GetInputValue(0) == '2'
+    assert buy.GetInputValue(1) == '333033333'
+    assert buy.GetInputValue(2) == '01'
+    assert buy.GetInputValue(8) == '03'
+
+    # 다시 초기화하면 새 주문 객체를 만든다
+    session.invalidate()
+    assert session.order_obj('2') is not buy
+
+
+def test_trade_init_failure(monkeypatch, creon):
+    count_trade_init(monkeypatch, creon.trade_session.td_util, ret=-1)
+    assert creon.trade_session.init() is None
+    assert creon.trade_session.order_obj('2') is None
+    with pytest.raises(CreonRequestError):
+        with creon.trade_request():
+            pass
+    assert creon.order('2', '000010', 1)['status'] == -1
+
+
+def test_trade_request_failure_invalidates(com, creon):
+    with creon.trade_request() as (account_no, account_gflags):
+        assert account_no == '333033333'
+    assert creon.trade_session.ready
+
+    com.limits = {constants.LT_TRADE_REQUEST: (0, 3600)}
+    with pytest.raises(CreonRequestError):
+        creon.get_holdingstocks(account_no)
+    assert not creon.trade_session.ready
+
+
+def test_failed_order_invalidates(com, creon):
+    assert creon.order('2', '000010', 1)['status'] == 0
+    assert creon.trade_session.ready
+    com.limits = {constants.LT_TRADE_REQUEST: (0, 3600)}
+    assert creon.order('2', '000010', 1)['status'] != 0
+    assert not creon.trade_session.ready